@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Benchmark the ytInitialData extractor against the previous BeautifulSoup + regex path.
+Usage: python benchmarks/bench_extractor.py --iterations 20
+
+With --parse-workers N it also measures channel page throughput of
+N fetch threads parsing inline against the same threads using a pool of N
+parse processes (PARSE_WORKERS).
+"""
+
+import re
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+# Add src directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.youtube_tracker.extractor import extract_channel_videos, extract_video_description, shorten_description
+from src.youtube_tracker.parse_pool import ParsePool
+
+FIXTURES = Path(__file__).parent.parent / 'tests' / 'fixtures' / 'youtube'
+
+
+def legacy_channel_video(html):
+    """Channel page parsing as previously done in tracker.get_latest_video"""
+    soup = BeautifulSoup(html, 'html.parser')
+    video_data = None
+    for script in soup.find_all('script'):
+        if script.string and '"videoRenderer"' in script.string:
+            match = re.search(r'"videoRenderer":({.+?})}', script.string)
+            if match:
+                video_data = match.group(1)
+                break
+    if not video_data:
+        return None
+    video_id = re.search(r'"videoId":"(.*?)"', video_data)
+    title = re.search(r'"title":{"runs":\[{"text":"(.*?)"}', video_data)
+    thumbnail = re.search(r'"thumbnail":{"thumbnails":\[{"url":"(.*?)"', video_data)
+    if not all([video_id, title, thumbnail]):
+        return None
+    return video_id.group(1), title.group(1), thumbnail.group(1)
+
+
+def legacy_description(html):
+    """Watch page parsing as previously done in tracker.get_latest_video"""
+    soup = BeautifulSoup(html, 'html.parser')
+    for script in soup.find_all('script'):
+        if script.string and '"description":{"simpleText":"' in script.string:
+            match = re.search(r'"description":{"simpleText":"(.*?)"}', script.string)
+            if match:
+                description = match.group(1).encode().decode('unicode-escape').replace('\\n', ' ').strip()
+                return shorten_description(description)
+    return ""
+
+
+def current_channel_video(body):
+    videos = extract_channel_videos(body)
+    if not videos:
+        return None
+    return videos[0].video_id, videos[0].title, videos[0].thumbnail
+
+
+def current_description(body):
+    return shorten_description(extract_video_description(body))
+
+
+def measure(func, payload, iterations):
+    """Return the best and mean wall time in milliseconds"""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func(payload)
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), sum(timings) / len(timings)
+
+
+def run(iterations):
+    channel_bytes = (FIXTURES / 'channel_videos.html').read_bytes()
+    watch_bytes = (FIXTURES / 'watch.html').read_bytes()
+    channel_text = channel_bytes.decode('utf-8')
+    watch_text = watch_bytes.decode('utf-8')
+
+    cases = [
+        ('channel_page', 'legacy', legacy_channel_video, channel_text),
+        ('channel_page', 'extractor', current_channel_video, channel_bytes),
+        ('watch_page', 'legacy', legacy_description, watch_text),
+        ('watch_page', 'extractor', current_description, watch_bytes),
+    ]
+    results = []
+    for page, implementation, func, payload in cases:
+        best, mean = measure(func, payload, iterations)
+        results.append({'page': page, 'implementation': implementation, 'best_ms': best, 'mean_ms': mean})
+    return results
+
+
+def pages_per_second(pool, threads, pages):
+    """Parse channel pages from concurrent threads, as the poller does"""
+    channel_bytes = (FIXTURES / 'channel_videos.html').read_bytes()
+    with ThreadPoolExecutor(threads) as executor:
+        # Warm up the threads and worker processes
+        list(executor.map(pool.channel_videos, [channel_bytes] * threads))
+        start = time.perf_counter()
+        list(executor.map(pool.channel_videos, [channel_bytes] * pages))
+        return pages / (time.perf_counter() - start)
+
+
+def run_throughput(workers, pages):
+    inline = pages_per_second(ParsePool(workers=0), workers, pages)
+    pool = ParsePool(workers=workers)
+    try:
+        pooled = pages_per_second(pool, workers, pages)
+    finally:
+        pool.close()
+    return inline, pooled
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark YouTube page extraction')
+    parser.add_argument('--iterations', type=int, default=20, help='Iterations per case (default: 20)')
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help='Also compare channel page throughput with this many parse processes')
+    parser.add_argument('--pages', type=int, default=500, help='Channel pages parsed per throughput run (default: 500)')
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+    print(f"{'page':<14}{'implementation':<16}{'best ms':>10}{'mean ms':>10}")
+    for result in results:
+        print(f"{result['page']:<14}{result['implementation']:<16}{result['best_ms']:>10.2f}{result['mean_ms']:>10.2f}")
+
+    # Show the extracted values so output differences are visible too
+    watch_text = (FIXTURES / 'watch.html').read_text(encoding='utf-8')
+    print(f"\nlegacy description:    {legacy_description(watch_text)[:60]!r}")
+    print(f"extractor description: {current_description(watch_text.encode('utf-8'))[:60]!r}")
+
+    if args.parse_workers:
+        inline, pooled = run_throughput(args.parse_workers, args.pages)
+        print(f"\nchannel pages/s with {args.parse_workers} threads: {inline:.0f} inline, "
+              f"{pooled:.0f} with {args.parse_workers} parse workers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test of update_latest_videos against the local stand-in.
+
+Starts benchmarks/standin_server.py in a separate process, points the
+tracker at it and runs full polling cycles over synthetic channels. Reports
+cycle time, requests per second, p50/p99 latency per stage and per request
+route, and memory use. With --enrichment-mode queue (the default) the
+cycle time is the detection latency, and the time to drain the enrichment
+queue afterwards is reported separately. Needs no network access.
+
+Usage:
+    python benchmarks/load_test.py --channels 10000 --cycles 3 --latency-ms 50 --output load.json
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+from collections import Counter, defaultdict
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+
+# Add src directory to Python path
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from standin_server import add_config_arguments
+from src.youtube_tracker import tracker
+from src.youtube_tracker.app import create_app
+
+SERVER_SCRIPT = Path(__file__).parent / 'standin_server.py'
+
+ROUTES = {'channel': 'channel', 'watch': 'watch', 'feeds': 'feed', 'search': 'search', 'page': 'page'}
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize_latencies(samples):
+    return {
+        'count': len(samples),
+        'p50_ms': percentile(samples, 0.5) * 1000,
+        'p99_ms': percentile(samples, 0.99) * 1000,
+        'max_ms': max(samples) * 1000,
+    }
+
+
+class Recorder:
+    """Collect latency samples per stage and request counts per route"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    def timed(self, stage, func):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return wrapper
+
+    def timed_get(self, get):
+        def wrapper(url, **kwargs):
+            route = 'http.' + ROUTES.get(urlsplit(url).path.strip('/').split('/')[0], 'other')
+            start = time.perf_counter()
+            status = 'error'
+            try:
+                response = get(url, **kwargs)
+                status = response.status_code
+                return response
+            finally:
+                self.add(route, time.perf_counter() - start)
+                with self._lock:
+                    self.requests += 1
+                    self.statuses[route][str(status)] += 1
+        return wrapper
+
+
+def start_standin(args):
+    """Start the stand-in server process and return it with its base URL"""
+    command = [sys.executable, str(SERVER_SCRIPT), '--port', '0',
+               '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+               '--error-rate', str(args.error_rate), '--throttle-rate', str(args.throttle_rate),
+               '--retry-after', str(args.retry_after), '--churn', str(args.churn),
+               '--burst', str(args.burst),
+               '--page-padding-kb', str(args.page_padding_kb), '--result-urls', str(args.result_urls),
+               '--seed', str(args.seed)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline().strip()
+    if not line.startswith('listening on '):
+        process.kill()
+        raise RuntimeError(f"Stand-in server did not start: {line!r}")
+    return process, line[len('listening on '):]
+
+
+def rss_mb():
+    """Current resident set size of this process (Linux)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        return None
+
+
+def configure_environment(args, base_url, work_dir):
+    os.environ.update({
+        'YOUTUBE_BASE_URL': base_url,
+        'SEARCH_BACKEND_URL': base_url,
+        'CHANGE_DETECTION': args.change_detection,
+        'ENRICHMENT_MODE': args.enrichment_mode,
+        'ENRICHMENT_CONCURRENCY': str(args.enrichment_concurrency),
+        'PARSE_WORKERS': str(args.parse_workers),
+        'MAX_CONCURRENT_CHANNELS': str(args.concurrency),
+        'SEARCH_FETCH_CONCURRENCY': str(args.fetch_concurrency),
+        # Every stand-in page lives on one host, unlike real result sites
+        'HOST_RATE_LIMIT': str(args.host_rate),
+        'HOST_RATE_BURST': str(args.host_rate),
+        'HTTP_POOL_MAXSIZE': str(args.concurrency + args.fetch_concurrency),
+        # ...and so are governed as YouTube requests, result pages included
+        'GOVERNOR_MAX_CONCURRENCY': str(args.concurrency + args.fetch_concurrency),
+        'SEARCH_CACHE_PATH': str(Path(work_dir) / 'cache.db'),
+        'PAGE_CACHE_PATH': str(Path(work_dir) / 'cache.db'),
+    })
+
+
+def instrument(app, recorder):
+    app.http_client.get = recorder.timed_get(app.http_client.get)
+    app.feed_probe.has_new_video = recorder.timed('stage.probe', app.feed_probe.has_new_video)
+    app.web_searcher.get_page_context = recorder.timed('stage.page_context', app.web_searcher.get_page_context)
+    # The tracker looks these up as module globals at call time
+    for name, stage in [('check_channel', 'stage.check_channel'), ('get_new_videos', 'stage.scrape'),
+                        ('perform_web_search', 'stage.web_search'), ('save_cycle_results', 'stage.save')]:
+        setattr(tracker, name, recorder.timed(stage, getattr(tracker, name)))
+
+
+def run_load_test(args):
+    process, base_url = start_standin(args)
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            configure_environment(args, base_url, work_dir)
+            database_url = args.database_url or f"sqlite:///{Path(work_dir) / 'tracker.db'}"
+            app = create_app(database_url=database_url, load_env=False)
+            app.migrate()
+
+            recorder = Recorder()
+            instrument(app, recorder)
+            channel_ids = [f"UCload{index:08d}" for index in range(args.channels)]
+
+            cycles = []
+            for cycle in range(args.cycles):
+                if cycle:
+                    requests.post(f"{base_url}/_control/advance", timeout=10).raise_for_status()
+                requests_before = recorder.requests
+                start = time.perf_counter()
+                changed = tracker.update_latest_videos(channel_ids)
+                seconds = time.perf_counter() - start
+                enrich_seconds = None
+                if args.enrichment_mode == 'queue':
+                    tracker.run_enrichment_worker(once=True)
+                    enrich_seconds = time.perf_counter() - start - seconds
+                made = recorder.requests - requests_before
+                cycles.append({
+                    'cycle': cycle,
+                    'seconds': seconds,
+                    'enrich_seconds': enrich_seconds,
+                    'channels': len(channel_ids),
+                    'changed': len(changed),
+                    'requests': made,
+                    'requests_per_s': made / (seconds + (enrich_seconds or 0)) if seconds else None,
+                    'rss_mb': rss_mb(),
+                })
+                enriched = f", enriched in {enrich_seconds:.1f}s" if enrich_seconds is not None else ''
+                print(f"cycle {cycle}: {seconds:.1f}s, {len(changed)} changed{enriched}, {made} requests "
+                      f"({cycles[-1]['requests_per_s']:.0f}/s)", flush=True)
+
+            server_stats = requests.get(f"{base_url}/_control/stats", timeout=10).json()
+            app.close()
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+    return {
+        'config': vars(args),
+        'cycles': cycles,
+        'stages': {name: summarize_latencies(samples) for name, samples in sorted(recorder.samples.items())},
+        'statuses': {route: dict(counts) for route, counts in sorted(recorder.statuses.items())},
+        'memory': {
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            'final_rss_mb': rss_mb(),
+        },
+        'server': server_stats,
+    }
+
+
+def print_report(report):
+    print(f"\n{'stage':<24}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, stage in report['stages'].items():
+        print(f"{name:<24}{stage['count']:>8}{stage['p50_ms']:>10.1f}{stage['p99_ms']:>10.1f}{stage['max_ms']:>10.1f}")
+    print()
+    for route, counts in report['statuses'].items():
+        print(f"{route:<24}" + ', '.join(f"{status}: {count}" for status, count in sorted(counts.items())))
+    memory = report['memory']
+    print(f"\npeak RSS {memory['peak_rss_mb']:.0f} MB, final RSS {memory['final_rss_mb']:.0f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the tracker against a local stand-in server')
+    parser.add_argument('--channels', type=int, default=1000, help='Number of synthetic channels (default: 1000)')
+    parser.add_argument('--cycles', type=int, default=3, help='Polling cycles to run (default: 3)')
+    parser.add_argument('--concurrency', type=int, default=8, help='MAX_CONCURRENT_CHANNELS (default: 8)')
+    parser.add_argument('--fetch-concurrency', type=int, default=5, help='SEARCH_FETCH_CONCURRENCY (default: 5)')
+    parser.add_argument('--host-rate', type=float, default=10000, help='HOST_RATE_LIMIT and burst for the stand-in host')
+    parser.add_argument('--change-detection', choices=['feed', 'off'], default='feed', help='CHANGE_DETECTION mode')
+    parser.add_argument('--enrichment-mode', choices=['queue', 'inline'], default='queue', help='ENRICHMENT_MODE')
+    parser.add_argument('--enrichment-concurrency', type=int, default=4, help='ENRICHMENT_CONCURRENCY (default: 4)')
+    parser.add_argument('--parse-workers', type=int, default=0, help='PARSE_WORKERS, -1 for one per CPU (default: 0)')
+    parser.add_argument('--database-url', help='Database to write to (default: temporary SQLite file)')
+    parser.add_argument('--log-level', default='CRITICAL', help='Tracker log level (default: CRITICAL)')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()))
+    report = run_load_test(args)
+    print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + '\n', encoding='utf-8')
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Generate the synthetic pages in tests/fixtures used by the tests and benchmarks.
+
+No live pages are recorded. The YouTube pages mirror the layout of real
+channel and watch pages (a large inline script, ytcfg, and ytInitialData /
+ytInitialPlayerResponse with raw UTF-8 text) and the result pages range
+from a short note to a large encyclopedia article. Output is seeded, so
+running this again reproduces the checked-in files byte for byte.
+tests/fixtures/youtube/feed.xml is written by hand and not generated here.
+
+Usage: python benchmarks/make_fixtures.py [--output tests/fixtures]
+"""
+
+import sys
+import json
+import random
+import string
+import argparse
+from pathlib import Path
+
+FIXTURES = Path(__file__).parent.parent / 'tests' / 'fixtures'
+
+CHANNEL_ID = "UCX6OQ3DkcsbYNE6H8uQQuVA"
+# Titles exercise non-ASCII text and characters that JSON and HTML escape
+TITLES = [
+    "I Built 100 Homes And Gave Them Away!",
+    "Café ☕ in Tōkyō – 日本語で話そう",
+    "Ünïcödé Édition: naïve façade résumé",
+    "He said \"don't\" & then <left>",
+    "$1 vs $1,000,000 Hotel Room!",
+    "Русский заголовок видео",
+    "😀 Emoji Challenge 🎉🎉",
+    "Backslash \\ test / slash",
+]
+WORDS = ("homes family community build charity donation house keys surprise volunteers construction "
+         "project neighborhood families winter shelter foundation roof walls paint furniture kitchen "
+         "episode creator channel video viewers million challenge giveaway local builders crew months "
+         "design plans permits materials lumber concrete solar windows garden playground school water").split()
+
+
+def video_id(index):
+    rng = random.Random(index)
+    return ''.join(rng.choice(string.ascii_letters + string.digits + '-_') for _ in range(11))
+
+
+def video_renderer(index):
+    video = video_id(index)
+    title = TITLES[index % len(TITLES)] + ("" if index < len(TITLES) else f" #{index}")
+    return {"richItemRenderer": {"content": {"videoRenderer": {
+        "videoId": video,
+        "thumbnail": {"thumbnails": [
+            {"url": f"https://i.ytimg.com/vi/{video}/hqdefault.jpg?sqp=-oaymwEbCKgBEF5IVfKriqkDDggBFQAAiEIYAXABwAEG&rs=AOn4CLB{index}", "width": 168, "height": 94},
+            {"url": f"https://i.ytimg.com/vi/{video}/hqdefault.jpg?sqp=-oaymwEcCNACELwBSFXyq4qpAw4IARUAAIhCGAFwAcABBg==&rs=AOn4CLC{index}", "width": 336, "height": 188}]},
+        "title": {"runs": [{"text": title}], "accessibility": {"accessibilityData": {"label": f"{title} by Channel {index} views"}}},
+        "descriptionSnippet": {"runs": [{"text": "Lorem ipsum dolor sit amet " * 3}]},
+        "publishedTimeText": {"simpleText": f"{index + 1} days ago"},
+        "lengthText": {"accessibility": {"accessibilityData": {"label": "15 minutes, 2 seconds"}}, "simpleText": "15:02"},
+        "viewCountText": {"simpleText": f"{(index + 1) * 1234567:,} views"},
+        "navigationEndpoint": {"clickTrackingParams": "CJ0BEJQ1GAAiEwi" + "x" * 40,
+            "commandMetadata": {"webCommandMetadata": {"url": f"/watch?v={video}", "webPageType": "WEB_PAGE_TYPE_WATCH", "rootVe": 3832}},
+            "watchEndpoint": {"videoId": video, "watchEndpointSupportedOnesieConfig": {"html5PlaybackOnesieConfig": {"commonConfig": {"url": "https://rr1---sn-abc.googlevideo.com/initplayback?source=youtube&oeis=1&c=WEB&oad=3200&ovd=3200&oaad=11000&oavd=11000&ocs=700&oewis=1&oputc=1&ofpcc=1&msp=1&odepv=1&id=" + video}}}}},
+        "trackingParams": "CJ0BEJQ1GAAiEwi" + "y" * 40,
+        "showActionMenu": False,
+        "menu": {"menuRenderer": {"items": [{"menuServiceItemRenderer": {"text": {"runs": [{"text": "Add to queue"}]}, "icon": {"iconType": "ADD_TO_QUEUE_TAIL"}}}]}},
+        "thumbnailOverlays": [{"thumbnailOverlayTimeStatusRenderer": {"text": {"simpleText": "15:02"}, "style": "DEFAULT"}}],
+    }}}}
+
+
+def js_blob(functions):
+    rng = random.Random(functions)
+    return ''.join("function f%d(a,b){var c=a+b;return c*%d;}" % (k, rng.randint(1, 999)) for k in range(functions))
+
+
+def youtube_page(initial_name, data, extra_before=""):
+    """A YouTube page with data assigned to var initial_name, escaped as YouTube does"""
+    ytcfg = {"INNERTUBE_API_KEY": "AIzaSy" + "A" * 33, "VISITOR_DATA": "Cgt" + "z" * 30,
+             "EXPERIMENT_FLAGS": {f"flag_{k}": k % 3 == 0 for k in range(2500)}}
+    payload = (json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+               .replace("<", "\\u003c").replace(">", "\\u003e").replace("&", "\\u0026"))
+    return ("<!DOCTYPE html><html style=\"font-size: 10px;font-family: Roboto, Arial, sans-serif;\" lang=\"en\">"
+            "<head><meta charset=\"utf-8\"><title>Example Channel - YouTube</title>"
+            f"<script nonce=\"abc\">{js_blob(3000)}</script>"
+            f"<script nonce=\"abc\">ytcfg.set({json.dumps(ytcfg)});</script>"
+            "<style>body{margin:0}</style>"
+            "</head><body dir=\"ltr\"><ytd-app></ytd-app>"
+            f"{extra_before}"
+            f"<script nonce=\"abc\">var {initial_name} = {payload};</script>"
+            f"<script nonce=\"abc\">{js_blob(2000)}</script>"
+            "<link rel=\"stylesheet\" href=\"/s/desktop/styles.css\"></body></html>")
+
+
+def channel_videos_page():
+    """The Videos tab of a channel with 30 uploads and a continuation"""
+    data = {"responseContext": {"serviceTrackingParams": [{"service": "GFEEDBACK", "params": [{"key": "route", "value": "channel."}]}]},
+            "contents": {"twoColumnBrowseResultsRenderer": {"tabs": [
+                {"tabRenderer": {"title": "Home", "selected": False}},
+                {"tabRenderer": {"title": "Videos", "selected": True, "content": {"richGridRenderer": {
+                    "contents": [video_renderer(index) for index in range(30)]
+                    + [{"continuationItemRenderer": {"trigger": "CONTINUATION_TRIGGER_ON_ITEM_SHOWN"}}]}}}}]}},
+            "header": {"c4TabbedHeaderRenderer": {"channelId": CHANNEL_ID, "title": "Example Channel"}},
+            "metadata": {"channelMetadataRenderer": {"title": "Example Channel",
+                                                     "description": "An example channel with ünïcode \"quotes\" & more"}}}
+    return youtube_page("ytInitialData", data)
+
+
+def watch_page():
+    """The watch page of the newest upload, with its description in the player response"""
+    description = ("Watch the full story of the café ☕ build in Tōkyō – 日本語.\n\nLinks:\nhttps://example.com/a?x=1&y=2\n"
+                   "He said \"don't\" and left. Backslash \\ kept. " + "More words here for the description body. " * 40)
+    player = {"responseContext": {}, "playabilityStatus": {"status": "OK"},
+              "streamingData": {"formats": [{"itag": k, "url": "https://rr1---sn.googlevideo.com/videoplayback?expire=1&id=" + "q" * 80}
+                                            for k in range(40)]},
+              "videoDetails": {"videoId": video_id(0), "title": TITLES[0], "lengthSeconds": "902", "channelId": CHANNEL_ID,
+                               "shortDescription": description, "isCrawlable": True,
+                               "thumbnail": {"thumbnails": [{"url": f"https://i.ytimg.com/vi/{video_id(0)}/default.jpg"}]},
+                               "viewCount": "1234567", "author": "Example Channel"},
+              "microformat": {"playerMicroformatRenderer": {"title": {"simpleText": TITLES[0]},
+                                                            "description": {"simpleText": description}, "lengthSeconds": "902"}}}
+    data = {"contents": {"twoColumnWatchNextResults": {"results": {"results": {"contents": [
+        {"videoSecondaryInfoRenderer": {"attributedDescription": {"content": description}}}]}}}}}
+    before = (f"<script nonce=\"abc\">var ytInitialPlayerResponse = "
+              f"{json.dumps(player, separators=(',', ':'), ensure_ascii=False)};var meta = document.createElement('meta');</script>")
+    return youtube_page("ytInitialData", data, before)
+
+
+class ResultPages:
+    """Search result pages built from a seeded stream of words"""
+
+    def __init__(self, seed=12):
+        self.rng = random.Random(seed)
+
+    def sentence(self, words=None):
+        words = words or self.rng.randint(8, 22)
+        text = ' '.join(self.rng.choice(WORDS) for _ in range(words))
+        return text[0].upper() + text[1:] + '.'
+
+    def paragraph(self, sentences=None):
+        return ' '.join(self.sentence() for _ in range(sentences or self.rng.randint(3, 7)))
+
+    def script(self, kb):
+        body = ';\n'.join(f"var cfg{i} = {json.dumps({'id': i, 'flags': [self.rng.random() for _ in range(6)], 'name': self.sentence(4)})}"
+                          for i in range(kb * 6))
+        return f"<script>{body}</script>"
+
+    def style(self, kb):
+        return "<style>" + '\n'.join(f".c{i} {{ color: #{self.rng.randrange(16**6):06x}; margin: {i % 17}px; font-family: Helvetica, Arial, sans-serif; }}"
+                                     for i in range(kb * 12)) + "</style>"
+
+    def nav(self):
+        return "<nav><ul>" + ''.join(f'<li><a href="/section/{word}">{word.title()}</a></li>' for word in self.rng.sample(WORDS, 12)) + "</ul></nav>"
+
+    def news_article(self):
+        parts = ['<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>YouTuber builds 100 homes and gives them away to families</title>',
+                 self.style(6), self.script(20),
+                 '<script type="application/ld+json">' + json.dumps({"@type": "NewsArticle", "headline": "YouTuber builds 100 homes", "author": {"name": "Staff"}})
+                 + '</script></head><body>',
+                 '<header class="site-header">', self.nav(), '</header><main><article><h1>YouTuber builds 100 homes and gives them away to families</h1>',
+                 '<p class="byline">By Staff Reporter &middot; Updated 2 hours ago</p>']
+        for i in range(40):
+            parts.append(f'<p>{self.paragraph()}</p>')
+            if i % 8 == 7:
+                parts.append(f'<aside class="ad">{self.script(1)}<div class="ad-slot">Advertisement</div></aside>')
+        parts += ['</article></main><footer>', self.nav(), '<p>&copy; 2026 Example News &amp; Media</p></footer>', self.script(8), '</body></html>']
+        return ''.join(parts)
+
+    def blog_post(self):
+        parts = ['<html><head><title>What it really takes to build 100 houses</title>', self.style(2), '</head><body><div id="app">',
+                 '<h1>What it really takes to build 100 houses</h1>']
+        for i in range(12):
+            parts.append(f'<h2>{self.sentence(5)}</h2><p>{self.paragraph()}</p>'
+                         f'<p><em>{self.sentence()}</em> <a href="https://example.org/{i}">{self.sentence(3)}</a></p>')
+        parts.append('<section class="comments">')
+        for i in range(30):
+            parts.append(f'<div class="comment"><span class="author">user{i}</span><p>{self.sentence()}</p></div>')
+        parts += ['</section></div>', self.script(4), '</body></html>']
+        return ''.join(parts)
+
+    def encyclopedia(self):
+        parts = ['<!DOCTYPE html><html><head><title>Housing charity projects - Encyclopedia</title>', self.style(10), self.script(6), '</head><body>',
+                 '<div id="content"><h1>Housing charity projects</h1><div id="toc"><ul>']
+        parts += [f'<li><a href="#s{i}">{i + 1} {self.sentence(3)}</a></li>' for i in range(25)]
+        parts.append('</ul></div>')
+        for i in range(25):
+            parts.append(f'<h2 id="s{i}">{self.sentence(3)}</h2>')
+            for _ in range(5):
+                parts.append(f'<p>{self.paragraph()}<sup class="reference">'
+                             f'<a href="#cite{self.rng.randint(1, 300)}">[{self.rng.randint(1, 300)}]</a></sup></p>')
+            parts.append('<table class="wikitable"><tr><th>Year</th><th>Homes</th><th>Region</th><th>Notes</th></tr>')
+            parts += [f'<tr><td>{2000 + row}</td><td>{self.rng.randint(1, 500)}</td><td>{self.rng.choice(WORDS).title()}</td>'
+                      f'<td>{self.sentence(6)}</td></tr>' for row in range(12)]
+            parts.append('</table><ul>' + ''.join(f'<li>{self.sentence()}</li>' for _ in range(8)) + '</ul>')
+        parts.append('<ol class="references">' + ''.join(f'<li id="cite{i}">{self.sentence(10)} <a href="https://example.com/ref/{i}">Archived</a></li>'
+                                                         for i in range(300)) + '</ol>')
+        parts += ['</div>', self.script(4), '</body></html>']
+        return ''.join(parts)
+
+    def forum_thread(self):
+        parts = ['<html><head><title>Thread: anyone else watch the 100 homes video?</title>', self.style(3), self.script(5),
+                 '</head><body><div class="forum">']
+        for i in range(60):
+            parts.append(f'<div class="post"><div class="meta"><div class="user"><div class="name">member{i}</div><div class="rank">Regular</div></div>'
+                         f'<div class="date">2026-10-{1 + i % 28:02d}</div></div><div class="body"><div class="quote"><div>{self.sentence()}</div></div>'
+                         f'<div class="text">{self.paragraph(2)}</div></div><div class="actions"><a>Reply</a> <a>Quote</a> <a>Report</a></div></div>')
+        parts += ['</div>', self.script(2), '</body></html>']
+        return ''.join(parts)
+
+    def minimal(self):
+        return f'<html><head><title>Short note</title></head><body><p>{self.paragraph(2)}</p></body></html>'
+
+
+def generate():
+    """
+    Build every generated fixture.
+
+    Returns:
+        dict: Page text keyed on its path relative to tests/fixtures
+    """
+    pages = {
+        'youtube/channel_videos.html': channel_videos_page(),
+        'youtube/watch.html': watch_page(),
+    }
+    # The pages share one seeded stream, so they are built in a fixed order
+    result_pages = ResultPages()
+    for name in ('news_article', 'blog_post', 'encyclopedia', 'forum_thread', 'minimal'):
+        pages[f'pages/{name}.html'] = getattr(result_pages, name)()
+    return pages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate the synthetic test and benchmark pages')
+    parser.add_argument('--output', type=Path, default=FIXTURES, help='Fixtures directory (default: tests/fixtures)')
+    args = parser.parse_args(argv)
+
+    for name, page in generate().items():
+        path = args.output / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(page, encoding='utf-8')
+        print(f"{name}: {len(page.encode('utf-8'))} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for YouTube and a search service, for load testing.
+
+Serves synthetic channel pages, watch pages and channel feeds shaped like
+YouTube's, a JSON search endpoint (see web_search.HttpSearchBackend) and
+result pages taken from tests/fixtures/pages. Latency, error rates, 429
+responses and upload churn are configurable. Point the tracker at it with
+YOUTUBE_BASE_URL and SEARCH_BACKEND_URL.
+
+Usage:
+    python benchmarks/standin_server.py --port 8800 --latency-ms 50 --churn 0.05
+
+Control endpoints:
+    POST /_control/advance  start the next cycle; a share of channels upload (--churn)
+    GET  /_control/stats    request counts by route and status
+"""
+
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from dataclasses import dataclass, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+PAGE_FIXTURES = Path(__file__).parent.parent / 'tests' / 'fixtures' / 'pages'
+
+WORDS = ("homes family community build charity challenge giveaway episode creator viewers "
+         "million kitchen garden school water solar design project volunteers surprise").split()
+
+
+@dataclass
+class StandinConfig:
+    latency_ms: float = 20.0
+    jitter_ms: float = 10.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: int = 1
+    churn: float = 0.05
+    burst: int = 1
+    videos_per_page: int = 30
+    page_padding_kb: int = 300
+    results_per_query: int = 5
+    result_urls: int = 5000
+    seed: int = 1
+
+
+def _unit(*parts):
+    """Deterministic float in [0, 1) for the given parts"""
+    digest = hashlib.blake2b(':'.join(map(str, parts)).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2 ** 64
+
+
+def _token(*parts, length=11):
+    alphabet = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+    digest = hashlib.blake2b(':'.join(map(str, parts)).encode(), digest_size=length).digest()
+    return ''.join(alphabet[byte % 64] for byte in digest)
+
+
+class Standin:
+    """State and page generation, independent of the HTTP layer"""
+
+    def __init__(self, config=None, result_pages=None):
+        self.config = config or StandinConfig()
+        self.result_pages = result_pages or [path.read_bytes() for path in sorted(PAGE_FIXTURES.glob('*.html'))]
+        self.epoch = 0
+        self.stats = Counter()
+        self._versions = {}  # channel_id -> (epoch, number of uploads)
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.config.seed)
+        # Real channel pages carry hundreds of KB of unrelated script
+        filler = json.dumps({'config': ['x' * 1000] * self.config.page_padding_kb})
+        self._padding = f"<script>var ytcfg = {filler};</script>".encode()
+
+    def advance(self):
+        with self._lock:
+            self.epoch += 1
+            return self.epoch
+
+    def uploads(self, channel_id):
+        """Number of videos the channel has uploaded by the current epoch"""
+        with self._lock:
+            epoch, count = self._versions.get(channel_id, (0, 1))
+            for step in range(epoch + 1, self.epoch + 1):
+                if _unit(self.config.seed, channel_id, step) < self.config.churn:
+                    count += self.config.burst
+            self._versions[channel_id] = (self.epoch, count)
+            return count
+
+    def video_id(self, channel_id, number):
+        return _token(self.config.seed, channel_id, number)
+
+    def _title(self, video_id):
+        rng = random.Random(video_id)
+        return ' '.join(rng.choice(WORDS) for _ in range(6)).title()
+
+    def _description(self, video_id):
+        rng = random.Random(video_id + 'description')
+        return ' '.join(rng.choice(WORDS) for _ in range(150))
+
+    def channel_page(self, channel_id):
+        latest = self.uploads(channel_id)
+        items = []
+        for number in range(latest, max(0, latest - self.config.videos_per_page), -1):
+            video_id = self.video_id(channel_id, number)
+            items.append({'richItemRenderer': {'content': {'videoRenderer': {
+                'videoId': video_id,
+                'title': {'runs': [{'text': self._title(video_id)}]},
+                'thumbnail': {'thumbnails': [{'url': f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg", 'width': 480}]},
+                'publishedTimeText': {'simpleText': f"{latest - number + 1} days ago"},
+            }}}})
+        data = {'contents': {'twoColumnBrowseResultsRenderer': {'tabs': [
+            {'tabRenderer': {'title': 'Videos', 'content': {'richGridRenderer': {'contents': items}}}}
+        ]}}}
+        return (b'<!DOCTYPE html><html><head><title>Channel</title></head><body>' + self._padding +
+                b'<script>var ytInitialData = ' + json.dumps(data).encode() + b';</script></body></html>')
+
+    def watch_page(self, video_id):
+        player = {'videoDetails': {'videoId': video_id, 'title': self._title(video_id),
+                                   'shortDescription': self._description(video_id)}}
+        return (b'<!DOCTYPE html><html><head><title>Watch</title></head><body>' + self._padding +
+                b'<script>var ytInitialPlayerResponse = ' + json.dumps(player).encode() + b';</script></body></html>')
+
+    def feed(self, channel_id):
+        latest = self.uploads(channel_id)
+        entries = ''.join(
+            f"<entry><yt:videoId>{self.video_id(channel_id, number)}</yt:videoId><title>Video</title></entry>"
+            for number in range(latest, max(0, latest - 15), -1)
+        )
+        body = ('<?xml version="1.0" encoding="UTF-8"?><feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" '
+                f'xmlns="http://www.w3.org/2005/Atom">{entries}</feed>').encode()
+        return body, f'"{channel_id}-{latest}"'
+
+    def search(self, base_url, query, num_results):
+        results = []
+        for index in range(num_results):
+            page = int(_unit(self.config.seed, query, index) * self.config.result_urls)
+            results.append({
+                'url': f"{base_url}/page/{page}",
+                'title': f"Result {page}",
+                'description': f"Snippet for {query[:40]}",
+            })
+        return json.dumps({'results': results}).encode()
+
+    def result_page(self, number):
+        return self.result_pages[number % len(self.result_pages)]
+
+    def fault(self):
+        """Pick an injected failure status for a request, or None"""
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.config.throttle_rate:
+            return 429
+        if roll < self.config.throttle_rate + self.config.error_rate:
+            return 500
+        return None
+
+    def delay(self):
+        with self._lock:
+            jitter = self._rng.uniform(0, self.config.jitter_ms)
+        return (self.config.latency_ms + jitter) / 1000
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def standin(self):
+        return self.server.standin
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, route, status, body=b'', content_type='text/html; charset=utf-8', headers=None):
+        self.standin.stats[f"{route} {status}"] += 1
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.path == '/_control/advance':
+            self._send('control', 200, json.dumps({'epoch': self.standin.advance()}).encode(), 'application/json')
+        else:
+            self._send('control', 404)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = url.path.strip('/').split('/')
+        query = parse_qs(url.query)
+
+        if url.path == '/_control/stats':
+            body = json.dumps({'epoch': self.standin.epoch, 'requests': dict(self.standin.stats)}).encode()
+            return self._send('control', 200, body, 'application/json')
+
+        route = {'channel': 'channel', 'watch': 'watch', 'feeds': 'feed', 'search': 'search', 'page': 'page'}.get(parts[0])
+        if route is None:
+            return self._send('unknown', 404)
+
+        time.sleep(self.standin.delay())
+        status = self.standin.fault()
+        if status == 429:
+            return self._send(route, 429, b'Too Many Requests', headers={'Retry-After': str(self.standin.config.retry_after)})
+        if status:
+            return self._send(route, status, b'Internal Server Error')
+
+        if route == 'channel' and len(parts) >= 2:
+            return self._send(route, 200, self.standin.channel_page(parts[1]))
+        if route == 'watch' and 'v' in query:
+            return self._send(route, 200, self.standin.watch_page(query['v'][0]))
+        if route == 'feed' and 'channel_id' in query:
+            body, etag = self.standin.feed(query['channel_id'][0])
+            if self.headers.get('If-None-Match') == etag:
+                return self._send(route, 304, headers={'ETag': etag})
+            return self._send(route, 200, body, 'application/atom+xml', {'ETag': etag})
+        if route == 'search' and 'q' in query:
+            base_url = f"http://{self.headers.get('Host')}"
+            num_results = int(query.get('num', [self.standin.config.results_per_query])[0])
+            return self._send(route, 200, self.standin.search(base_url, query['q'][0], num_results), 'application/json')
+        if route == 'page' and len(parts) == 2 and parts[1].isdigit():
+            return self._send(route, 200, self.standin.result_page(int(parts[1])))
+        return self._send(route, 404)
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address, standin):
+        super().__init__(address, StandinHandler)
+        self.standin = standin
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_server(config=None, host='127.0.0.1', port=0):
+    """
+    Start a stand-in server on a background thread.
+
+    Returns:
+        StandinServer: Running server; call shutdown() to stop it
+    """
+    server = StandinServer((host, port), Standin(config))
+    threading.Thread(target=server.serve_forever, name='standin-server', daemon=True).start()
+    return server
+
+
+def add_config_arguments(parser):
+    defaults = StandinConfig()
+    parser.add_argument('--latency-ms', type=float, default=defaults.latency_ms, help='Base response latency')
+    parser.add_argument('--jitter-ms', type=float, default=defaults.jitter_ms, help='Random latency added on top')
+    parser.add_argument('--error-rate', type=float, default=defaults.error_rate, help='Share of requests answered with 500')
+    parser.add_argument('--throttle-rate', type=float, default=defaults.throttle_rate, help='Share of requests answered with 429')
+    parser.add_argument('--retry-after', type=int, default=defaults.retry_after, help='Retry-After seconds sent with 429')
+    parser.add_argument('--churn', type=float, default=defaults.churn, help='Share of channels uploading per cycle')
+    parser.add_argument('--burst', type=int, default=defaults.burst, help='Videos a channel uploads at once')
+    parser.add_argument('--page-padding-kb', type=int, default=defaults.page_padding_kb, help='Filler script per YouTube page')
+    parser.add_argument('--result-urls', type=int, default=defaults.result_urls, help='Distinct result page URLs')
+    parser.add_argument('--seed', type=int, default=defaults.seed, help='Seed for synthetic data and faults')
+
+
+def config_from_args(args):
+    return StandinConfig(**{name: getattr(args, name) for name in asdict(StandinConfig()) if hasattr(args, name)})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve a local YouTube and search stand-in')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8800, help='Port to bind, 0 for any free port (default: 8800)')
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = StandinServer((args.host, args.port), Standin(config_from_args(args)))
+    # The load driver reads the address from this line
+    print(f"listening on {server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+"""
+Offline micro-benchmarks for the tracker's hot paths.
+
+Every case runs against the synthetic pages in tests/fixtures (generated by
+benchmarks/make_fixtures.py) with stub HTTP clients and a temporary SQLite
+database, so no network access is needed and results can be compared
+between commits.
+
+Usage:
+    python benchmarks/suite.py --output bench.json
+    python benchmarks/suite.py --compare baseline.json --threshold 0.15
+"""
+
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+# Add src directory to Python path
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from src.youtube_tracker import tracker
+from src.youtube_tracker.channels import ChannelRegistry, import_channels, record_channel_checks
+from src.youtube_tracker.extractor import extract_channel_videos, extract_video_description
+from src.youtube_tracker.governor import Governor
+from src.youtube_tracker.history import encode_cursor, list_history
+from src.youtube_tracker.migrations import migrate
+from src.youtube_tracker.models import Channel, LatestVideo, ProcessedVideo
+from src.youtube_tracker.persistence import chunked, load_web_search_results, save_cycle_results
+from src.youtube_tracker.rate_limit import HostRateLimiter
+from src.youtube_tracker import summarizer
+from src.youtube_tracker.read_api import LatestVideoSnapshot
+from src.youtube_tracker.web_search import WebSearcher
+
+FIXTURES = ROOT / 'tests' / 'fixtures'
+YOUTUBE_FIXTURES = FIXTURES / 'youtube'
+PAGE_FIXTURES = FIXTURES / 'pages'
+
+# Version of the JSON result layout
+SCHEMA_VERSION = 1
+
+CHANNEL_ID = 'UCbenchmark'
+DB_ROWS = 1000
+HISTORY_ROWS = 100_000
+HISTORY_CHANNELS = 100
+HISTORY_PAGE = 50
+REGISTRY_CHANNELS = 20_000
+SUMMARY_VIDEOS = 256
+
+CASES = {}
+
+
+def case(name):
+    """
+    Register a benchmark. The decorated function is a context manager that
+    yields (callable, items per call); setup and teardown are not timed.
+    """
+    def register(func):
+        CASES[name] = contextmanager(func)
+        return func
+    return register
+
+
+class StubResponse:
+    def __init__(self, body, status_code=200):
+        self.content = body
+        self.status_code = status_code
+        self.headers = {'Content-Type': 'text/html; charset=utf-8'}
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class StubHttpClient:
+    """Serve fixture pages by URL instead of going to the network"""
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def get(self, url, **kwargs):
+        return StubResponse(self.pages[url])
+
+
+def result_pages():
+    return {path.stem: path.read_bytes() for path in sorted(PAGE_FIXTURES.glob('*.html'))}
+
+
+def page_searcher(pages, page_context_mode='stream'):
+    """WebSearcher serving the given pages with caching and throttling out of the way"""
+    return WebSearcher(
+        http_client=StubHttpClient(pages),
+        cache=False,
+        page_cache=False,
+        rate_limiter=HostRateLimiter(rate=1e9, burst=1e9),
+        page_context_mode=page_context_mode,
+    )
+
+
+@case('youtube.get_latest_video')
+def bench_get_latest_video():
+    channel = (YOUTUBE_FIXTURES / 'channel_videos.html').read_bytes()
+    video_id = extract_channel_videos(channel)[0].video_id
+    client = StubHttpClient({
+        f"https://www.youtube.com/channel/{CHANNEL_ID}/videos": channel,
+        f"https://www.youtube.com/watch?v={video_id}": (YOUTUBE_FIXTURES / 'watch.html').read_bytes(),
+    })
+    with patch.object(tracker, 'perform_web_search', return_value=[]):
+        yield lambda: tracker.get_latest_video(CHANNEL_ID, http_client=client), 1
+
+
+@case('youtube.extract_channel_videos')
+def bench_extract_channel_videos():
+    body = (YOUTUBE_FIXTURES / 'channel_videos.html').read_bytes()
+    yield lambda: extract_channel_videos(body), 1
+
+
+@case('youtube.extract_video_description')
+def bench_extract_video_description():
+    body = (YOUTUBE_FIXTURES / 'watch.html').read_bytes()
+    yield lambda: extract_video_description(body), 1
+
+
+@case('governor.call')
+def bench_governor_call():
+    # Bookkeeping the governor adds to every YouTube request
+    governor = Governor()
+    response = StubResponse(b'')
+    yield lambda: governor.call('youtube', lambda: response), 1
+
+
+def _page_context_case(name):
+    def bench():
+        url = f"https://example.com/{name}"
+        searcher = page_searcher({url: result_pages()[name]})
+        yield lambda: searcher.get_page_context(url), 1
+    return bench
+
+
+for _page in result_pages():
+    case(f"page_context.{_page}")(_page_context_case(_page))
+
+
+def _page_context_corpus_case(page_context_mode):
+    def bench():
+        pages = {f"https://example.com/{name}": body for name, body in result_pages().items()}
+        searcher = page_searcher(pages, page_context_mode)
+
+        def run():
+            for url in pages:
+                searcher.get_page_context(url)
+        yield run, len(pages)
+    return bench
+
+
+case('page_context.corpus')(_page_context_corpus_case('stream'))
+# Whole-page BeautifulSoup parsing (PAGE_CONTEXT_MODE=full) for comparison
+case('page_context_full.corpus')(_page_context_corpus_case('full'))
+
+
+def video_search_results():
+    """Per video, the fixture result pages as search results, in a different order each"""
+    searcher = page_searcher({f"https://example.com/{name}": body for name, body in result_pages().items()})
+    results = [{'url': url, 'title': url, 'snippet': '', 'context': searcher.get_page_context(url)}
+               for url in sorted(searcher.http_client.pages)]
+    return [results[index % len(results):] + results[:index % len(results)] for index in range(SUMMARY_VIDEOS)]
+
+
+@case('summarize.video')
+def bench_summarize_video():
+    # As the enrichment worker runs it, once per completed job
+    results = video_search_results()[0]
+    yield lambda: summarizer.summarize(results, max_chars=600), 1
+
+
+@case('summarize.batch')
+def bench_summarize_batch():
+    # As a backfill runs it
+    videos = video_search_results()
+    yield lambda: summarizer.summarize_batch(videos, max_chars=600), SUMMARY_VIDEOS
+
+
+@case('query.build_search_query')
+def bench_build_search_query():
+    description = extract_video_description((YOUTUBE_FIXTURES / 'watch.html').read_bytes())
+    titles = [video.title for video in extract_channel_videos((YOUTUBE_FIXTURES / 'channel_videos.html').read_bytes())]
+    pairs = [(title, description) for title in titles] * 10
+
+    def run():
+        for title, text in pairs:
+            tracker.build_search_query(title, text)
+    yield run, len(pairs)
+
+
+def video_rows(prefix, version, count=DB_ROWS):
+    return [
+        {
+            'channel_id': f"{prefix}{index:05d}",
+            'video_id': f"{prefix}{index:05d}-{version}",
+            'title': f"Video {index} version {version}",
+            'url': f"https://www.youtube.com/watch?v={prefix}{index:05d}-{version}",
+            'thumbnail': f"https://i.ytimg.com/vi/{prefix}{index:05d}-{version}/hqdefault.jpg",
+            'description': 'Synthetic description ' * 10,
+            'web_search_results': [{'url': 'https://example.com', 'title': 'Result', 'snippet': 'Snippet', 'context': 'Context ' * 50}],
+        }
+        for index in range(count)
+    ]
+
+
+@contextmanager
+def sqlite_session():
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{Path(directory) / 'bench.db'}")
+        migrate(engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            yield db
+        finally:
+            db.close()
+            engine.dispose()
+
+
+def _save(db, videos):
+    save_cycle_results(db, videos)
+    db.commit()
+
+
+@case('db.save_cycle.insert')
+def bench_save_insert():
+    with sqlite_session() as db:
+        batches = iter(range(1_000_000))
+        # New channels every call so each run inserts DB_ROWS rows
+        yield lambda: _save(db, video_rows(f"new{next(batches)}-", 0)), DB_ROWS
+
+
+@case('db.save_cycle.replace')
+def bench_save_replace():
+    with sqlite_session() as db:
+        _save(db, video_rows('ch', 0))
+        versions = iter(range(1, 1_000_000))
+        yield lambda: _save(db, video_rows('ch', next(versions))), DB_ROWS
+
+
+@case('db.save_cycle.unchanged')
+def bench_save_unchanged():
+    with sqlite_session() as db:
+        videos = video_rows('ch', 0)
+        _save(db, videos)
+        yield lambda: _save(db, videos), DB_ROWS
+
+
+@contextmanager
+def history_session():
+    """SQLite database with HISTORY_ROWS history rows spread over HISTORY_CHANNELS channels"""
+    with sqlite_session() as db:
+        start = datetime(2024, 1, 1)
+        rows = [
+            {
+                'channel_id': f"ch{index % HISTORY_CHANNELS:03d}",
+                'video_id': f"h{index:07d}",
+                'title': f"Video {index}",
+                'url': f"https://www.youtube.com/watch?v=h{index:07d}",
+                'thumbnail': f"https://i.ytimg.com/vi/h{index:07d}/hqdefault.jpg",
+                'description': 'Synthetic description ' * 10,
+                'processed_at': start + timedelta(minutes=index),
+                'action': 'replaced',
+            }
+            for index in range(HISTORY_ROWS)
+        ]
+        for chunk in chunked(rows, 10000):
+            db.execute(ProcessedVideo.__table__.insert(), chunk)
+        db.commit()
+        yield db
+
+
+def _history_cursor(index):
+    """Cursor of the index-th inserted history row (ids start at 1)"""
+    return encode_cursor(datetime(2024, 1, 1) + timedelta(minutes=index), index + 1)
+
+
+@case('db.history.channel_page')
+def bench_history_channel_page():
+    with history_session() as db:
+        # Half way down one channel's history, where OFFSET would scan every skipped row
+        cursor = _history_cursor(HISTORY_ROWS // 2 + 7)
+        yield lambda: list_history(db, channel_id='ch007', limit=HISTORY_PAGE, cursor=cursor), HISTORY_PAGE
+
+
+@case('db.history.time_range_page')
+def bench_history_time_range_page():
+    with history_session() as db:
+        cursor = _history_cursor(HISTORY_ROWS // 4)
+        yield lambda: list_history(db, limit=HISTORY_PAGE, cursor=cursor), HISTORY_PAGE
+
+
+def _query_latest_videos(db):
+    # What a consumer reading the table directly does for every poll
+    rows = db.query(LatestVideo).all()
+    load_web_search_results(db, [row.video_id for row in rows])
+    return rows
+
+
+@case('db.latest_videos.query')
+def bench_latest_videos_query():
+    with sqlite_session() as db:
+        _save(db, video_rows('ch', 0))
+        yield lambda: _query_latest_videos(db), DB_ROWS
+
+
+@contextmanager
+def read_snapshot():
+    with sqlite_session() as db:
+        _save(db, video_rows('ch', 0))
+        # Changed well before the refresh overlap, as in steady state
+        db.execute(update(LatestVideo).values(updated_at=datetime(2024, 1, 1)))
+        db.commit()
+        _save(db, video_rows('recent', 0, count=1))
+        snapshot = LatestVideoSnapshot(sessionmaker(bind=db.get_bind()), refresh_interval=60)
+        snapshot.refresh()
+        yield snapshot
+
+
+@case('read_api.videos')
+def bench_read_api_videos():
+    with read_snapshot() as snapshot:
+        yield snapshot.get_videos, DB_ROWS
+
+
+@case('read_api.refresh_unchanged')
+def bench_read_api_refresh_unchanged():
+    # The only database load of the read API between changes
+    with read_snapshot() as snapshot:
+        yield snapshot.refresh, DB_ROWS
+
+
+@contextmanager
+def channel_table(count):
+    with sqlite_session() as db:
+        import_channels(db, [{'channel_id': f'UC{index:022d}', 'priority': index % 3} for index in range(count)])
+        # Changed well before the reload overlap, as in steady state
+        db.execute(update(Channel).values(updated_at=datetime(2024, 1, 1)))
+        import_channels(db, [{'channel_id': 'UCrecent'}])
+        db.commit()
+        yield db
+
+
+@case('channels.reload_unchanged')
+def bench_channels_reload_unchanged():
+    # What a running tracker pays every CHANNEL_RELOAD_INTERVAL between imports
+    with channel_table(REGISTRY_CHANNELS) as db:
+        registry = ChannelRegistry(sessionmaker(bind=db.get_bind()), reload_interval=0)
+        registry.reload()
+        yield registry.reload, REGISTRY_CHANNELS
+
+
+@case('db.channel_checks')
+def bench_db_channel_checks():
+    with channel_table(DB_ROWS) as db:
+        channel_ids = [f'UC{index:022d}' for index in range(DB_ROWS)]
+        changed = set(channel_ids[::10])
+
+        def record():
+            record_channel_checks(db, channel_ids, changed)
+            db.commit()
+        yield record, DB_ROWS
+
+
+def measure(func, iterations, warmup=1):
+    """
+    Time repeated calls of func.
+
+    Returns:
+        list: Wall time of each timed call in seconds
+    """
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarize(timings, items):
+    median = statistics.median(timings)
+    return {
+        'iterations': len(timings),
+        'items': items,
+        'min_s': min(timings),
+        'median_s': median,
+        'mean_s': statistics.fmean(timings),
+        'stdev_s': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        'items_per_s': items / median if median else None,
+    }
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        return commit, bool(status.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def select_cases(patterns=None):
+    if not patterns:
+        return list(CASES)
+    return [name for name in CASES if any(pattern in name for pattern in patterns)]
+
+
+def run_suite(names=None, iterations=20, warmup=1):
+    """
+    Run the selected benchmarks and return a JSON-serializable report.
+    """
+    commit, dirty = git_revision()
+    report = {
+        'schema': SCHEMA_VERSION,
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'benchmarks': {},
+    }
+    for name in names or CASES:
+        with CASES[name]() as (func, items):
+            report['benchmarks'][name] = summarize(measure(func, iterations, warmup), items)
+    return report
+
+
+def compare(report, baseline, threshold=0.1):
+    """
+    Compare median times with a baseline report.
+
+    Returns:
+        list: (name, baseline median, current median, ratio, status) per
+        benchmark present in both, status being regression, improvement or same
+    """
+    rows = []
+    for name, current in report['benchmarks'].items():
+        previous = baseline.get('benchmarks', {}).get(name)
+        if not previous or not previous['median_s']:
+            continue
+        ratio = current['median_s'] / previous['median_s']
+        if ratio > 1 + threshold:
+            status = 'regression'
+        elif ratio < 1 - threshold:
+            status = 'improvement'
+        else:
+            status = 'same'
+        rows.append((name, previous['median_s'], current['median_s'], ratio, status))
+    return rows
+
+
+def print_report(report):
+    print(f"commit {report['commit'] or 'unknown'}{' (dirty)' if report['dirty'] else ''}, Python {report['python']}")
+    print(f"{'benchmark':<36}{'median ms':>12}{'min ms':>10}{'stdev ms':>10}{'items/s':>12}")
+    for name, result in report['benchmarks'].items():
+        print(f"{name:<36}{result['median_s'] * 1000:>12.3f}{result['min_s'] * 1000:>10.3f}"
+              f"{result['stdev_s'] * 1000:>10.3f}{result['items_per_s']:>12.1f}")
+
+
+def print_comparison(rows):
+    print(f"\n{'benchmark':<36}{'baseline ms':>12}{'current ms':>12}{'ratio':>8}  status")
+    for name, previous, current, ratio, status in rows:
+        print(f"{name:<36}{previous * 1000:>12.3f}{current * 1000:>12.3f}{ratio:>8.2f}  {status}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the offline benchmark suite')
+    parser.add_argument('--iterations', type=int, default=20, help='Timed iterations per benchmark (default: 20)')
+    parser.add_argument('--warmup', type=int, default=1, help='Untimed iterations per benchmark (default: 1)')
+    parser.add_argument('--filter', action='append', help='Only run benchmarks whose name contains this text (repeatable)')
+    parser.add_argument('--list', action='store_true', help='List benchmarks and exit')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--compare', help='Baseline JSON report to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Relative slowdown of the median reported as a regression (default: 0.1)')
+    args = parser.parse_args(argv)
+
+    names = select_cases(args.filter)
+    if args.list:
+        print('\n'.join(names))
+        return 0
+    if not names:
+        parser.error('no benchmark matches --filter')
+
+    report = run_suite(names, args.iterations, args.warmup)
+    print_report(report)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + '\n', encoding='utf-8')
+        print(f"\nReport written to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding='utf-8'))
+        rows = compare(report, baseline, args.threshold)
+        print_comparison(rows)
+        if any(row[4] == 'regression' for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
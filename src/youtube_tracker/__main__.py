@@ -1,7 +1,211 @@
 """
 Entry point for the YouTube Tracker service
+
+Commands:
+    run       Run the tracker on its schedule (default)
+    run-once  Run a single update cycle, enrich its new videos and exit
+    enrich    Drain the web search enrichment queue
+    channels  Import, list, enable or disable tracked channels
+    history   List replaced videos, newest first, a page at a time
+    prune-history  Delete history older than the retention period
+    summarize Summarize the search results of stored videos
+    serve     Serve the read API for the latest videos
+    migrate   Create or update the database schema and exit
 """
-from youtube_tracker.tracker import main
+import os
+import sys
+import json
+import argparse
+import threading
+from datetime import datetime, timedelta
+from youtube_tracker.app import get_app
+from youtube_tracker.logging_config import setup_logging
+
+
+def print_history(args):
+    from youtube_tracker.history import InvalidCursor, iter_history, list_history
+
+    filters = {'channel_id': args.channel, 'since': args.since, 'until': args.until,
+               'limit': args.limit, 'include_results': args.results}
+    db = get_app().session()
+    try:
+        if args.all:
+            items, next_cursor = iter_history(db, **filters), None
+        else:
+            items, next_cursor = list_history(db, cursor=args.cursor, **filters)
+        for item in items:
+            if args.format == 'jsonl':
+                print(json.dumps(item, default=str, ensure_ascii=False))
+            else:
+                print(f"{item['processed_at'].isoformat(sep=' ', timespec='seconds')}  {item['channel_id']}  "
+                      f"{item['video_id']}  {item['title']}")
+    except InvalidCursor as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    finally:
+        db.close()
+    if next_cursor:
+        # On stderr so that stdout holds only rows
+        print(f"next cursor: {next_cursor}", file=sys.stderr)
+    return 0
+
+
+def manage_channels(args):
+    from youtube_tracker.channels import CHANNEL_FIELDS, import_channels, read_channel_file, set_channels_enabled
+    from youtube_tracker.models import Channel
+
+    if args.action == 'import':
+        channels, errors = read_channel_file(args.path, args.format)
+        if errors:
+            # Nothing is imported from a file with errors, so it can be fixed and imported again
+            for error in errors[:20]:
+                print(error, file=sys.stderr)
+            if len(errors) > 20:
+                print(f"... and {len(errors) - 20} more errors", file=sys.stderr)
+            return 2
+
+    db = get_app().session()
+    try:
+        if args.action == 'import':
+            counts = import_channels(db, channels, disable_missing=args.disable_missing)
+            db.commit()
+            print(f"Imported {len(channels)} channels: {counts['added']} added, {counts['updated']} updated, "
+                  f"{counts['unchanged']} unchanged, {counts['disabled']} disabled")
+        elif args.action in ('enable', 'disable'):
+            changed = set_channels_enabled(db, args.channel_ids, args.action == 'enable')
+            db.commit()
+            print(f"{args.action.capitalize()}d {changed} channels")
+        else:
+            query = db.query(Channel).order_by(Channel.priority.desc(), Channel.channel_id)
+            if not args.all:
+                query = query.filter(Channel.enabled.is_(True))
+            for channel in query.yield_per(1000):
+                if args.format == 'jsonl':
+                    item = {field: getattr(channel, field)
+                            for field in CHANNEL_FIELDS + ('last_checked_at', 'last_changed_at')}
+                    print(json.dumps(item, default=str, ensure_ascii=False))
+                else:
+                    checked = channel.last_checked_at.isoformat(sep=' ', timespec='seconds') \
+                        if channel.last_checked_at else '-'
+                    print(f"{channel.channel_id}  {'enabled' if channel.enabled else 'disabled'}  "
+                          f"{channel.priority}  {checked}  {channel.title or ''}")
+    finally:
+        db.close()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='youtube_tracker', description='Track the latest videos of YouTube channels')
+    subparsers = parser.add_subparsers(dest='command')
+    run_parser = subparsers.add_parser('run', help='Run the tracker on its schedule (default)')
+    run_once_parser = subparsers.add_parser('run-once', help='Run a single update cycle and exit')
+    for subparser in (run_parser, run_once_parser):
+        subparser.add_argument('--profile-cycles', type=int, default=None,
+                               help='Write cProfile/tracemalloc captures of the first N cycles to PROFILE_DIR')
+    enrich_parser = subparsers.add_parser('enrich', help='Drain the web search enrichment queue')
+    enrich_parser.add_argument('--once', action='store_true', help='Exit once no job is due')
+    channels_parser = subparsers.add_parser('channels', help='Import, list, enable or disable tracked channels')
+    channel_actions = channels_parser.add_subparsers(dest='action', required=True)
+    import_parser = channel_actions.add_parser('import', help='Add or update channels from a CSV or JSONL file')
+    import_parser.add_argument('path', help="File with channel_id, title, enabled and priority columns, or '-'")
+    import_parser.add_argument('--format', choices=['csv', 'jsonl'], default=None,
+                               help='File format (default: from the file extension, else csv)')
+    import_parser.add_argument('--disable-missing', action='store_true', help='Disable channels not in the file')
+    list_parser = channel_actions.add_parser('list', help='List channels, highest priority first')
+    list_parser.add_argument('--all', action='store_true', help='Include disabled channels')
+    list_parser.add_argument('--format', choices=['text', 'jsonl'], default='text', help='Output format')
+    for action in ('enable', 'disable'):
+        action_parser = channel_actions.add_parser(action, help=f'{action.capitalize()} channels')
+        action_parser.add_argument('channel_ids', nargs='+', metavar='CHANNEL_ID')
+    history_parser = subparsers.add_parser('history', help='List replaced videos, newest first')
+    history_parser.add_argument('--channel', help='Only this channel ID')
+    history_parser.add_argument('--since', type=datetime.fromisoformat, help='Processed at or after (UTC, ISO 8601)')
+    history_parser.add_argument('--until', type=datetime.fromisoformat, help='Processed before (UTC, ISO 8601)')
+    history_parser.add_argument('--limit', type=int, default=50, help='Rows per page (default: 50, at most 1000)')
+    history_parser.add_argument('--cursor', help='Continue after the page that printed this cursor')
+    history_parser.add_argument('--all', action='store_true', help='Print every page')
+    history_parser.add_argument('--results', action='store_true', help='Include web search results (jsonl only)')
+    history_parser.add_argument('--format', choices=['text', 'jsonl'], default='text', help='Output format')
+    prune_parser = subparsers.add_parser('prune-history', help='Delete history older than the retention period')
+    prune_parser.add_argument('--days', type=int, default=None, help='Days to keep (default: HISTORY_RETENTION_DAYS)')
+    summarize_parser = subparsers.add_parser('summarize', help='Summarize the search results of stored videos')
+    summarize_parser.add_argument('--overwrite', action='store_true', help='Also videos that have a summary')
+    summarize_parser.add_argument('--batch-size', type=int, default=None,
+                                  help='Videos summarized together (default: DB_BATCH_SIZE)')
+    serve_parser = subparsers.add_parser('serve', help='Serve the read API for the latest videos')
+    serve_parser.add_argument('--port', type=int, default=None, help='Port to listen on (default: READ_API_PORT or 8000)')
+    serve_parser.add_argument('--host', default=None, help='Address to bind (default: READ_API_HOST or 127.0.0.1)')
+    subparsers.add_parser('migrate', help='Create or update the database schema and exit')
+    args = parser.parse_args(argv)
+
+    if args.command == 'migrate':
+        setup_logging()
+        get_app().migrate()
+        return 0
+
+    if args.command == 'channels':
+        return manage_channels(args)
+
+    if args.command == 'history':
+        return print_history(args)
+
+    if args.command == 'prune-history':
+        from youtube_tracker.history import get_retention_days, prune_history
+
+        setup_logging()
+        days = get_retention_days() if args.days is None else args.days
+        if not days:
+            parser.error('set --days or HISTORY_RETENTION_DAYS')
+        db = get_app().session()
+        try:
+            deleted = prune_history(db, datetime.utcnow() - timedelta(days=days))
+        finally:
+            db.close()
+        print(f"Deleted {deleted} history rows older than {days} days")
+        return 0
+
+    if args.command == 'summarize':
+        from youtube_tracker.summarizer import backfill_summaries, get_max_chars
+
+        setup_logging()
+        if not get_max_chars():
+            parser.error('summaries are disabled by SUMMARY_MAX_CHARS=0')
+        counts = backfill_summaries(get_app().session_factory, batch_size=args.batch_size, overwrite=args.overwrite)
+        print(f"Summarized {counts['summarized']} videos, {counts['skipped']} without usable text")
+        return 0
+
+    if args.command == 'serve':
+        from youtube_tracker.read_api import start_read_api
+
+        setup_logging()
+        port = args.port if args.port is not None else int(os.getenv('READ_API_PORT', '0')) or 8000
+        start_read_api(get_app().latest_snapshot, port=port, host=args.host)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        get_app().close()
+        return 0
+
+    # The tracker module is only imported for commands that need it
+    from youtube_tracker import tracker
+
+    profile_cycles = getattr(args, 'profile_cycles', None)
+    if args.command == 'run-once':
+        tracker.startup(profile_cycles)
+        tracker.update_latest_videos()
+        if tracker.get_enrichment_mode() == 'queue':
+            tracker.run_enrichment_worker(once=True)
+        return 0
+
+    if args.command == 'enrich':
+        tracker.startup()
+        tracker.run_enrichment_worker(once=args.once)
+        return 0
+
+    tracker.main(profile_cycles)
+    return 0
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
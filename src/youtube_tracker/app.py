@@ -0,0 +1,177 @@
+"""
+Application context for the YouTube Tracker
+
+Importing the package has no side effects: the database engine, HTTP
+client, web searcher, parse pool, feed probe, channel registry, enrichment
+queue and read snapshot are created the first time they are used, and
+schema migration is a separate, explicit step.
+"""
+import os
+import threading
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from .channels import ChannelRegistry
+from .enrichment import EnrichmentQueue
+from .feed import FeedProbe
+from .history import HistoryPruner
+from .http_client import get_http_client
+from .migrations import migrate
+from .parse_pool import ParsePool
+from .read_api import LatestVideoSnapshot
+from .web_search import WebSearcher
+
+_app = None
+_app_lock = threading.Lock()
+
+
+def get_database_url():
+    """
+    Build the database URL from DATABASE_URL or the DB_* settings.
+    """
+    url = os.getenv('DATABASE_URL')
+    if url:
+        return url
+
+    # Database configuration
+    db_host = os.getenv('DB_HOST', 'localhost')
+    db_port = os.getenv('DB_PORT', '5432')
+    db_name = os.getenv('DB_NAME', 'youtube_tracker')
+    db_user = os.getenv('DB_USER', 'postgres')
+    db_password = os.getenv('DB_PASSWORD', 'postgres')
+    return f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+
+
+class AppContext:
+    def __init__(self, database_url=None):
+        """
+        Hold the tracker's shared resources and create each on first use.
+
+        Args:
+            database_url (str): Database URL, defaults to get_database_url()
+        """
+        self._database_url = database_url
+        self._objects = {}
+        self._lock = threading.RLock()
+
+    def _get(self, name, factory):
+        with self._lock:
+            if name not in self._objects:
+                self._objects[name] = factory()
+            return self._objects[name]
+
+    @property
+    def database_url(self):
+        return self._get('database_url', lambda: self._database_url or get_database_url())
+
+    @property
+    def engine(self):
+        return self._get('engine', lambda: create_engine(self.database_url))
+
+    @property
+    def session_factory(self):
+        return self._get('session_factory', lambda: sessionmaker(autocommit=False, autoflush=False, bind=self.engine))
+
+    def session(self):
+        """
+        Open a new database session.
+        """
+        return self.session_factory()
+
+    @property
+    def http_client(self):
+        return self._get('http_client', get_http_client)
+
+    @property
+    def web_searcher(self):
+        return self._get('web_searcher', lambda: WebSearcher(http_client=self.http_client, parse_pool=self.parse_pool))
+
+    @property
+    def parse_pool(self):
+        return self._get('parse_pool', ParsePool)
+
+    @property
+    def feed_probe(self):
+        return self._get('feed_probe', lambda: FeedProbe(http_client=self.http_client))
+
+    @property
+    def channel_registry(self):
+        return self._get('channel_registry', lambda: ChannelRegistry(self.session_factory))
+
+    @property
+    def enrichment_queue(self):
+        return self._get('enrichment_queue', lambda: EnrichmentQueue(self.session_factory))
+
+    @property
+    def history_pruner(self):
+        return self._get('history_pruner', lambda: HistoryPruner(self.session_factory))
+
+    @property
+    def latest_snapshot(self):
+        return self._get('latest_snapshot', lambda: LatestVideoSnapshot(self.session_factory))
+
+    def notify_latest_videos_changed(self):
+        """
+        Refresh the read API snapshot right away, if this process serves one.
+        """
+        with self._lock:
+            snapshot = self._objects.get('latest_snapshot')
+        if snapshot is not None:
+            snapshot.notify()
+
+    def migrate(self):
+        """
+        Create missing tables, columns and indexes.
+        """
+        migrate(self.engine)
+
+    def close(self):
+        with self._lock:
+            engine = self._objects.pop('engine', None)
+            if engine is not None:
+                engine.dispose()
+            self._objects.pop('session_factory', None)
+            self._objects.pop('channel_registry', None)
+            self._objects.pop('enrichment_queue', None)
+            self._objects.pop('history_pruner', None)
+            snapshot = self._objects.pop('latest_snapshot', None)
+            parse_pool = self._objects.pop('parse_pool', None)
+        if snapshot is not None:
+            snapshot.stop()
+        if parse_pool is not None:
+            parse_pool.close()
+
+
+def create_app(database_url=None, load_env=True):
+    """
+    Create the application context and make it the current one.
+
+    Args:
+        database_url (str): Database URL, defaults to the environment
+        load_env (bool): Load variables from a .env file first
+
+    Returns:
+        AppContext: The new context
+    """
+    global _app
+    if load_env:
+        load_dotenv()
+    app = AppContext(database_url)
+    with _app_lock:
+        if _app is not None:
+            _app.close()
+        _app = app
+    return app
+
+
+def get_app():
+    """
+    Return the current application context, creating a default one if needed.
+    """
+    global _app
+    if _app is None:
+        with _app_lock:
+            if _app is None:
+                load_dotenv()
+                _app = AppContext()
+    return _app
@@ -0,0 +1,391 @@
+"""
+Two-tier caches for web search data and result page contexts
+
+An in-process LRU serves repeated lookups within a run, and a SQLite file
+keeps entries across restarts. Both tiers expire entries after a TTL and
+evict the least recently used entries once they reach their size limit;
+the SQLite tier is swept once every few writes rather than on each one, so
+it may briefly hold a few more entries than its limit.
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = 'cache/web_search.db'
+
+# Query parameters that only track the visitor and never change the page
+TRACKING_PARAMS = {'gclid', 'fbclid', 'mc_cid', 'mc_eid', 'ref_src'}
+
+
+def _env_flag(name, default):
+    return os.getenv(name, default).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        logger.warning("Invalid %s value, using default %s", name, default)
+        return default
+
+
+def normalize_query(query):
+    """
+    Normalize a search query so near-identical queries share a cache entry.
+
+    Unicode compatibility forms are folded, case is ignored, punctuation at
+    word edges is dropped and whitespace is collapsed.
+    """
+    query = unicodedata.normalize('NFKC', query).casefold()
+    words = (word.strip('.,;:!?"\'()[]{}|-–—') for word in query.split())
+    return ' '.join(word for word in words if word)
+
+
+def canonicalize_url(url):
+    """
+    Canonicalize a URL so equivalent links share a cache entry.
+
+    The scheme and host are lowercased, default ports and fragments are
+    dropped, tracking parameters are removed and the query is sorted.
+    """
+    try:
+        parts = urlsplit(url.strip())
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or '').lower()
+        port = parts.port
+    except ValueError:
+        return url
+    netloc = host
+    if port and (scheme, port) not in (('http', 80), ('https', 443)):
+        netloc = f"{host}:{port}"
+    params = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    ]
+    return urlunsplit((scheme, netloc, parts.path or '/', urlencode(sorted(params)), ''))
+
+
+class LRUCache:
+    def __init__(self, max_entries, ttl):
+        """
+        Thread-safe in-memory LRU cache with a TTL.
+
+        Args:
+            max_entries (int): Maximum number of entries kept
+            ttl (float): Seconds before an entry expires
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, stored_at=None):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (stored_at or time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SqliteStore:
+    def __init__(self, path, table, columns, evict_interval=100):
+        """
+        Small key/value table in a SQLite file, opened on first use.
+
+        Args:
+            path (str): Database file path
+            table (str): Table name
+            columns (str): Column definitions after the key column
+            evict_interval (int): Writes between evictions; the first write
+                of a run always evicts
+        """
+        self.path = path
+        self.table = table
+        self.columns = columns
+        self.evict_interval = max(1, evict_interval)
+        self._writes = 0
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def execute(self, sql, params=()):
+        """
+        Run a statement and return all rows.
+        """
+        with self._lock:
+            if self._connection is None:
+                self._connection = self._connect()
+            cursor = self._connection.execute(sql.format(table=self.table), params)
+            rows = cursor.fetchall()
+            self._connection.commit()
+            return rows
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, {self.columns}, "
+            "stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        connection.execute(f"CREATE INDEX IF NOT EXISTS ix_{self.table}_accessed_at ON {self.table} (accessed_at)")
+        connection.execute(f"CREATE INDEX IF NOT EXISTS ix_{self.table}_stored_at ON {self.table} (stored_at)")
+        return connection
+
+    def written(self, ttl, max_entries):
+        """
+        Count a write and evict once every evict_interval writes.
+
+        Eviction scans up to max_entries rows, so running it on every write
+        would make each write cost as much as the whole table.
+        """
+        with self._lock:
+            due = self._writes % self.evict_interval == 0
+            self._writes += 1
+        if due:
+            self.evict(ttl, max_entries)
+
+    def evict(self, ttl, max_entries):
+        """
+        Delete expired entries and trim the table to max_entries.
+        """
+        self.execute("DELETE FROM {table} WHERE stored_at < ?", (time.time() - ttl,))
+        self.execute(
+            "DELETE FROM {table} WHERE key IN ("
+            "SELECT key FROM {table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (max_entries,)
+        )
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class SearchCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=86400, max_entries=10000, memory_entries=512,
+                 evict_interval=100):
+        """
+        Cache search results keyed on the normalized query and result count.
+
+        Args:
+            path (str): SQLite file for the persistent tier, None for memory only
+            ttl (float): Seconds before an entry expires
+            max_entries (int): Maximum entries in the persistent tier
+            memory_entries (int): Maximum entries in the in-process tier
+            evict_interval (int): Writes between evictions from the persistent tier
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory = LRUCache(memory_entries, ttl)
+        self.store = SqliteStore(path, 'search_results', 'results TEXT NOT NULL', evict_interval) if path else None
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build the cache from SEARCH_CACHE_* settings, or return None if disabled.
+        """
+        if not _env_flag('SEARCH_CACHE_ENABLED', 'true'):
+            return None
+        return cls(
+            path=os.getenv('SEARCH_CACHE_PATH', DEFAULT_CACHE_PATH) or None,
+            ttl=_env_int('SEARCH_CACHE_TTL', 86400),
+            max_entries=_env_int('SEARCH_CACHE_MAX_ENTRIES', 10000),
+            memory_entries=_env_int('SEARCH_CACHE_MEMORY_ENTRIES', 512),
+            evict_interval=_env_int('SEARCH_CACHE_EVICT_INTERVAL', 100),
+        )
+
+    @staticmethod
+    def make_key(query, num_results):
+        return f"{num_results}:{normalize_query(query)}"
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def get(self, query, num_results):
+        """
+        Return cached results or None on a miss.
+        """
+        key = self.make_key(query, num_results)
+        results = self.memory.get(key)
+        if results is not None:
+            self._count('memory_hits')
+            return results
+
+        if self.store:
+            try:
+                rows = self.store.execute(
+                    "SELECT results, stored_at FROM {table} WHERE key = ? AND stored_at >= ?",
+                    (key, time.time() - self.ttl)
+                )
+                if rows:
+                    results, stored_at = json.loads(rows[0][0]), rows[0][1]
+                    self.store.execute("UPDATE {table} SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                    self.memory.set(key, results, stored_at)
+                    self._count('disk_hits')
+                    return results
+            except Exception as e:
+                logger.warning("Error reading search cache: %s", e)
+
+        self._count('misses')
+        return None
+
+    def set(self, query, num_results, results):
+        """
+        Store results in both tiers.
+        """
+        key = self.make_key(query, num_results)
+        self.memory.set(key, results)
+
+        if self.store:
+            try:
+                now = time.time()
+                self.store.execute(
+                    "INSERT OR REPLACE INTO {table} (key, results, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(results), now, now)
+                )
+                self.store.written(self.ttl, self.max_entries)
+            except Exception as e:
+                logger.warning("Error writing search cache: %s", e)
+
+
+class PageContextCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, fresh_ttl=21600, max_age=2592000,
+                 max_entries=50000, memory_entries=1024, evict_interval=100):
+        """
+        Cache extracted page contexts keyed on the canonical URL.
+
+        Entries younger than fresh_ttl are served without a request. Older
+        entries keep their ETag and Last-Modified validators so the page can
+        be revalidated with a conditional GET.
+
+        Args:
+            path (str): SQLite file for the persistent tier, None for memory only
+            fresh_ttl (float): Seconds an entry is served without revalidation
+            max_age (float): Seconds before an entry that was never revalidated is evicted
+            max_entries (int): Maximum entries in the persistent tier
+            memory_entries (int): Maximum entries in the in-process tier
+            evict_interval (int): Writes between evictions from the persistent tier
+        """
+        self.fresh_ttl = fresh_ttl
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.memory = LRUCache(memory_entries, max_age)
+        self.store = SqliteStore(
+            path, 'page_contexts', 'context TEXT NOT NULL, etag TEXT, last_modified TEXT', evict_interval
+        ) if path else None
+        self.stats = {'fresh_hits': 0, 'revalidated': 0, 'misses': 0}
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build the cache from PAGE_CACHE_* settings, or return None if disabled.
+        """
+        if not _env_flag('PAGE_CACHE_ENABLED', 'true'):
+            return None
+        return cls(
+            path=os.getenv('PAGE_CACHE_PATH', DEFAULT_CACHE_PATH) or None,
+            fresh_ttl=_env_int('PAGE_CACHE_FRESH_TTL', 21600),
+            max_age=_env_int('PAGE_CACHE_MAX_AGE', 2592000),
+            max_entries=_env_int('PAGE_CACHE_MAX_ENTRIES', 50000),
+            memory_entries=_env_int('PAGE_CACHE_MEMORY_ENTRIES', 1024),
+            evict_interval=_env_int('PAGE_CACHE_EVICT_INTERVAL', 100),
+        )
+
+    def count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def get(self, url):
+        """
+        Return the cached entry for a URL, fresh or stale, or None.
+
+        Returns:
+            dict: Keys context, etag, last_modified and stored_at
+        """
+        key = canonicalize_url(url)
+        entry = self.memory.get(key)
+        if entry is not None:
+            return entry
+
+        if self.store:
+            try:
+                rows = self.store.execute(
+                    "SELECT context, etag, last_modified, stored_at FROM {table} "
+                    "WHERE key = ? AND stored_at >= ?",
+                    (key, time.time() - self.max_age)
+                )
+                if rows:
+                    context, etag, last_modified, stored_at = rows[0]
+                    entry = {'context': context, 'etag': etag,
+                             'last_modified': last_modified, 'stored_at': stored_at}
+                    self.store.execute("UPDATE {table} SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                    self.memory.set(key, entry, stored_at)
+                    return entry
+            except Exception as e:
+                logger.warning("Error reading page context cache: %s", e)
+        return None
+
+    def is_fresh(self, entry):
+        return time.time() - entry['stored_at'] <= self.fresh_ttl
+
+    def set(self, url, context, etag=None, last_modified=None):
+        """
+        Store a freshly extracted context with its validators.
+        """
+        key = canonicalize_url(url)
+        now = time.time()
+        entry = {'context': context, 'etag': etag, 'last_modified': last_modified, 'stored_at': now}
+        self.memory.set(key, entry, now)
+
+        if self.store:
+            try:
+                self.store.execute(
+                    "INSERT OR REPLACE INTO {table} (key, context, etag, last_modified, stored_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, context, etag, last_modified, now, now)
+                )
+                self.store.written(self.max_age, self.max_entries)
+            except Exception as e:
+                logger.warning("Error writing page context cache: %s", e)
+
+    def touch(self, url, entry):
+        """
+        Mark a cached entry as revalidated after a 304 response.
+        """
+        self.set(url, entry['context'], entry['etag'], entry['last_modified'])
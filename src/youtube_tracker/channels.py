@@ -0,0 +1,415 @@
+"""
+Registry of tracked channels
+
+The channels table holds every tracked channel with its settings, whether
+it is enabled and its priority (higher priorities are checked first within
+a cycle), and when it was last checked and last changed. Channels are
+added and changed in bulk with `python -m youtube_tracker channels import`
+from CSV or JSONL files; they are removed by disabling them. Channels
+listed in YOUTUBE_CHANNEL_IDS are still added if missing, so existing
+deployments keep working, but the table is what the tracker checks.
+
+Every settings change stamps updated_at (checks do not), so a running
+tracker reloads only the rows changed since its last reload, less
+RELOAD_OVERLAP for transactions that committed late, at most every
+CHANNEL_RELOAD_INTERVAL seconds. Reloads use the index on updated_at and
+cost nothing when no settings changed, however many channels are tracked.
+"""
+import io
+import os
+import csv
+import sys
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select, update
+from .metrics import CHANNELS_ENABLED
+from .models import Channel
+from .persistence import chunked, get_batch_size, insert_ignore_statement
+
+logger = logging.getLogger(__name__)
+
+# Rows updated this long before the newest row seen are read again
+RELOAD_OVERLAP = 60
+
+CHANNEL_FIELDS = ('channel_id', 'title', 'enabled', 'priority')
+# Settings of a new channel that its import row leaves out
+CHANNEL_DEFAULTS = {'title': None, 'enabled': True, 'priority': 0}
+
+_TRUE = ('1', 'true', 'yes', 'on')
+_FALSE = ('0', 'false', 'no', 'off')
+
+
+def get_reload_interval():
+    """
+    Read the seconds between reloads of the channels table (CHANNEL_RELOAD_INTERVAL).
+    """
+    try:
+        return max(0.0, float(os.getenv('CHANNEL_RELOAD_INTERVAL', '30')))
+    except ValueError:
+        logger.warning("Invalid CHANNEL_RELOAD_INTERVAL value, using default")
+        return 30.0
+
+
+def get_env_channel_ids():
+    """
+    Read the channel IDs listed in YOUTUBE_CHANNEL_IDS.
+    """
+    channel_ids = [channel_id.strip() for channel_id in os.getenv('YOUTUBE_CHANNEL_IDS', '').split(',')]
+    return [channel_id for channel_id in channel_ids if channel_id]
+
+
+def normalize_channel(row):
+    """
+    Validate an import row.
+
+    Only the settings present in the row are returned, so importing a file
+    without e.g. a priority column leaves the priorities of existing
+    channels as they are. Empty values count as absent.
+
+    Args:
+        row (dict | str): Channel settings, or just a channel ID
+
+    Returns:
+        dict: channel_id and the settings given
+
+    Raises:
+        ValueError: If the row has no valid channel ID or a setting is invalid
+    """
+    if isinstance(row, str):
+        row = {'channel_id': row}
+    if not isinstance(row, dict):
+        raise ValueError(f"expected an object or a channel ID, got {type(row).__name__}")
+    channel_id = str(row.get('channel_id') or '').strip()
+    if not channel_id or any(char.isspace() or char in ',/?#' for char in channel_id):
+        raise ValueError(f"invalid channel_id {row.get('channel_id')!r}")
+
+    channel = {'channel_id': channel_id}
+    title = row.get('title')
+    if title not in (None, ''):
+        channel['title'] = str(title).strip()
+    enabled = row.get('enabled')
+    if isinstance(enabled, bool):
+        channel['enabled'] = enabled
+    elif enabled not in (None, ''):
+        value = str(enabled).strip().lower()
+        if value not in _TRUE + _FALSE:
+            raise ValueError(f"invalid enabled value {enabled!r}")
+        channel['enabled'] = value in _TRUE
+    priority = row.get('priority')
+    if priority not in (None, ''):
+        try:
+            channel['priority'] = int(priority)
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid priority {priority!r}") from None
+    return channel
+
+
+def _csv_rows(text):
+    reader = csv.reader(io.StringIO(text))
+    header = None
+    first = True
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        if first and 'channel_id' in [value.strip() for value in values]:
+            header = [value.strip() for value in values]
+        elif header is None:
+            # Without a header the first column holds the channel ID
+            yield reader.line_num, values[0]
+        else:
+            yield reader.line_num, dict(zip(header, values))
+        first = False
+
+
+def _jsonl_rows(text):
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        if line.strip():
+            yield line_number, line
+
+
+def parse_channel_file(text, file_format='csv'):
+    """
+    Parse a CSV or JSONL channel list.
+
+    CSV files either start with a header naming the columns (channel_id,
+    title, enabled, priority) or list one channel ID per line. JSONL lines
+    hold an object with the same keys or a channel ID string. A channel
+    listed twice keeps its last row.
+
+    Args:
+        text (str): File contents
+        file_format (str): 'csv' or 'jsonl'
+
+    Returns:
+        tuple: (list of normalized channel dictionaries, list of error messages)
+    """
+    rows = _jsonl_rows(text) if file_format == 'jsonl' else _csv_rows(text)
+    channels = {}
+    errors = []
+    for line_number, row in rows:
+        try:
+            if file_format == 'jsonl':
+                row = json.loads(row)
+            channel = normalize_channel(row)
+        except json.JSONDecodeError as e:
+            errors.append(f"line {line_number}: invalid JSON ({e.msg})")
+        except ValueError as e:
+            errors.append(f"line {line_number}: {e}")
+        else:
+            channels[channel['channel_id']] = channel
+    return list(channels.values()), errors
+
+
+def read_channel_file(path, file_format=None):
+    """
+    Read a channel list from a file, '-' reading standard input.
+
+    Args:
+        path (str): File path
+        file_format (str): 'csv' or 'jsonl', by default from the file extension
+
+    Returns:
+        tuple: (list of normalized channel dictionaries, list of error messages)
+    """
+    if file_format is None:
+        file_format = 'jsonl' if str(path).lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+    if str(path) == '-':
+        text = sys.stdin.read()
+    else:
+        with open(path, encoding='utf-8-sig', newline='') as file:
+            text = file.read()
+    return parse_channel_file(text, file_format)
+
+
+def import_channels(db, channels, disable_missing=False, batch_size=None):
+    """
+    Add new channels and update the settings of existing ones.
+
+    Rows whose settings did not change are left alone, so re-importing the
+    same file does not make running trackers reload anything. The caller
+    commits.
+
+    Args:
+        db (Session): Database session
+        channels (list): Dictionaries from normalize_channel
+        disable_missing (bool): Disable enabled channels not in channels
+        batch_size (int): Rows per statement (DB_BATCH_SIZE)
+
+    Returns:
+        dict: Counts of 'added', 'updated', 'unchanged' and 'disabled' channels
+    """
+    batch_size = batch_size or get_batch_size()
+    now = datetime.utcnow()
+    counts = {'added': 0, 'updated': 0, 'unchanged': 0, 'disabled': 0}
+    channels = list({channel['channel_id']: channel for channel in channels}.values())
+
+    for chunk in chunked(channels, batch_size):
+        existing = {
+            row.channel_id: row for row in db.execute(
+                select(Channel.channel_id, Channel.title, Channel.enabled, Channel.priority)
+                .where(Channel.channel_id.in_([channel['channel_id'] for channel in chunk]))
+            )
+        }
+        added = []
+        updated = []
+        for channel in chunk:
+            row = existing.get(channel['channel_id'])
+            if row is None:
+                added.append({**CHANNEL_DEFAULTS, **channel, 'created_at': now, 'updated_at': now})
+            elif any(getattr(row, field) != value for field, value in channel.items()):
+                updated.append({**channel, 'updated_at': now})
+            else:
+                counts['unchanged'] += 1
+        if added:
+            db.execute(insert(Channel), added)
+        # Grouped by the settings they set, since one executemany needs the same keys
+        groups = {}
+        for channel in updated:
+            groups.setdefault(tuple(sorted(channel)), []).append(channel)
+        for group in groups.values():
+            db.execute(update(Channel), group)
+        counts['added'] += len(added)
+        counts['updated'] += len(updated)
+
+    if disable_missing:
+        listed = {channel['channel_id'] for channel in channels}
+        enabled = db.scalars(select(Channel.channel_id).where(Channel.enabled.is_(True))).all()
+        counts['disabled'] = set_channels_enabled(
+            db, [channel_id for channel_id in enabled if channel_id not in listed], False, batch_size
+        )
+    return counts
+
+
+def set_channels_enabled(db, channel_ids, enabled, batch_size=None):
+    """
+    Enable or disable channels. The caller commits.
+
+    Returns:
+        int: Number of channels whose setting changed
+    """
+    batch_size = batch_size or get_batch_size()
+    changed = 0
+    for chunk in chunked(sorted(set(channel_ids)), batch_size):
+        result = db.execute(
+            update(Channel)
+            .where(Channel.channel_id.in_(chunk), Channel.enabled.is_not(enabled))
+            .values(enabled=enabled, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        changed += result.rowcount
+    return changed
+
+
+def add_env_channels(db, batch_size=None):
+    """
+    Add the channels of YOUTUBE_CHANNEL_IDS that are not in the table yet.
+
+    Existing rows are not touched, so a channel disabled in the table stays
+    disabled while it is still listed in the environment. The caller commits.
+
+    Returns:
+        int: Number of channel IDs listed in YOUTUBE_CHANNEL_IDS
+    """
+    batch_size = batch_size or get_batch_size()
+    channel_ids = list(dict.fromkeys(get_env_channel_ids()))
+    now = datetime.utcnow()
+    rows = [{**CHANNEL_DEFAULTS, 'channel_id': channel_id, 'created_at': now, 'updated_at': now}
+            for channel_id in channel_ids]
+    for chunk in chunked(rows, batch_size):
+        db.execute(insert_ignore_statement(db, Channel, chunk, 'channel_id'))
+    return len(channel_ids)
+
+
+def record_channel_checks(db, checked, changed, now=None, batch_size=None):
+    """
+    Stamp last_checked_at on checked channels and last_changed_at on changed ones.
+
+    updated_at is left alone, so checks do not trigger reloads. The caller
+    commits.
+
+    Args:
+        db (Session): Database session
+        checked (list): Channels checked successfully
+        changed (set): Channels where a new video was recorded
+        now (datetime): Check time, defaults to the current UTC time
+        batch_size (int): Channel IDs per statement (DB_BATCH_SIZE)
+    """
+    batch_size = batch_size or get_batch_size()
+    now = now or datetime.utcnow()
+    unchanged = [channel_id for channel_id in checked if channel_id not in changed]
+    for channel_ids, values in ((unchanged, {'last_checked_at': now}),
+                                (sorted(changed), {'last_checked_at': now, 'last_changed_at': now})):
+        for chunk in chunked(channel_ids, batch_size):
+            db.execute(
+                update(Channel)
+                .where(Channel.channel_id.in_(chunk))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+
+
+class ChannelRegistry:
+    def __init__(self, session_factory, reload_interval=None, clock=time.monotonic):
+        """
+        In-memory set of the enabled channels, kept current by incremental reloads.
+
+        The first reload adds the YOUTUBE_CHANNEL_IDS channels missing from
+        the table and loads every row; later reloads load only rows whose
+        settings changed. Every reload that changes the set or the order of
+        the enabled channels increments version.
+
+        Args:
+            session_factory (callable): Returns a new database session
+            reload_interval (float): Seconds between reloads (CHANNEL_RELOAD_INTERVAL)
+            clock (callable): Returns the current time in seconds
+        """
+        self.session_factory = session_factory
+        self.reload_interval = get_reload_interval() if reload_interval is None else reload_interval
+        self.clock = clock
+        self.version = 0
+        self._priorities = {}
+        self._ordered = None
+        self._watermark = None
+        self._next_reload = None
+        self._lock = threading.Lock()
+
+    def reload(self):
+        """
+        Load rows whose settings changed since the last reload.
+
+        Returns:
+            tuple: (set of channels enabled, set of channels disabled)
+        """
+        with self._lock:
+            self._next_reload = self.clock() + self.reload_interval
+            query = select(Channel.channel_id, Channel.enabled, Channel.priority, Channel.updated_at)
+            db = self.session_factory()
+            try:
+                if self._watermark is None:
+                    add_env_channels(db)
+                    db.commit()
+                else:
+                    query = query.where(Channel.updated_at >= self._watermark - timedelta(seconds=RELOAD_OVERLAP))
+                rows = db.execute(query).all()
+            finally:
+                db.close()
+
+            # Until a row is seen every reload is a full one, which costs nothing on an empty table
+            timestamps = [row.updated_at for row in rows if row.updated_at is not None]
+            if timestamps:
+                self._watermark = max([self._watermark or timestamps[0]] + timestamps)
+
+            added = set()
+            removed = set()
+            reordered = False
+            for row in rows:
+                current = self._priorities.get(row.channel_id)
+                if not row.enabled:
+                    if current is not None:
+                        del self._priorities[row.channel_id]
+                        removed.add(row.channel_id)
+                elif current is None:
+                    self._priorities[row.channel_id] = row.priority
+                    added.add(row.channel_id)
+                elif current != row.priority:
+                    self._priorities[row.channel_id] = row.priority
+                    reordered = True
+
+            if added or removed or reordered:
+                self.version += 1
+                self._ordered = None
+                CHANNELS_ENABLED.set(len(self._priorities))
+                logger.info("Reloaded channels: %d enabled, %d disabled, %d tracked",
+                            len(added), len(removed), len(self._priorities))
+            return added, removed
+
+    def reload_if_due(self):
+        """
+        Reload if CHANNEL_RELOAD_INTERVAL has passed since the last reload.
+
+        Returns:
+            tuple: As reload(), empty sets if no reload was due
+        """
+        if self._next_reload is not None and self.clock() < self._next_reload:
+            return set(), set()
+        return self.reload()
+
+    def channel_ids(self):
+        """
+        Returns:
+            list: Enabled channel IDs, highest priority first
+        """
+        with self._lock:
+            if self._ordered is None:
+                self._ordered = sorted(self._priorities, key=lambda channel_id: (-self._priorities[channel_id],
+                                                                                 channel_id))
+            return list(self._ordered)
+
+    def __contains__(self, channel_id):
+        return channel_id in self._priorities
+
+    def __len__(self):
+        return len(self._priorities)
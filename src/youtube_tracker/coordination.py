@@ -0,0 +1,239 @@
+"""
+Lease-based sharding of channels across tracker replicas
+
+Every channel has a row in channel_leases. Time is divided into cycles of
+CHECK_INTERVAL minutes; within a cycle each replica repeatedly claims a
+batch of channels that are neither completed for that cycle nor leased,
+processes them and marks them completed. While a batch is processed a
+heartbeat thread renews its leases every third of LEASE_SECONDS, so a slow
+batch is never taken over by another replica; a replica that dies simply
+lets its leases expire, after which the remaining replicas pick its
+channels up. Channels the batch could not store are released instead of
+completed and can be claimed again after LEASE_RETRY_DELAY seconds.
+
+On PostgreSQL candidates are selected with FOR UPDATE SKIP LOCKED so
+replicas never contend for the same rows. The claim itself is a
+compare-and-set UPDATE tagged with a unique token, which keeps claims
+exclusive on databases without row locks as well (e.g. SQLite in tests).
+"""
+import os
+import time
+import uuid
+import socket
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import delete, or_, select, update
+from .models import ChannelLease
+from .persistence import chunked, get_batch_size, insert_ignore_statement
+
+logger = logging.getLogger(__name__)
+
+
+def default_replica_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class LeaseCoordinator:
+    def __init__(self, session_factory, cycle_seconds, replica_id=None, lease_seconds=None,
+                 claim_size=None, retry_delay=None, clock=time.time):
+        """
+        Args:
+            session_factory (callable): Returns a new database session
+            cycle_seconds (float): Length of one polling cycle
+            replica_id (str): Name of this replica (REPLICA_ID)
+            lease_seconds (float): How long a claim stays valid (LEASE_SECONDS)
+            claim_size (int): Channels claimed at a time (LEASE_CLAIM_SIZE)
+            retry_delay (float): Seconds before channels that failed can be
+                claimed again (LEASE_RETRY_DELAY)
+            clock (callable): Returns the current time in seconds
+        """
+        self.session_factory = session_factory
+        self.cycle_seconds = cycle_seconds
+        self.replica_id = replica_id or os.getenv('REPLICA_ID') or default_replica_id()
+        self.lease_seconds = lease_seconds or int(os.getenv('LEASE_SECONDS', '300'))
+        self.claim_size = claim_size or int(os.getenv('LEASE_CLAIM_SIZE', '50'))
+        self.retry_delay = retry_delay if retry_delay is not None else float(os.getenv('LEASE_RETRY_DELAY', '60'))
+        self.clock = clock
+
+    def _now(self):
+        return datetime.utcfromtimestamp(self.clock())
+
+    def current_cycle(self):
+        return int(self.clock() // self.cycle_seconds)
+
+    def seconds_until_next_cycle(self):
+        return (self.current_cycle() + 1) * self.cycle_seconds - self.clock()
+
+    def sync_channels(self, channel_ids):
+        """
+        Make channel_leases match the configured channel list.
+        """
+        channel_ids = set(channel_ids)
+        db = self.session_factory()
+        try:
+            existing = set(db.scalars(select(ChannelLease.channel_id)))
+            missing = [{'channel_id': channel_id, 'completed_cycle': -1} for channel_id in sorted(channel_ids - existing)]
+            for chunk in chunked(missing, get_batch_size()):
+                db.execute(insert_ignore_statement(db, ChannelLease, chunk, 'channel_id'))
+            stale = sorted(existing - channel_ids)
+            for chunk in chunked(stale, get_batch_size()):
+                db.execute(delete(ChannelLease).where(ChannelLease.channel_id.in_(chunk)))
+            db.commit()
+        finally:
+            db.close()
+
+    def _claimable(self, cycle, now):
+        return (
+            ChannelLease.completed_cycle < cycle,
+            or_(ChannelLease.leased_until.is_(None), ChannelLease.leased_until < now),
+        )
+
+    def claim(self, cycle):
+        """
+        Lease a batch of channels not yet processed in this cycle.
+
+        Returns:
+            tuple: (lease token, list of claimed channel IDs)
+        """
+        now = self._now()
+        token = uuid.uuid4().hex
+        db = self.session_factory()
+        try:
+            candidates = db.scalars(
+                select(ChannelLease.channel_id)
+                .where(*self._claimable(cycle, now))
+                .order_by(ChannelLease.channel_id)
+                .limit(self.claim_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not candidates:
+                db.rollback()
+                return token, []
+
+            db.execute(
+                update(ChannelLease)
+                .where(ChannelLease.channel_id.in_(candidates), *self._claimable(cycle, now))
+                .values(owner=self.replica_id, lease_token=token,
+                        leased_until=now + timedelta(seconds=self.lease_seconds))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            claimed = db.scalars(
+                select(ChannelLease.channel_id).where(ChannelLease.lease_token == token)
+            ).all()
+            db.commit()
+            return token, sorted(claimed)
+        finally:
+            db.close()
+
+    def renew(self, token):
+        """
+        Extend the leases held under a token by another LEASE_SECONDS.
+
+        Returns:
+            int: Number of channels still held under the token
+        """
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                update(ChannelLease)
+                .where(ChannelLease.lease_token == token)
+                .values(leased_until=self._now() + timedelta(seconds=self.lease_seconds))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            return result.rowcount
+        finally:
+            db.close()
+
+    def complete(self, token, cycle, failed=()):
+        """
+        Mark every channel held under a lease token as done for the cycle,
+        except the failed ones, which are released for a retry.
+        """
+        if failed:
+            self.release(token, failed, retry_delay=self.retry_delay)
+        self._finish(token, completed_cycle=cycle)
+
+    def release(self, token, channel_ids=None, retry_delay=None):
+        """
+        Give channels back without completing them, e.g. after an error.
+
+        Args:
+            token (str): Lease token the channels are held under
+            channel_ids (iterable): Channels to release, defaults to all of them
+            retry_delay (float): Seconds before the channels can be claimed again
+        """
+        leased_until = self._now() + timedelta(seconds=retry_delay) if retry_delay else None
+        if channel_ids is None:
+            self._finish(token, leased_until=leased_until)
+            return
+        for chunk in chunked(sorted(channel_ids), get_batch_size()):
+            self._finish(token, ChannelLease.channel_id.in_(chunk), leased_until=leased_until)
+
+    def _finish(self, token, *conditions, leased_until=None, **values):
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(ChannelLease)
+                .where(ChannelLease.lease_token == token, *conditions)
+                .values(owner=None, lease_token=None, leased_until=leased_until, **values)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    @contextmanager
+    def heartbeat(self, token):
+        """
+        Renew the token's leases every third of LEASE_SECONDS while the block runs.
+        """
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.lease_seconds / 3):
+                try:
+                    if not self.renew(token):
+                        logger.warning("Replica %s lost its lease on a batch", self.replica_id)
+                        return
+                except Exception as e:
+                    logger.warning("Could not renew leases: %s", e)
+
+        thread = threading.Thread(target=beat, name='lease-heartbeat', daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def run_cycle(self, process):
+        """
+        Claim and process batches until no channel is left in this cycle.
+
+        Args:
+            process (callable): Called with a list of channel IDs; may
+                return the IDs of channels that failed and should be retried
+
+        Returns:
+            int: Number of channels this replica processed
+        """
+        cycle = self.current_cycle()
+        processed = 0
+        while True:
+            token, channel_ids = self.claim(cycle)
+            if not channel_ids:
+                return processed
+            logger.debug("Replica %s claimed %d channels for cycle %s", self.replica_id, len(channel_ids), cycle)
+            try:
+                with self.heartbeat(token):
+                    failed = set(process(channel_ids) or ())
+            except Exception as e:
+                logger.error("Error processing claimed channels: %s", e)
+                self.release(token)
+                raise
+            self.complete(token, cycle, failed)
+            processed += len(channel_ids) - len(failed)
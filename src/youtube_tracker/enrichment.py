@@ -0,0 +1,431 @@
+"""
+Durable background enrichment of new videos
+
+A polling cycle commits new videos right away with enrichment_status
+'pending' and, in the same transaction, adds a row per video to
+enrichment_jobs. Worker threads, in the tracker process or in a separate
+`python -m youtube_tracker enrich` process, claim jobs from that table, run
+the web search and store the results (see persistence.py). Detection
+latency therefore no longer depends on search latency.
+
+Jobs are claimed like channel leases (see coordination.py): candidates are
+selected with FOR UPDATE SKIP LOCKED and taken with a compare-and-set
+UPDATE tagged with a unique token, so several workers and processes can
+drain one queue. A claim expires after ENRICHMENT_LEASE_SECONDS, so jobs of
+a crashed worker are picked up again. Failed jobs are retried with
+exponential backoff and marked failed after ENRICHMENT_MAX_ATTEMPTS.
+
+Backpressure: each worker holds at most ENRICHMENT_CONCURRENCY jobs at a
+time, and once more than ENRICHMENT_MAX_PENDING jobs are waiting, enqueuing
+a video drops the unclaimed jobs of older videos of the same channel.
+"""
+import os
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, or_, select, update
+from .metrics import ENRICHMENT_JOBS, ENRICHMENT_QUEUE_DEPTH
+from .models import ENRICHMENT_DONE, ENRICHMENT_FAILED, EnrichmentJob, LatestVideo, ProcessedVideo
+from .persistence import chunked, get_batch_size, insert_ignore_statement, store_web_search_results
+
+logger = logging.getLogger(__name__)
+
+# enrichment_jobs.status values; finished jobs are deleted
+JOB_PENDING = 'pending'
+JOB_FAILED = 'failed'
+
+# Longest delay between two attempts of a job
+MAX_RETRY_DELAY = 3600
+
+
+def get_enrichment_mode():
+    """
+    Read ENRICHMENT_MODE: 'queue' (default) or 'inline' to search during the cycle.
+    """
+    return os.getenv('ENRICHMENT_MODE', 'queue').lower()
+
+
+class EnrichmentQueue:
+    def __init__(self, session_factory, lease_seconds=None, max_attempts=None, retry_delay=None,
+                 max_pending=None, clock=time.time):
+        """
+        Args:
+            session_factory (callable): Returns a new database session
+            lease_seconds (float): How long a claim stays valid (ENRICHMENT_LEASE_SECONDS)
+            max_attempts (int): Attempts before a job is marked failed (ENRICHMENT_MAX_ATTEMPTS)
+            retry_delay (float): Delay before the first retry, doubled for
+                each further attempt (ENRICHMENT_RETRY_DELAY)
+            max_pending (int): Queue depth above which older jobs of the same
+                channel are dropped (ENRICHMENT_MAX_PENDING)
+            clock (callable): Returns the current time in seconds
+        """
+        self.session_factory = session_factory
+        self.lease_seconds = lease_seconds or int(os.getenv('ENRICHMENT_LEASE_SECONDS', '300'))
+        self.max_attempts = max_attempts or int(os.getenv('ENRICHMENT_MAX_ATTEMPTS', '5'))
+        self.retry_delay = retry_delay if retry_delay is not None else float(os.getenv('ENRICHMENT_RETRY_DELAY', '60'))
+        self.max_pending = max_pending or int(os.getenv('ENRICHMENT_MAX_PENDING', '10000'))
+        self.clock = clock
+
+    def _now(self):
+        return datetime.utcfromtimestamp(self.clock())
+
+    def enqueue(self, db, videos):
+        """
+        Add enrichment jobs for videos in the caller's transaction.
+
+        Videos that already have a job are skipped. The caller commits.
+
+        Args:
+            db (Session): Database session
+            videos (list): Video dictionaries with channel_id, video_id,
+                title and description
+
+        Returns:
+            int: Number of videos submitted
+        """
+        if not videos:
+            return 0
+        now = self._now()
+        rows = [
+            {
+                'channel_id': video['channel_id'],
+                'video_id': video['video_id'],
+                'title': video['title'],
+                'description': video.get('description'),
+                'status': JOB_PENDING,
+                'attempts': 0,
+                'available_at': now,
+                'created_at': now,
+            }
+            for video in videos
+        ]
+
+        if self._count(db, JOB_PENDING) + len(rows) > self.max_pending:
+            self._supersede(db, rows)
+
+        for chunk in chunked(rows, get_batch_size()):
+            db.execute(insert_ignore_statement(db, EnrichmentJob, chunk, ('channel_id', 'video_id')))
+        return len(rows)
+
+    def _supersede(self, db, rows):
+        # Only the newest video of a channel is shown in latest_videos, so its
+        # older unclaimed jobs are the cheapest to give up
+        now = self._now()
+        dropped = 0
+        for chunk in chunked(rows, get_batch_size()):
+            result = db.execute(
+                delete(EnrichmentJob)
+                .where(
+                    EnrichmentJob.channel_id.in_([row['channel_id'] for row in chunk]),
+                    EnrichmentJob.video_id.not_in([row['video_id'] for row in chunk]),
+                    EnrichmentJob.status == JOB_PENDING,
+                    or_(EnrichmentJob.locked_until.is_(None), EnrichmentJob.locked_until < now),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            dropped += result.rowcount
+        if dropped:
+            ENRICHMENT_JOBS.inc(dropped, result='superseded')
+            logger.warning("Enrichment queue is over %s jobs, dropped %s superseded jobs", self.max_pending, dropped)
+
+    def _claimable(self, now):
+        return (
+            EnrichmentJob.status == JOB_PENDING,
+            EnrichmentJob.available_at <= now,
+            or_(EnrichmentJob.locked_until.is_(None), EnrichmentJob.locked_until < now),
+        )
+
+    def claim(self, limit):
+        """
+        Take up to limit jobs that are due, oldest first.
+
+        Returns:
+            list: Job dictionaries with id, channel_id, video_id, title,
+            description, attempts and lock_token
+        """
+        now = self._now()
+        token = uuid.uuid4().hex
+        db = self.session_factory()
+        try:
+            candidates = db.scalars(
+                select(EnrichmentJob.id)
+                .where(*self._claimable(now))
+                .order_by(EnrichmentJob.available_at, EnrichmentJob.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not candidates:
+                db.rollback()
+                return []
+
+            db.execute(
+                update(EnrichmentJob)
+                .where(EnrichmentJob.id.in_(candidates), *self._claimable(now))
+                .values(lock_token=token, locked_until=now + timedelta(seconds=self.lease_seconds),
+                        attempts=EnrichmentJob.attempts + 1)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            jobs = db.scalars(
+                select(EnrichmentJob).where(EnrichmentJob.lock_token == token).order_by(EnrichmentJob.id)
+            ).all()
+            claimed = [
+                {
+                    'id': job.id,
+                    'channel_id': job.channel_id,
+                    'video_id': job.video_id,
+                    'title': job.title,
+                    'description': job.description,
+                    'attempts': job.attempts,
+                    'lock_token': job.lock_token,
+                }
+                for job in jobs
+            ]
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    def complete(self, job, results, summary=None):
+        """
+        Store a job's search results and summary and remove it from the queue.
+
+        Nothing is stored if the claim expired and the job was claimed
+        again, since the new claim's outcome is the one that counts.
+
+        Returns:
+            int: 1 if the job was completed, 0 if its claim was lost
+        """
+        db = self.session_factory()
+        try:
+            deleted = db.execute(
+                delete(EnrichmentJob)
+                .where(EnrichmentJob.id == job['id'], EnrichmentJob.lock_token == job['lock_token'])
+            ).rowcount
+            if not deleted:
+                db.rollback()
+                logger.warning("Claim on the enrichment job of video %s was lost, dropping its results",
+                               job['video_id'])
+                return 0
+            # Links are per video, so they also apply if the video was
+            # replaced while its job was waiting
+            store_web_search_results(db, {job['video_id']: results})
+            db.execute(
+                update(LatestVideo)
+                .where(LatestVideo.channel_id == job['channel_id'], LatestVideo.video_id == job['video_id'])
+                .values(enrichment_status=ENRICHMENT_DONE, summary=summary, updated_at=self._now())
+                .execution_options(synchronize_session=False)
+            )
+            if summary is not None:
+                db.execute(
+                    update(ProcessedVideo)
+                    .where(ProcessedVideo.channel_id == job['channel_id'], ProcessedVideo.video_id == job['video_id'])
+                    .values(summary=summary)
+                    .execution_options(synchronize_session=False)
+                )
+            db.commit()
+        finally:
+            db.close()
+        ENRICHMENT_JOBS.inc(result='done')
+        return deleted
+
+    def fail(self, job, error):
+        """
+        Schedule a retry of a failed job, or mark it failed for good.
+
+        Returns:
+            bool: True if the job will be retried
+        """
+        retry = job['attempts'] < self.max_attempts
+        now = self._now()
+        db = self.session_factory()
+        try:
+            if retry:
+                delay = min(self.retry_delay * 2 ** (job['attempts'] - 1), MAX_RETRY_DELAY)
+                values = {'available_at': now + timedelta(seconds=delay)}
+            else:
+                values = {'status': JOB_FAILED}
+                db.execute(
+                    update(LatestVideo)
+                    .where(LatestVideo.channel_id == job['channel_id'], LatestVideo.video_id == job['video_id'])
+                    .values(enrichment_status=ENRICHMENT_FAILED, updated_at=now)
+                    .execution_options(synchronize_session=False)
+                )
+            db.execute(
+                update(EnrichmentJob)
+                .where(EnrichmentJob.id == job['id'], EnrichmentJob.lock_token == job['lock_token'])
+                .values(lock_token=None, locked_until=None, last_error=str(error)[:1000], **values)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+        ENRICHMENT_JOBS.inc(result='retried' if retry else 'failed')
+        return retry
+
+    def _count(self, db, status):
+        return db.scalar(select(func.count()).select_from(EnrichmentJob).where(EnrichmentJob.status == status))
+
+    def depth(self):
+        """
+        Return the number of jobs waiting to be enriched.
+        """
+        db = self.session_factory()
+        try:
+            pending = self._count(db, JOB_PENDING)
+        finally:
+            db.close()
+        ENRICHMENT_QUEUE_DEPTH.set(pending)
+        return pending
+
+
+class EnrichmentWorker:
+    def __init__(self, queue, enrich, concurrency=None, poll_interval=None, summarize=None):
+        """
+        Drain an EnrichmentQueue with a pool of threads.
+
+        Args:
+            queue (EnrichmentQueue): Queue to drain
+            enrich (callable): Called with a job dictionary, returns the
+                search results and raises to have the job retried; a job
+                with results marked incomplete is retried too, except on
+                its last attempt
+            summarize (callable): Called with the search results, returns
+                the summary stored with them; a failure only loses the summary
+            concurrency (int): Jobs in flight at a time (ENRICHMENT_CONCURRENCY)
+            poll_interval (float): Seconds to wait when the queue is empty
+                (ENRICHMENT_POLL_INTERVAL)
+        """
+        self.queue = queue
+        self.enrich = enrich
+        self.summarize = summarize
+        self.concurrency = concurrency or int(os.getenv('ENRICHMENT_CONCURRENCY', '4'))
+        self.poll_interval = poll_interval if poll_interval is not None else float(os.getenv('ENRICHMENT_POLL_INTERVAL', '5'))
+        self._thread = None
+        self._stop = threading.Event()
+
+    def process(self, job):
+        """
+        Enrich one claimed job and record the outcome.
+        """
+        try:
+            results = self.enrich(job)
+        except Exception as e:
+            retry = self.queue.fail(job, e)
+            logger.warning("Enrichment of video %s failed (attempt %s), %s: %s", job['video_id'], job['attempts'],
+                           'will retry' if retry else 'giving up', e)
+            return False
+        incomplete = sum(1 for result in results or () if result.get('incomplete'))
+        if incomplete and job['attempts'] < self.queue.max_attempts:
+            # Pages already read come from the page cache next time; the last
+            # attempt stores whatever it got
+            self.queue.fail(job, f"{incomplete} result pages could not be read")
+            logger.info("Enrichment of video %s missed %d result pages (attempt %s), will retry",
+                        job['video_id'], incomplete, job['attempts'])
+            return False
+        summary = None
+        if self.summarize is not None and results:
+            try:
+                summary = self.summarize(results)
+            except Exception as e:
+                logger.warning("Could not summarize results of video %s: %s", job['video_id'], e)
+        if not self.queue.complete(job, results, summary):
+            return False
+        logger.debug("Enriched video %s with %s web search results", job['video_id'], len(results or []))
+        return True
+
+    def _process_safely(self, job):
+        try:
+            return self.process(job)
+        except Exception as e:
+            # Recording the outcome failed; the claim expires and the job is retried
+            logger.error("Error recording enrichment of video %s: %s", job['video_id'], e)
+            return False
+
+    def run(self, stop_event=None, until_empty=False):
+        """
+        Claim and process jobs until stopped.
+
+        New jobs are only claimed while fewer than concurrency jobs are in
+        flight, so a slow search backend holds back claims rather than
+        letting claims pile up and expire.
+
+        Args:
+            stop_event (threading.Event): Set to stop, defaults to the worker's own
+            until_empty (bool): Return once no job is due and none is in flight
+
+        Returns:
+            int: Number of jobs processed
+        """
+        stop_event = stop_event or self._stop
+        processed = 0
+        # Outcomes since the queue was last idle, logged as one summary
+        outcomes = {True: 0, False: 0}
+        in_flight = set()
+        depth_checked = None
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='enrich') as executor:
+            while not stop_event.is_set():
+                # Refresh the queue depth gauge at most once per poll interval
+                if depth_checked is None or time.monotonic() - depth_checked >= self.poll_interval:
+                    depth_checked = time.monotonic()
+                    try:
+                        self.queue.depth()
+                    except Exception as e:
+                        logger.error("Error reading enrichment queue depth: %s", e)
+                free = self.concurrency - len(in_flight)
+                jobs = []
+                if free:
+                    try:
+                        jobs = self.queue.claim(free)
+                    except Exception as e:
+                        logger.error("Error claiming enrichment jobs: %s", e)
+                for job in jobs:
+                    in_flight.add(executor.submit(self._process_safely, job))
+
+                if in_flight:
+                    done, in_flight = wait(in_flight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                    processed += len(done)
+                    for future in done:
+                        outcomes[future.result()] += 1
+                    continue
+                self._log_summary(outcomes)
+                if until_empty:
+                    break
+                stop_event.wait(self.poll_interval)
+            done, _ = wait(in_flight)
+            processed += len(done)
+            for future in done:
+                outcomes[future.result()] += 1
+        self._log_summary(outcomes)
+        return processed
+
+    @staticmethod
+    def _log_summary(outcomes):
+        if not outcomes[True] and not outcomes[False]:
+            return
+        logger.info("Enriched %d videos, %d failed", outcomes[True], outcomes[False],
+                    extra={'event': 'enrichment_summary', 'enriched': outcomes[True], 'failed': outcomes[False]})
+        outcomes[True] = outcomes[False] = 0
+
+    def drain(self):
+        """
+        Process every job that is due now and return.
+        """
+        return self.run(threading.Event(), until_empty=True)
+
+    def start(self):
+        """
+        Run the worker on a daemon thread.
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name='enrichment-worker', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
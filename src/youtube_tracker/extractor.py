@@ -0,0 +1,198 @@
+"""
+Targeted extraction of YouTube page data without building a DOM
+
+YouTube pages embed their state as JSON assigned to ``ytInitialData`` and
+``ytInitialPlayerResponse`` inside inline scripts. Instead of parsing the
+whole document, the payload is located by scanning the raw bytes for the
+variable name and decoded with a real JSON decoder.
+"""
+import os
+import json
+import logging
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_YOUTUBE_BASE_URL = 'https://www.youtube.com'
+
+INITIAL_DATA = 'ytInitialData'
+INITIAL_PLAYER_RESPONSE = 'ytInitialPlayerResponse'
+
+# Renderers used for video tiles on channel pages
+VIDEO_RENDERER_KEYS = ('videoRenderer', 'gridVideoRenderer')
+
+_decoder = json.JSONDecoder()
+
+
+def youtube_base_url():
+    """
+    Base URL of YouTube pages, overridable with YOUTUBE_BASE_URL (e.g. to
+    point the tracker at a local stand-in server).
+    """
+    return os.getenv('YOUTUBE_BASE_URL', DEFAULT_YOUTUBE_BASE_URL).rstrip('/')
+
+
+@dataclass
+class VideoRecord:
+    video_id: str
+    title: str
+    thumbnail: str
+    published: str = ''
+
+    @property
+    def url(self):
+        return f"{youtube_base_url()}/watch?v={self.video_id}"
+
+
+def _to_bytes(body):
+    if isinstance(body, str):
+        return body.encode('utf-8')
+    return body
+
+
+def find_json_payload(body, name):
+    """
+    Locate and decode the JSON object assigned to a page variable.
+
+    Args:
+        body (bytes | str): Raw page content
+        name (str): Variable name, e.g. 'ytInitialData'
+
+    Returns:
+        dict: Decoded payload or None if it could not be found
+    """
+    body = _to_bytes(body)
+    marker = name.encode('ascii')
+    position = 0
+
+    while True:
+        index = body.find(marker, position)
+        if index == -1:
+            return None
+        position = index + len(marker)
+
+        # Accept `name = {`, `name"] = {` and similar short assignment forms
+        equals = body.find(b'=', position, position + 8)
+        if equals == -1:
+            continue
+        brace = body.find(b'{', equals, equals + 8)
+        if brace == -1 or body[equals + 1:brace].strip():
+            continue
+
+        payload = _decode_object(body, brace)
+        if payload is None:
+            logger.debug("Could not decode %s payload at offset %s", name, brace)
+            continue
+        return payload
+
+
+def _decode_object(body, start):
+    # The payload normally ends its script, so bounding the slice there avoids
+    # decoding the rest of the page; fall back to the full tail if that was wrong
+    end = body.find(b';</script>', start)
+    chunks = [body[start:end], body[start:]] if end != -1 else [body[start:]]
+    for chunk in chunks:
+        try:
+            payload, _ = _decoder.raw_decode(chunk.decode('utf-8', errors='replace'))
+        except ValueError:
+            continue
+        if isinstance(payload, dict):
+            return payload
+    return None
+
+
+def iter_renderers(data, keys):
+    """
+    Yield every dict stored under one of the given keys, in document order.
+    """
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for key in keys:
+                renderer = node.get(key)
+                if isinstance(renderer, dict):
+                    yield renderer
+            stack.extend(reversed([v for k, v in node.items() if k not in keys]))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+
+
+def _text(value):
+    if not isinstance(value, dict):
+        return ''
+    if 'simpleText' in value:
+        return value['simpleText']
+    return ''.join(run.get('text', '') for run in value.get('runs', []))
+
+
+def _video_record(renderer):
+    video_id = renderer.get('videoId')
+    title = _text(renderer.get('title'))
+    thumbnails = renderer.get('thumbnail', {}).get('thumbnails') or []
+    thumbnail = thumbnails[0].get('url', '') if thumbnails else ''
+    if not (video_id and title and thumbnail):
+        return None
+    return VideoRecord(
+        video_id=video_id,
+        title=title,
+        thumbnail=thumbnail,
+        published=_text(renderer.get('publishedTimeText')),
+    )
+
+
+def extract_channel_videos(body):
+    """
+    Extract the videos listed on a channel's videos page.
+
+    Args:
+        body (bytes | str): Raw channel page content
+
+    Returns:
+        list: VideoRecord objects in page order (newest first)
+    """
+    data = find_json_payload(body, INITIAL_DATA)
+    if not data:
+        return []
+
+    videos = []
+    seen = set()
+    for renderer in iter_renderers(data, VIDEO_RENDERER_KEYS):
+        record = _video_record(renderer)
+        if record and record.video_id not in seen:
+            seen.add(record.video_id)
+            videos.append(record)
+    return videos
+
+
+def extract_video_description(body):
+    """
+    Extract the full description from a watch page.
+
+    Args:
+        body (bytes | str): Raw watch page content
+
+    Returns:
+        str: Description text or empty string if not found
+    """
+    player = find_json_payload(body, INITIAL_PLAYER_RESPONSE)
+    if player:
+        description = player.get('videoDetails', {}).get('shortDescription')
+        if description:
+            return description
+        microformat = player.get('microformat', {}).get('playerMicroformatRenderer', {})
+        description = _text(microformat.get('description'))
+        if description:
+            return description
+    return ''
+
+
+def shorten_description(description, max_words=100):
+    """
+    Collapse whitespace and keep the first words of a video description.
+    """
+    words = description.split()
+    shortened = ' '.join(words[:max_words])
+    if len(words) > max_words:
+        shortened += "..."
+    return shortened
@@ -0,0 +1,131 @@
+"""
+Cheap change detection using YouTube channel Atom feeds
+"""
+import logging
+import threading
+import xml.etree.ElementTree as ET
+from .extractor import youtube_base_url
+from .http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+FEED_URL = "{base_url}/feeds/videos.xml?channel_id={channel_id}"
+
+ATOM_NS = '{http://www.w3.org/2005/Atom}'
+YT_NS = '{http://www.youtube.com/xml/schemas/2015}'
+
+
+def parse_feed_video_ids(body):
+    """
+    Extract video IDs from a channel feed, newest first.
+
+    Args:
+        body (bytes | str): Atom feed document
+
+    Returns:
+        list: Video IDs in feed order
+    """
+    root = ET.fromstring(body)
+    video_ids = []
+    for entry in root.iter(f'{ATOM_NS}entry'):
+        video_id = entry.findtext(f'{YT_NS}videoId')
+        if video_id:
+            video_ids.append(video_id)
+    return video_ids
+
+
+class FeedProbe:
+    def __init__(self, http_client=None):
+        """
+        Decide whether a channel needs a full scrape by checking its Atom feed.
+
+        The feed is a few kilobytes and is fetched with a conditional GET, so
+        an unchanged channel usually costs a single 304 response.
+
+        Args:
+            http_client (HttpClient): Client used to fetch feeds
+        """
+        self.http_client = http_client or get_http_client()
+        self._lock = threading.Lock()
+        self._validators = {}    # channel_id -> (etag, last_modified, latest video id)
+        self._pending = {}       # channel_id -> latest feed video id awaiting acknowledgement
+        self._acknowledged = {}  # channel_id -> feed video id handled by a full scrape
+
+    def latest_video_id(self, channel_id):
+        """
+        Fetch the newest video ID listed in the channel's feed.
+
+        Args:
+            channel_id (str): YouTube channel ID
+
+        Returns:
+            str: Newest video ID or None if the feed lists no videos
+        """
+        with self._lock:
+            etag, last_modified, cached_id = self._validators.get(channel_id, (None, None, None))
+
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        response = self.http_client.get(FEED_URL.format(base_url=youtube_base_url(), channel_id=channel_id), headers=headers)
+        if response.status_code == 304 and cached_id:
+            logger.debug("Feed not modified for channel %s", channel_id)
+            return cached_id
+        response.raise_for_status()
+
+        video_ids = parse_feed_video_ids(response.content)
+        latest_id = video_ids[0] if video_ids else None
+        with self._lock:
+            self._validators[channel_id] = (
+                response.headers.get('ETag'),
+                response.headers.get('Last-Modified'),
+                latest_id,
+            )
+        return latest_id
+
+    def has_new_video(self, channel_id, known_video_id):
+        """
+        Check whether the channel may have a video newer than the stored one.
+
+        Errors are treated as a possible change so the caller falls back to
+        the full scrape instead of missing an upload.
+
+        Args:
+            channel_id (str): YouTube channel ID
+            known_video_id (str): Video ID currently stored for the channel
+
+        Returns:
+            bool: True if a full scrape is needed
+        """
+        if not known_video_id:
+            return True
+
+        try:
+            latest_id = self.latest_video_id(channel_id)
+        except Exception as e:
+            logger.warning("Feed probe failed for channel %s: %s", channel_id, e)
+            return True
+
+        if not latest_id:
+            return True
+
+        with self._lock:
+            if latest_id in (known_video_id, self._acknowledged.get(channel_id)):
+                return False
+            self._pending[channel_id] = latest_id
+        return True
+
+    def acknowledge(self, channel_id):
+        """
+        Record that the change reported for a channel has been handled.
+
+        The feed can list uploads (such as Shorts) that the videos page does
+        not show; acknowledging stops those from triggering a scrape every cycle.
+        """
+        with self._lock:
+            latest_id = self._pending.pop(channel_id, None)
+            if latest_id:
+                self._acknowledged[channel_id] = latest_id
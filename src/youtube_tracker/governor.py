@@ -0,0 +1,397 @@
+"""
+Adaptive concurrency and backoff for requests to YouTube and Google search
+
+Every request to a governed target (YouTube pages and feeds, search
+backend calls) goes through one shared Governor, which keeps per target:
+
+- a concurrency limit adjusted with AIMD: it starts at
+  GOVERNOR_MAX_CONCURRENCY, grows by one request per round of successful
+  requests answered within GOVERNOR_LATENCY_TARGET seconds, and shrinks by
+  a quarter, at most once per round trip, when a request is throttled
+  (429, 503 or a /sorry/ captcha redirect), fails with another 5xx or a
+  connection error, or is slower than the target. Callers over the limit
+  wait for a free slot, so under rate limiting the target is sent as many
+  requests as it keeps answering, not more.
+- a circuit breaker: GOVERNOR_FAILURE_THRESHOLD failures in a row open it
+  for GOVERNOR_OPEN_SECONDS, doubled on every trip that follows a failed
+  probe. While it is open, calls raise CircuitOpenError at once instead of
+  adding to the load; afterwards one probe request is let through
+  (half-open) and its outcome closes or reopens the circuit.
+
+Throttled and failed requests are retried up to GOVERNOR_MAX_RETRIES
+times after a delay drawn uniformly from 0 to GOVERNOR_RETRY_DELAY * 2 **
+attempt (full jitter), so callers that failed together do not retry
+together, and never before the response's Retry-After. A Retry-After
+longer than GOVERNOR_MAX_WAIT opens the circuit for that long instead of
+holding the caller.
+"""
+import os
+import time
+import random
+import logging
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import requests
+from .extractor import youtube_base_url
+from .metrics import GOVERNOR_CIRCUIT_STATE, GOVERNOR_LIMIT, GOVERNOR_REQUESTS, GOVERNOR_RETRIES
+
+logger = logging.getLogger(__name__)
+
+# Request outcomes
+OK = 'ok'
+SLOW = 'slow'
+THROTTLED = 'throttled'
+ERROR = 'error'
+# Errors that say nothing about the target's load (e.g. a 404), neither retried nor held against it
+IGNORED = 'ignored'
+
+RETRYABLE = (THROTTLED, ERROR)
+THROTTLE_STATUSES = (429, 503)
+
+# Circuit states, also the values of the circuit state gauge
+CLOSED = 0
+HALF_OPEN = 1
+OPEN = 2
+
+DECREASE_FACTOR = 0.75
+MAX_RETRY_DELAY = 30
+MAX_OPEN_SECONDS = 900
+# Weight of the newest sample in the smoothed latency
+LATENCY_SMOOTHING = 0.2
+
+YOUTUBE_HOSTS = ('youtube.com', 'youtu.be')
+
+_default_governor = None
+_default_governor_lock = threading.Lock()
+# Target of the call the current thread is sending, if any
+_active = threading.local()
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of sending a request while the target's circuit is open"""
+
+
+def _env_number(name, default, cast=float):
+    try:
+        return cast(os.getenv(name, str(default)))
+    except ValueError:
+        logger.warning("Invalid %s value, using default %s", name, default)
+        return default
+
+
+def parse_retry_after(value, now=None):
+    """
+    Parse a Retry-After header given in seconds or as an HTTP date.
+
+    Returns:
+        float: Seconds to wait, or None if the value is missing or invalid
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - (now or datetime.now(timezone.utc))).total_seconds())
+
+
+def classify(response=None, error=None):
+    """
+    Classify a response or request exception.
+
+    Args:
+        response: Response returned by the request; any other return
+            value (e.g. parsed search results) counts as OK
+        error (Exception): Exception raised by the request
+
+    Returns:
+        tuple: (outcome, seconds from Retry-After or None)
+    """
+    if error is not None:
+        response = getattr(error, 'response', None)
+        if response is None:
+            if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+                return ERROR, None
+            return IGNORED, None
+    elif not isinstance(response, requests.Response):
+        return OK, None
+    status = response.status_code
+    if status in THROTTLE_STATUSES or '/sorry/' in (response.url or ''):
+        return THROTTLED, parse_retry_after(response.headers.get('Retry-After'))
+    if status >= 500:
+        return ERROR, parse_retry_after(response.headers.get('Retry-After'))
+    return (IGNORED if error is not None else OK), None
+
+
+def target_for(url):
+    """
+    Name the governed target of a URL: 'youtube' for YouTube (and the
+    YOUTUBE_BASE_URL host), None for anything else.
+    """
+    host = (urlsplit(url).hostname or '').lower()
+    if host.endswith(YOUTUBE_HOSTS) or host == urlsplit(youtube_base_url()).hostname:
+        return 'youtube'
+    return None
+
+
+def active_target():
+    """
+    Name the target whose call the current thread is sending, or None.
+
+    A request sent inside a call is already limited and retried as that
+    target, so it must not be governed again by host (a search backend on
+    the YouTube host would otherwise be retried once per attempt).
+    """
+    return getattr(_active, 'target', None)
+
+
+class TargetLimiter:
+    def __init__(self, name, max_limit, latency_target, max_wait, failure_threshold, open_seconds,
+                 clock=time.monotonic):
+        """
+        AIMD concurrency limit and circuit breaker of one target.
+
+        Args:
+            name (str): Target name, for logs and metric labels
+            max_limit (int): Most requests in flight ever allowed, and the initial limit
+            latency_target (float): Slower responses reduce the limit
+            max_wait (float): Longer Retry-After values open the circuit
+            failure_threshold (int): Failures in a row that open the circuit
+            open_seconds (float): How long the circuit first stays open
+            clock (callable): Returns the current monotonic time
+        """
+        self.name = name
+        self.max_limit = max(1, max_limit)
+        self.limit = float(self.max_limit)
+        self.latency_target = latency_target
+        self.max_wait = max_wait
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.clock = clock
+        self.in_flight = 0
+        self.latency = None
+        self.failures = 0
+        self.trips = 0
+        self.state = CLOSED
+        self.open_until = 0.0
+        self.next_decrease_at = 0.0
+        self._probing = False
+        self._condition = threading.Condition()
+        GOVERNOR_LIMIT.set(int(self.limit), target=name)
+        GOVERNOR_CIRCUIT_STATE.set(CLOSED, target=name)
+
+    def acquire(self):
+        """
+        Wait for a free slot.
+
+        Returns:
+            bool: True if the request is the probe of a half-open circuit
+
+        Raises:
+            CircuitOpenError: The circuit is open, or half-open with its
+                probe request already in flight
+        """
+        with self._condition:
+            while True:
+                now = self.clock()
+                if self.state == OPEN:
+                    if now < self.open_until:
+                        raise CircuitOpenError(f"Circuit for {self.name} open for another "
+                                               f"{self.open_until - now:.0f}s")
+                    self._set_state(HALF_OPEN)
+                if self.state == HALF_OPEN:
+                    if self._probing:
+                        raise CircuitOpenError(f"Circuit for {self.name} is half-open, probe in flight")
+                    self._probing = True
+                    self.in_flight += 1
+                    return True
+                if self.in_flight >= int(self.limit):
+                    self._condition.wait(1.0)
+                else:
+                    self.in_flight += 1
+                    return False
+
+    def release(self, outcome, latency, retry_after=None, probe=False):
+        """
+        Free the slot and adjust the limit and circuit to the request's outcome.
+
+        Args:
+            outcome (str): OK, THROTTLED, ERROR or IGNORED
+            latency (float): Seconds the request took
+            retry_after (float): Seconds the server asked to wait, if any
+            probe (bool): What acquire returned
+        """
+        with self._condition:
+            now = self.clock()
+            self.in_flight -= 1
+            if probe:
+                self._probing = False
+            if outcome == OK and latency > self.latency_target:
+                outcome = SLOW
+            GOVERNOR_REQUESTS.inc(target=self.name, result=outcome)
+            if outcome != IGNORED:
+                self.latency = latency if self.latency is None else \
+                    LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * self.latency
+
+            if outcome == OK:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            elif outcome != IGNORED and now >= self.next_decrease_at:
+                # Requests already in flight fail together, so one round trip counts once
+                self.limit = max(1.0, self.limit * DECREASE_FACTOR)
+                self.next_decrease_at = now + self.latency
+            GOVERNOR_LIMIT.set(int(self.limit), target=self.name)
+
+            if outcome in (OK, SLOW):
+                self.failures = 0
+                if probe:
+                    self.trips = 0
+                    self._set_state(CLOSED)
+                    logger.info("Circuit for %s closed", self.name)
+            elif outcome in RETRYABLE:
+                self.failures += 1
+                if retry_after is not None and retry_after > self.max_wait:
+                    self._open(now, retry_after)
+                elif probe or self.failures >= self.failure_threshold:
+                    self.trips += 1
+                    self._open(now, min(self.open_seconds * 2 ** (self.trips - 1), MAX_OPEN_SECONDS))
+            elif probe:
+                # Nothing learned, let the next request probe
+                self._set_state(OPEN)
+                self.open_until = now
+            self._condition.notify_all()
+
+    def _open(self, now, seconds):
+        self.open_until = now + seconds
+        self.failures = 0
+        self._set_state(OPEN)
+        logger.warning("Circuit for %s opened for %.0fs", self.name, seconds)
+
+    def _set_state(self, state):
+        self.state = state
+        GOVERNOR_CIRCUIT_STATE.set(state, target=self.name)
+
+
+class Governor:
+    def __init__(self, max_limit=None, latency_target=None, max_retries=None,
+                 retry_delay=None, max_wait=None, failure_threshold=None, open_seconds=None,
+                 clock=time.monotonic, sleep=time.sleep):
+        """
+        Govern requests to several targets, each with its own TargetLimiter.
+
+        Args:
+            max_limit (int): Highest and initial concurrency per target (GOVERNOR_MAX_CONCURRENCY)
+            latency_target (float): Seconds above which a response counts
+                as congestion (GOVERNOR_LATENCY_TARGET)
+            max_retries (int): Retries of a throttled or failed request (GOVERNOR_MAX_RETRIES)
+            retry_delay (float): Upper bound of the first retry delay (GOVERNOR_RETRY_DELAY)
+            max_wait (float): Longest Retry-After waited out before a retry (GOVERNOR_MAX_WAIT)
+            failure_threshold (int): Failures in a row that open a circuit
+                (GOVERNOR_FAILURE_THRESHOLD)
+            open_seconds (float): First open period of a circuit (GOVERNOR_OPEN_SECONDS)
+            clock (callable): Returns the current monotonic time
+            sleep (callable): Sleeps between retries
+        """
+        self.max_limit = max_limit or _env_number('GOVERNOR_MAX_CONCURRENCY', 8, int)
+        self.latency_target = latency_target or _env_number('GOVERNOR_LATENCY_TARGET', 5)
+        self.max_retries = max_retries if max_retries is not None else _env_number('GOVERNOR_MAX_RETRIES', 2, int)
+        self.retry_delay = retry_delay if retry_delay is not None else _env_number('GOVERNOR_RETRY_DELAY', 1)
+        self.max_wait = max_wait if max_wait is not None else _env_number('GOVERNOR_MAX_WAIT', 60)
+        self.failure_threshold = failure_threshold or _env_number('GOVERNOR_FAILURE_THRESHOLD', 5, int)
+        self.open_seconds = open_seconds or _env_number('GOVERNOR_OPEN_SECONDS', 60)
+        self.clock = clock
+        self.sleep = sleep
+        self._targets = {}
+        self._lock = threading.Lock()
+
+    def target(self, name):
+        """
+        Return the limiter of a target, creating it on first use.
+        """
+        with self._lock:
+            limiter = self._targets.get(name)
+            if limiter is None:
+                limiter = self._targets[name] = TargetLimiter(
+                    name, self.max_limit, self.latency_target, self.max_wait, self.failure_threshold,
+                    self.open_seconds, self.clock
+                )
+            return limiter
+
+    def retry_delay_for(self, attempt, retry_after=None):
+        """
+        Jittered exponential delay before retry number attempt + 1, at
+        least retry_after.
+        """
+        delay = random.uniform(0, min(MAX_RETRY_DELAY, self.retry_delay * 2 ** attempt))
+        return max(delay, retry_after or 0)
+
+    def call(self, target, send):
+        """
+        Send a request to a target under its limit, retrying throttled and
+        failed attempts.
+
+        Args:
+            target (str): Target name, e.g. 'youtube' or 'search'
+            send (callable): Sends the request; returns a response or raises
+
+        Returns:
+            The return value of the last attempt of send
+
+        Raises:
+            CircuitOpenError: The circuit was open before the first attempt
+            Exception: Whatever the last attempt of send raised
+        """
+        limiter = self.target(target)
+        response = error = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                probe = limiter.acquire()
+            except CircuitOpenError:
+                if not attempt:
+                    raise
+                # No retry after all; the last attempt's outcome stands
+                break
+            if attempt:
+                GOVERNOR_RETRIES.inc(target=target)
+                if isinstance(response, requests.Response):
+                    # A retried response is dropped unread
+                    response.close()
+            start = self.clock()
+            response = error = None
+            outer, _active.target = active_target(), target
+            try:
+                response = send()
+            except Exception as e:
+                error = e
+            finally:
+                _active.target = outer
+            outcome, retry_after = classify(response, error)
+            limiter.release(outcome, self.clock() - start, retry_after, probe)
+            if outcome not in RETRYABLE or attempt == self.max_retries:
+                break
+            delay = self.retry_delay_for(attempt, retry_after)
+            if delay > self.max_wait:
+                break
+            logger.debug("Retrying %s request in %.1fs after %s", target, delay, outcome)
+            self.sleep(delay)
+        if error is not None:
+            raise error
+        return response
+
+
+def get_governor():
+    """
+    Return the process-wide governor, creating it on first use.
+    """
+    global _default_governor
+    if _default_governor is None:
+        with _default_governor_lock:
+            if _default_governor is None:
+                _default_governor = Governor()
+    return _default_governor
@@ -0,0 +1,227 @@
+"""
+Queries and retention for the processed_videos history
+
+History is read newest first with keyset pagination: a page ends with an
+opaque cursor holding the (processed_at, id) of its last row, and the next
+page continues strictly below it. Each page is an index range scan of
+ix_processed_videos_channel_time (per channel) or ix_processed_videos_time
+(all channels), so its cost does not grow with the size of the table or
+with how deep the reader has paged, unlike OFFSET.
+
+With HISTORY_RETENTION_DAYS set, rows older than the retention period are
+deleted in short batches along ix_processed_videos_time, together with the
+search result links and results no other video uses.
+"""
+import os
+import json
+import time
+import base64
+import logging
+import binascii
+from datetime import datetime, timedelta
+from sqlalchemy import delete, exists, or_, select
+from .models import LatestVideo, ProcessedVideo, VideoWebResult, WebResult
+from .persistence import chunked, get_batch_size, load_web_search_results
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+HISTORY_FIELDS = ('id', 'channel_id', 'video_id', 'title', 'url', 'thumbnail', 'description', 'summary', 'action')
+
+
+class InvalidCursor(ValueError):
+    """Raised for a pagination cursor that was not produced by list_history"""
+
+
+def encode_cursor(processed_at, row_id):
+    payload = json.dumps([processed_at.isoformat(), row_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Returns:
+        tuple: (processed_at, id) of the last row of the previous page
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        processed_at, row_id = json.loads(payload)
+        return datetime.fromisoformat(processed_at), int(row_id)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid history cursor: {cursor!r}") from e
+
+
+def list_history(db, channel_id=None, since=None, until=None, limit=DEFAULT_PAGE_SIZE, cursor=None,
+                 include_results=False):
+    """
+    Read one page of replaced videos, newest first.
+
+    Args:
+        db (Session): Database session
+        channel_id (str): Only this channel's history
+        since (datetime): Only rows processed at or after this time (UTC)
+        until (datetime): Only rows processed before this time (UTC)
+        limit (int): Rows per page, at most MAX_PAGE_SIZE
+        cursor (str): next_cursor of the previous page
+        include_results (bool): Add each video's web_search_results
+
+    Returns:
+        tuple: (list of row dictionaries, cursor of the next page or None)
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    query = select(ProcessedVideo)
+    if channel_id is not None:
+        query = query.where(ProcessedVideo.channel_id == channel_id)
+    if since is not None:
+        query = query.where(ProcessedVideo.processed_at >= since)
+    if until is not None:
+        query = query.where(ProcessedVideo.processed_at < until)
+    if cursor:
+        processed_at, row_id = decode_cursor(cursor)
+        # (processed_at, id) < cursor, written with a leading range bound on
+        # processed_at so that every backend starts the index scan at the
+        # cursor instead of filtering from the newest row
+        query = query.where(
+            ProcessedVideo.processed_at <= processed_at,
+            or_(ProcessedVideo.processed_at < processed_at, ProcessedVideo.id < row_id),
+        )
+    query = query.order_by(ProcessedVideo.processed_at.desc(), ProcessedVideo.id.desc()).limit(limit + 1)
+
+    rows = db.scalars(query).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].processed_at, rows[-1].id)
+
+    items = [
+        {**{field: getattr(row, field) for field in HISTORY_FIELDS}, 'processed_at': row.processed_at}
+        for row in rows
+    ]
+    if include_results:
+        results = load_web_search_results(db, [item['video_id'] for item in items])
+        for item in items:
+            item['web_search_results'] = results.get(item['video_id'], [])
+    return items, next_cursor
+
+
+def iter_history(db, **filters):
+    """
+    Yield every history row matching the filters of list_history, page by page.
+    """
+    cursor = None
+    while True:
+        items, cursor = list_history(db, cursor=cursor, **filters)
+        yield from items
+        if not cursor:
+            return
+
+
+def get_retention_days():
+    """
+    Read HISTORY_RETENTION_DAYS; 0 (the default) keeps history forever.
+    """
+    return max(0, int(os.getenv('HISTORY_RETENTION_DAYS', '0')))
+
+
+def _delete_unused_results(db, video_ids):
+    # A video ID can still be referenced by latest_videos or another history row
+    still_used = set(db.scalars(select(LatestVideo.video_id).where(LatestVideo.video_id.in_(video_ids))))
+    still_used.update(db.scalars(select(ProcessedVideo.video_id).where(ProcessedVideo.video_id.in_(video_ids))))
+    unused = sorted(set(video_ids) - still_used)
+    if not unused:
+        return
+    result_hashes = set(db.scalars(select(VideoWebResult.result_hash).where(VideoWebResult.video_id.in_(unused))))
+    db.execute(delete(VideoWebResult).where(VideoWebResult.video_id.in_(unused)))
+    if result_hashes:
+        db.execute(
+            delete(WebResult)
+            .where(WebResult.result_hash.in_(sorted(result_hashes)),
+                   ~exists().where(VideoWebResult.result_hash == WebResult.result_hash))
+            .execution_options(synchronize_session=False)
+        )
+
+
+def prune_history(db, before, batch_size=None):
+    """
+    Delete history rows processed before a cutoff, oldest first.
+
+    Every batch is committed on its own so locks are held briefly. Search
+    results only used by the deleted videos are deleted as well.
+
+    Args:
+        db (Session): Database session
+        before (datetime): Cutoff time (UTC)
+        batch_size (int): Rows deleted per transaction (DB_BATCH_SIZE)
+
+    Returns:
+        int: Number of history rows deleted
+    """
+    batch_size = batch_size or get_batch_size()
+    deleted = 0
+    while True:
+        rows = db.execute(
+            select(ProcessedVideo.id, ProcessedVideo.video_id)
+            .where(ProcessedVideo.processed_at < before)
+            .order_by(ProcessedVideo.processed_at, ProcessedVideo.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return deleted
+        db.execute(
+            delete(ProcessedVideo)
+            .where(ProcessedVideo.id.in_([row.id for row in rows]))
+            .execution_options(synchronize_session=False)
+        )
+        for chunk in chunked(sorted({row.video_id for row in rows}), batch_size):
+            _delete_unused_results(db, chunk)
+        db.commit()
+        deleted += len(rows)
+        logger.debug("Pruned %s history rows processed before %s", deleted, before.isoformat())
+
+
+class HistoryPruner:
+    def __init__(self, session_factory, retention_days=None, interval=None, clock=time.time):
+        """
+        Apply the retention period at most once per interval.
+
+        Args:
+            session_factory (callable): Returns a new database session
+            retention_days (int): Days of history to keep (HISTORY_RETENTION_DAYS), 0 keeps all
+            interval (float): Seconds between prunes (HISTORY_PRUNE_INTERVAL)
+            clock (callable): Returns the current time in seconds
+        """
+        self.session_factory = session_factory
+        self.retention_days = get_retention_days() if retention_days is None else retention_days
+        self.interval = interval if interval is not None else float(os.getenv('HISTORY_PRUNE_INTERVAL', '3600'))
+        self.clock = clock
+        self._last_run = None
+
+    def prune_if_due(self):
+        """
+        Returns:
+            int | None: Rows deleted, or None if no prune was due
+        """
+        if not self.retention_days:
+            return None
+        now = self.clock()
+        if self._last_run is not None and now - self._last_run < self.interval:
+            return None
+        self._last_run = now
+        return self.prune()
+
+    def prune(self):
+        before = datetime.utcfromtimestamp(self.clock()) - timedelta(days=self.retention_days)
+        db = self.session_factory()
+        try:
+            deleted = prune_history(db, before)
+        except Exception as e:
+            db.rollback()
+            logger.error("Error pruning history: %s", e)
+            return 0
+        finally:
+            db.close()
+        if deleted:
+            logger.info("Deleted %s history rows older than %s days", deleted, self.retention_days)
+        return deleted
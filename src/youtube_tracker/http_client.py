@@ -0,0 +1,98 @@
+"""
+Shared pooled HTTP client for the YouTube Tracker
+"""
+import os
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from .governor import active_target, get_governor, target_for
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def _env_number(name, default, cast=int):
+    try:
+        return cast(os.getenv(name, str(default)))
+    except ValueError:
+        logger.warning("Invalid %s value, using default %s", name, default)
+        return default
+
+
+class HttpClient:
+    def __init__(self, pool_connections=None, pool_maxsize=None, timeout=None, connect_timeout=None, governor=None):
+        """
+        HTTP client backed by a single keep-alive requests session.
+
+        The session keeps one connection pool per host, so repeated requests
+        to youtube.com or to the same result site reuse open TCP/TLS
+        connections instead of handshaking again. Requests to YouTube go
+        through the governor, which limits their concurrency and retries
+        throttled ones (see governor.py), unless they are sent inside a
+        governed call such as a search backend request.
+
+        Args:
+            pool_connections (int): Number of per-host pools to keep open
+            pool_maxsize (int): Maximum connections kept per host
+            timeout (float): Read timeout in seconds
+            connect_timeout (float): Connect timeout in seconds
+            governor (Governor): Governs requests to YouTube, defaults to the
+                shared governor; pass False to disable
+        """
+        self.pool_connections = pool_connections or _env_number('HTTP_POOL_CONNECTIONS', 20)
+        self.pool_maxsize = pool_maxsize or _env_number('HTTP_POOL_MAXSIZE', 10)
+        self.timeout = timeout or _env_number('HTTP_TIMEOUT', 10, float)
+        self.connect_timeout = connect_timeout or _env_number('HTTP_CONNECT_TIMEOUT', 5, float)
+        self.governor = governor if governor is not None else get_governor()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        # ACCEPT_ENCODING advertises brotli only when a brotli decoder is installed
+        self.session.headers.update({
+            'User-Agent': DEFAULT_USER_AGENT,
+            'Accept-Encoding': ACCEPT_ENCODING,
+        })
+
+    def get(self, url, **kwargs):
+        """
+        Send a GET request through the shared session.
+
+        Args:
+            url (str): URL to fetch
+            **kwargs: Extra arguments passed to requests
+
+        Returns:
+            requests.Response: The response, of the last attempt if retried
+
+        Raises:
+            CircuitOpenError: The governor's circuit for the target is open
+        """
+        kwargs.setdefault('timeout', (self.connect_timeout, self.timeout))
+        target = target_for(url) if self.governor else None
+        if target is None or active_target():
+            # Not governed, or already governed by the call sending it
+            return self.session.get(url, **kwargs)
+        return self.governor.call(target, lambda: self.session.get(url, **kwargs))
+
+    def close(self):
+        self.session.close()
+
+
+def get_http_client():
+    """
+    Return the process-wide shared HTTP client, creating it on first use.
+    """
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = HttpClient()
+    return _default_client
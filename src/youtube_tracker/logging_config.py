@@ -0,0 +1,128 @@
+"""
+Logging setup for the YouTube Tracker
+
+Records are handed to a queue and written by a background listener thread,
+so the threads doing the tracker's work never wait on file or console I/O;
+they only merge the message arguments. Messages use lazy %-style arguments,
+so records below LOG_LEVEL cost a level check and nothing more.
+
+LOG_OUTPUT=json writes one JSON object per line instead of text. Fields
+passed with extra= (e.g. the cycle summary's counts) become keys of the
+object.
+"""
+import os
+import copy
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Attributes every LogRecord has; anything else came from extra=
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as JSON lines"""
+
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES and not name.startswith('_'):
+                data[name] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Merge the arguments now, since they may change once this call
+        # returns, but leave formatting to the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def get_formatter():
+    """
+    Build the formatter selected by LOG_OUTPUT: text (default) or json.
+    """
+    if os.getenv('LOG_OUTPUT', 'text').lower() == 'json':
+        return JsonFormatter()
+    return logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
+
+
+def setup_logging(log_dir='logs'):
+    """
+    Route the package logger through a queue to file and console handlers.
+
+    Called once at startup rather than at import time, so importing the
+    package never creates directories or opens log files. The listener is
+    stopped at exit, which writes out records still in the queue.
+
+    Returns:
+        logging.handlers.QueueListener: The running listener
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    log_level = os.getenv('LOG_LEVEL', 'INFO')
+    formatter = get_formatter()
+
+    # Create logs directory if it doesn't exist
+    os.makedirs(log_dir, exist_ok=True)
+
+    # Configure file handler
+    file_handler = logging.FileHandler(os.path.join(log_dir, 'youtube_tracker.log'), encoding='utf-8')
+    file_handler.setFormatter(formatter)
+
+    # Configure console handler
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+
+    records = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(records, file_handler, console_handler)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+    # Setup the package logger so every module's records are handled
+    logger = logging.getLogger(__name__.rpartition('.')[0])
+    logger.setLevel(getattr(logging, log_level))
+    logger.addHandler(_QueueHandler(records))
+    return _listener
+
+
+def shutdown_logging():
+    """
+    Write out queued records, close the handlers and detach them from the package logger.
+    """
+    global _listener
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+    logger = logging.getLogger(__name__.rpartition('.')[0])
+    for handler in list(logger.handlers):
+        if isinstance(handler, _QueueHandler):
+            logger.removeHandler(handler)
@@ -0,0 +1,254 @@
+"""
+Per-stage metrics in the Prometheus text format
+
+A small stdlib-only registry of counters, gauges and histograms, and an
+HTTP endpoint serving them at /metrics. Stages of a polling cycle are
+timed with stage_timer(), which records the duration in
+youtube_tracker_stage_seconds and counts exceptions in
+youtube_tracker_stage_errors_total.
+"""
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds; cycles can take minutes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=(), registry=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels))
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        super().__init__(name, help, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['buckets'][index] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state['count'] if state else 0
+
+    def _render_value(self, key, state):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, state['buckets']):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, [('le', _format_value(float(bound)))])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+        lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+        """
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = Histogram(
+    'youtube_tracker_stage_seconds', 'Time spent in each stage of a polling cycle', ['stage']
+)
+STAGE_ERRORS = Counter(
+    'youtube_tracker_stage_errors_total', 'Stages that raised an exception', ['stage']
+)
+CHANNELS_CHECKED = Counter(
+    'youtube_tracker_channels_checked_total', 'Channel checks by outcome (changed, unchanged, failed)', ['result']
+)
+VIDEOS_RECORDED = Counter(
+    'youtube_tracker_videos_recorded_total', 'Videos written to latest_videos (added, replaced)', ['action']
+)
+CACHE_LOOKUPS = Counter(
+    'youtube_tracker_cache_lookups_total', 'Search and page context cache lookups by result', ['cache', 'result']
+)
+PAGE_BODIES = Counter(
+    'youtube_tracker_page_bodies_total',
+    'Result pages by how reading ended (complete, budget, byte_cap, content_type, rate_limited)',
+    ['result']
+)
+ENRICHMENT_JOBS = Counter(
+    'youtube_tracker_enrichment_jobs_total',
+    'Enrichment jobs by outcome (done, retried, failed, superseded)', ['result']
+)
+ENRICHMENT_QUEUE_DEPTH = Gauge(
+    'youtube_tracker_enrichment_queue_depth', 'Enrichment jobs waiting to be processed'
+)
+READ_API_REQUESTS = Counter(
+    'youtube_tracker_read_api_requests_total', 'Read API requests by route and status code', ['route', 'status']
+)
+CHANNELS_ENABLED = Gauge(
+    'youtube_tracker_channels_enabled', 'Enabled channels in the channel registry'
+)
+GOVERNOR_REQUESTS = Counter(
+    'youtube_tracker_governor_requests_total',
+    'Governed requests by target and outcome (ok, slow, throttled, error, ignored)', ['target', 'result']
+)
+GOVERNOR_RETRIES = Counter(
+    'youtube_tracker_governor_retries_total', 'Retried governed requests by target', ['target']
+)
+GOVERNOR_LIMIT = Gauge(
+    'youtube_tracker_governor_concurrency_limit', 'Requests in flight allowed per target', ['target']
+)
+GOVERNOR_CIRCUIT_STATE = Gauge(
+    'youtube_tracker_governor_circuit_state', 'Circuit breaker state per target (0 closed, 1 half-open, 2 open)',
+    ['target']
+)
+LAST_CYCLE = Gauge(
+    'youtube_tracker_last_cycle_timestamp_seconds', 'Unix time at which the last polling cycle finished'
+)
+
+
+@contextmanager
+def stage_timer(stage):
+    """
+    Time a block as the given stage and count it as failed if it raises.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port=None, host=None, registry=None):
+    """
+    Serve /metrics on a background thread.
+
+    Args:
+        port (int): Port to listen on (METRICS_PORT); 0 picks a free port
+        host (str): Address to bind (METRICS_HOST, default 127.0.0.1)
+        registry (Registry): Metrics to serve, defaults to the global registry
+
+    Returns:
+        ThreadingHTTPServer: The running server
+    """
+    port = int(os.getenv('METRICS_PORT', '0')) if port is None else port
+    host = host or os.getenv('METRICS_HOST', '127.0.0.1')
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry or REGISTRY
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    logger.info("Serving metrics on http://%s:%s/metrics", host, server.server_address[1])
+    return server
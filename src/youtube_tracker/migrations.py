@@ -0,0 +1,126 @@
+"""
+Schema migrations for the YouTube Tracker
+
+create_all only creates missing tables, so columns and indexes added to
+existing models are created here as well. Data migrations, such as moving
+the legacy web_search_results JSON into web_results, only touch rows that
+still need them. Migrations are additive and safe to run repeatedly.
+
+On PostgreSQL indexes missing from existing tables are built with CREATE
+INDEX CONCURRENTLY outside a transaction, so a migration at startup does
+not block writes to a large table while the index is built. An index left
+invalid by an interrupted build is dropped and built again.
+"""
+import logging
+from sqlalchemy import inspect, null, select, text, update
+from sqlalchemy.orm import Session
+from .models import Base, LatestVideo, ProcessedVideo
+from .persistence import get_batch_size, store_web_search_results
+
+logger = logging.getLogger(__name__)
+
+
+def _add_missing_columns(connection, table, existing):
+    preparer = connection.dialect.identifier_preparer
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        column_type = column.type.compile(dialect=connection.dialect)
+        connection.execute(text(
+            f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {column_type}"
+        ))
+        logger.info("Added column %s.%s", table.name, column.name)
+
+
+def _invalid_indexes(connection):
+    if connection.dialect.name != 'postgresql':
+        return set()
+    return set(connection.scalars(text(
+        "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE NOT i.indisvalid"
+    )))
+
+
+def _create_index(engine, index, rebuild=False):
+    if engine.dialect.name != 'postgresql':
+        with engine.begin() as connection:
+            index.create(bind=connection)
+        return
+    options = index.dialect_options['postgresql']
+    options['concurrently'] = True
+    try:
+        # CONCURRENTLY cannot run inside a transaction block
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            if rebuild:
+                connection.execute(text(
+                    f"DROP INDEX CONCURRENTLY IF EXISTS {connection.dialect.identifier_preparer.quote(index.name)}"
+                ))
+            index.create(bind=connection)
+    finally:
+        options['concurrently'] = False
+
+
+def _migrate_web_search_results(connection, model, batch_size):
+    """
+    Move a table's web_search_results JSON into web_results and empty it.
+    """
+    key, = model.__table__.primary_key.columns
+    # Joins the connection's transaction, which the caller commits
+    db = Session(bind=connection)
+    migrated = 0
+    while True:
+        rows = db.execute(
+            select(key, model.video_id, model.web_search_results)
+            .where(model.web_search_results.is_not(None))
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        # A video's latest and processed rows hold the same results; the
+        # first copy found wins
+        results = {}
+        for row in rows:
+            if row.web_search_results:
+                results.setdefault(row.video_id, row.web_search_results)
+        store_web_search_results(db, results, batch_size)
+        db.execute(
+            update(model)
+            .where(key.in_([getattr(row, key.name) for row in rows]))
+            .values(web_search_results=null())
+            .execution_options(synchronize_session=False)
+        )
+        migrated += len(rows)
+    db.close()
+    if migrated:
+        logger.info("Moved web search results of %s %s rows to web_results", migrated, model.__tablename__)
+
+
+def migrate(engine):
+    """
+    Bring the database schema up to date with the models.
+
+    Args:
+        engine (Engine): Database engine
+    """
+    Base.metadata.create_all(bind=engine)
+    missing_indexes = []
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        invalid = _invalid_indexes(connection)
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            _add_missing_columns(connection, table, existing)
+
+            indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            missing_indexes.extend(
+                (index, index.name in invalid) for index in table.indexes
+                if index.name not in indexes or index.name in invalid
+            )
+
+    for index, rebuild in missing_indexes:
+        _create_index(engine, index, rebuild)
+        logger.info("Created index %s", index.name)
+
+    batch_size = get_batch_size()
+    for model in (LatestVideo, ProcessedVideo):
+        with engine.begin() as connection:
+            _migrate_web_search_results(connection, model, batch_size)
@@ -0,0 +1,118 @@
+"""
+Database models for the YouTube Tracker
+"""
+from datetime import datetime
+from sqlalchemy import (
+    Column, String, DateTime, Integer, BigInteger, Boolean, JSON, ForeignKey, Index, UniqueConstraint
+)
+from sqlalchemy.ext.declarative import declarative_base
+
+Base = declarative_base()
+
+# latest_videos.enrichment_status values; NULL (rows from before the queue) counts as done
+ENRICHMENT_PENDING = 'pending'
+ENRICHMENT_DONE = 'done'
+ENRICHMENT_FAILED = 'failed'
+
+class Channel(Base):
+    """A tracked channel and its settings (see channels.py)"""
+    __tablename__ = "channels"
+
+    channel_id = Column(String, primary_key=True)
+    title = Column(String, nullable=True)
+    enabled = Column(Boolean, nullable=False, default=True)
+    # Higher priorities are checked first within a cycle
+    priority = Column(Integer, nullable=False, default=0)
+    last_checked_at = Column(DateTime, nullable=True)
+    last_changed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # Set by settings changes only, so running trackers reload just those rows
+    updated_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class LatestVideo(Base):
+    __tablename__ = "latest_videos"
+
+    channel_id = Column(String, primary_key=True)
+    video_id = Column(String, nullable=False)
+    title = Column(String, nullable=False)
+    url = Column(String, nullable=False)
+    thumbnail = Column(String, nullable=False)
+    description = Column(String)
+    # Extractive summary of the web search results (see summarizer.py)
+    summary = Column(String, nullable=True)
+    # Legacy; results are stored in web_results and video_web_results
+    web_search_results = Column(JSON, nullable=True)
+    enrichment_status = Column(String, nullable=True)
+    # Indexed for the incremental refreshes of the read API snapshot
+    updated_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class ProcessedVideo(Base):
+    __tablename__ = "processed_videos"
+    __table_args__ = (
+        # Keyset pagination of a channel's history and of time ranges (see history.py)
+        Index('ix_processed_videos_channel_time', 'channel_id', 'processed_at', 'id'),
+        Index('ix_processed_videos_time', 'processed_at', 'id'),
+        Index('ix_processed_videos_video', 'video_id'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    channel_id = Column(String, nullable=False)
+    video_id = Column(String, nullable=False)
+    title = Column(String, nullable=False)
+    url = Column(String, nullable=False)
+    thumbnail = Column(String, nullable=False)
+    description = Column(String)
+    summary = Column(String, nullable=True)
+    # Legacy; results are stored in web_results and video_web_results
+    web_search_results = Column(JSON, nullable=True)
+    processed_at = Column(DateTime, default=datetime.utcnow)
+    action = Column(String, nullable=False)  # 'replaced' or 'removed'
+
+class ChannelLease(Base):
+    __tablename__ = "channel_leases"
+
+    channel_id = Column(String, primary_key=True)
+    owner = Column(String, nullable=True)
+    lease_token = Column(String, nullable=True, index=True)
+    leased_until = Column(DateTime, nullable=True)
+    completed_cycle = Column(BigInteger, nullable=False, default=-1)
+
+class EnrichmentJob(Base):
+    __tablename__ = "enrichment_jobs"
+    __table_args__ = (
+        UniqueConstraint('channel_id', 'video_id', name='uq_enrichment_jobs_video'),
+        Index('ix_enrichment_jobs_claim', 'status', 'available_at'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    channel_id = Column(String, nullable=False)
+    video_id = Column(String, nullable=False)
+    title = Column(String, nullable=False)
+    description = Column(String)
+    status = Column(String, nullable=False, default='pending')  # 'pending' or 'failed'
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    lock_token = Column(String, nullable=True, index=True)
+    locked_until = Column(DateTime, nullable=True)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class WebResult(Base):
+    """A search result with its page context, stored once per distinct content"""
+    __tablename__ = "web_results"
+
+    # SHA-256 of url, title, snippet and context
+    result_hash = Column(String, primary_key=True)
+    url = Column(String, nullable=False, index=True)
+    title = Column(String)
+    snippet = Column(String)
+    context = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class VideoWebResult(Base):
+    """Search results of a video, shared by its latest_videos and processed_videos rows"""
+    __tablename__ = "video_web_results"
+
+    video_id = Column(String, primary_key=True)
+    position = Column(Integer, primary_key=True)
+    result_hash = Column(String, ForeignKey('web_results.result_hash'), nullable=False, index=True)
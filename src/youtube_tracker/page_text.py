@@ -0,0 +1,179 @@
+"""
+Streaming extraction of visible text from web pages
+
+The page body is decoded and fed to an incremental HTML tokenizer chunk by
+chunk. Text inside script and style elements is skipped, and reading stops
+as soon as the character budget is met or the byte cap is reached, so
+large pages are neither fully downloaded nor parsed into a tree.
+
+The result matches BeautifulSoup's get_text(' ', strip=True) with
+whitespace collapsed, truncated to the budget.
+"""
+import re
+import codecs
+import logging
+from html.parser import HTMLParser
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CHARS = 1000
+
+# Elements whose content is not visible text
+SKIPPED_TAGS = frozenset(('script', 'style'))
+
+DEFAULT_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain')
+
+_META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([A-Za-z0-9_.:-]+)', re.IGNORECASE)
+
+
+class VisibleTextParser(HTMLParser):
+    """Collect visible words until max_chars characters of text are known"""
+
+    def __init__(self, max_chars=DEFAULT_MAX_CHARS):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self._words = []
+        self._length = 0
+        self._run = []
+        self._skip_depth = 0
+
+    @property
+    def done(self):
+        return self._length >= self.max_chars
+
+    def _flush(self):
+        # Text between two tags can arrive in pieces split mid-word, so words
+        # are only formed at tag boundaries
+        if not self._run:
+            return
+        text = ''.join(self._run)
+        self._run = []
+        for word in text.split():
+            if self._length >= self.max_chars:
+                return
+            self._length += len(word) + (1 if self._words else 0)
+            self._words.append(word)
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush()
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag in SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._run.append(data)
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def handle_pi(self, data):
+        self._flush()
+
+    def text(self):
+        self._flush()
+        return ' '.join(self._words)[:self.max_chars]
+
+
+def parse_content_type(header):
+    """
+    Split a Content-Type header into its media type and charset.
+
+    Returns:
+        tuple: (lowercased media type, charset or None)
+    """
+    parts = [part.strip() for part in (header or '').split(';')]
+    charset = None
+    for part in parts[1:]:
+        name, _, value = part.partition('=')
+        if name.strip().lower() == 'charset':
+            charset = value.strip().strip('"\'') or None
+    return parts[0].lower(), charset
+
+
+def is_allowed_content_type(header, allowed=DEFAULT_CONTENT_TYPES):
+    """
+    Check a Content-Type header against the allowed media types.
+
+    A missing header is allowed, since many servers omit it for HTML.
+    """
+    media_type, _ = parse_content_type(header)
+    return not media_type or media_type in allowed
+
+
+def sniff_encoding(head, declared=None):
+    """
+    Pick the text encoding from the header charset, a BOM or a meta tag.
+
+    Args:
+        head (bytes): First bytes of the body
+        declared (str): Charset from the Content-Type header
+
+    Returns:
+        str: A codec name known to Python
+    """
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    candidates = [declared]
+    match = _META_CHARSET.search(head[:2048])
+    if match:
+        candidates.append(match.group(1).decode('ascii'))
+    for candidate in candidates:
+        if not candidate:
+            continue
+        try:
+            return codecs.lookup(candidate).name
+        except LookupError:
+            logger.debug("Unknown charset %s", candidate)
+    return 'utf-8'
+
+
+def extract_visible_text(chunks, max_chars=DEFAULT_MAX_CHARS, max_bytes=None, charset=None):
+    """
+    Extract the first visible text of an HTML body read in chunks.
+
+    Args:
+        chunks (iterable): Body as bytes chunks, e.g. response.iter_content()
+        max_chars (int): Characters of text to keep
+        max_bytes (int): Stop reading after this many bytes
+        charset (str): Charset declared in the Content-Type header
+
+    Returns:
+        tuple: (text, reason) where reason is 'complete' if the whole body
+        was read, 'budget' if reading stopped once max_chars were known and
+        'byte_cap' if it stopped at max_bytes
+    """
+    parser = VisibleTextParser(max_chars)
+    decoder = None
+    received = 0
+    reason = 'complete'
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if max_bytes is not None and received + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - received]
+            reason = 'byte_cap'
+        received += len(chunk)
+        if decoder is None:
+            decoder = codecs.getincrementaldecoder(sniff_encoding(chunk, charset))(errors='replace')
+        parser.feed(decoder.decode(chunk))
+        if parser.done:
+            return parser.text(), 'budget'
+        if reason == 'byte_cap':
+            return parser.text(), reason
+
+    if decoder is not None:
+        parser.feed(decoder.decode(b'', final=True))
+    parser.close()
+    return parser.text(), reason
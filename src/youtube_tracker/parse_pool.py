@@ -0,0 +1,142 @@
+"""
+Process pool for parsing fetched pages
+
+Fetching stays on the tracker's threads, but decoding ytInitialData and
+tokenizing result pages is CPU work that holds the GIL, so at thousands of
+channels per cycle one core saturates. With PARSE_WORKERS set, fetch
+threads hand raw page bodies to a pool of parse processes and wait for
+compact results: tuples of video fields, a shortened description or the
+extracted page text. Only bytes go in and small values come out, so the
+cost of crossing the process boundary stays small next to the parse.
+
+PARSE_WORKERS=0 (the default) parses in the calling thread, as before.
+Fetch threads block while their page is parsed, so MAX_CONCURRENT_CHANNELS
+and SEARCH_FETCH_CONCURRENCY should be at least PARSE_WORKERS to keep every
+worker busy.
+"""
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from .extractor import VideoRecord, extract_channel_videos, extract_video_description, shorten_description
+from .page_text import DEFAULT_MAX_CHARS, extract_visible_text
+
+logger = logging.getLogger(__name__)
+
+
+def get_parse_workers():
+    """
+    Read PARSE_WORKERS; 0 parses in the calling thread, -1 uses one worker per CPU.
+    """
+    try:
+        workers = int(os.getenv('PARSE_WORKERS', '0'))
+    except ValueError:
+        logger.warning("Invalid PARSE_WORKERS value, parsing in the calling thread")
+        return 0
+    if workers < 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+# The parse functions run in the worker processes, so they are module-level
+# and take and return only plain values
+
+def parse_channel_page(body):
+    """
+    Returns:
+        list: (video_id, title, thumbnail, published) tuples, newest first
+    """
+    return [(video.video_id, video.title, video.thumbnail, video.published)
+            for video in extract_channel_videos(body)]
+
+
+def parse_watch_page(body):
+    """
+    Returns:
+        str: The shortened video description
+    """
+    return shorten_description(extract_video_description(body))
+
+
+def parse_page_text(body, charset=None, max_chars=DEFAULT_MAX_CHARS):
+    """
+    Extract the visible text from the start of a result page.
+
+    Returns:
+        tuple: (text, reason) as returned by extract_visible_text
+    """
+    return extract_visible_text([body], max_chars=max_chars, charset=charset)
+
+
+def parse_page_html(body, encoding=None):
+    """
+    Extract the context of a whole result page with BeautifulSoup (PAGE_CONTEXT_MODE=full).
+    """
+    # web_search imports this module
+    from .web_search import WebSearcher
+
+    return WebSearcher.extract_context(body.decode(encoding or 'utf-8', errors='replace'))
+
+
+class ParsePool:
+    def __init__(self, workers=None):
+        """
+        Run parse functions in worker processes, or inline without workers.
+
+        The processes are started on first use, with the spawn method since
+        forking a process that runs many threads can copy held locks.
+
+        Args:
+            workers (int): Parse processes (PARSE_WORKERS), 0 parses inline
+        """
+        self.workers = get_parse_workers() if workers is None else workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                )
+                logger.info("Started %s parse workers", self.workers)
+            return self._executor
+
+    def run(self, func, *args):
+        """
+        Call func(*args) in a worker process and wait for its result.
+
+        If a worker died, the pool is replaced and this call is parsed inline.
+        """
+        if not self.workers:
+            return func(*args)
+        executor = self._get_executor()
+        try:
+            return executor.submit(func, *args).result()
+        except BrokenProcessPool:
+            logger.error("A parse worker died, restarting the parse pool")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False)
+            return func(*args)
+
+    def channel_videos(self, body):
+        """
+        Returns:
+            list: VideoRecord objects in page order (newest first)
+        """
+        if not self.workers:
+            return extract_channel_videos(body)
+        return [VideoRecord(*fields) for fields in self.run(parse_channel_page, body)]
+
+    def description(self, body):
+        return self.run(parse_watch_page, body)
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
@@ -0,0 +1,283 @@
+"""
+Batched persistence of polling results
+
+Web search results are stored once per distinct content in web_results,
+keyed by a hash of the URL, title, snippet and context, and linked to
+videos through video_web_results. A video's latest_videos row and, after
+it is replaced, its processed_videos row share the same links, so
+replacing a video no longer copies its results.
+"""
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+from sqlalchemy import delete, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from .models import ENRICHMENT_DONE, LatestVideo, ProcessedVideo, VideoWebResult, WebResult
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+VIDEO_COLUMNS = ('video_id', 'title', 'url', 'thumbnail', 'description', 'summary')
+
+WEB_RESULT_FIELDS = ('url', 'title', 'snippet', 'context')
+
+
+def get_batch_size():
+    """
+    Read the number of rows written per statement from the environment.
+    """
+    try:
+        return max(1, int(os.getenv('DB_BATCH_SIZE', str(DEFAULT_BATCH_SIZE))))
+    except ValueError:
+        logger.warning("Invalid DB_BATCH_SIZE value, using default")
+        return DEFAULT_BATCH_SIZE
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _dialect_insert(db, model, rows):
+    dialect = db.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(model).values(rows)
+    if dialect == 'sqlite':
+        return sqlite.insert(model).values(rows)
+    raise NotImplementedError(f"Upsert is not supported for {dialect}")
+
+
+def insert_ignore_statement(db, model, rows, key):
+    """
+    Build an INSERT ... ON CONFLICT (key) DO NOTHING for the session's dialect.
+
+    key is a column name or a tuple of names of a unique constraint.
+    """
+    index_elements = [key] if isinstance(key, str) else list(key)
+    return _dialect_insert(db, model, rows).on_conflict_do_nothing(index_elements=index_elements)
+
+
+def upsert_statement(db, model, rows, key):
+    """
+    Build an INSERT ... ON CONFLICT (key) DO UPDATE for the session's dialect.
+    """
+    statement = _dialect_insert(db, model, rows)
+    updated = {
+        column: statement.excluded[column]
+        for column in rows[0]
+        if column != key
+    }
+    return statement.on_conflict_do_update(index_elements=[key], set_=updated)
+
+
+def web_result_hash(result):
+    """
+    Hash the content of a search result.
+
+    Returns:
+        str: Hex SHA-256 of the url, title, snippet and context
+    """
+    content = json.dumps([result.get(field) for field in WEB_RESULT_FIELDS], ensure_ascii=False)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def store_web_search_results(db, results_by_video, batch_size=None):
+    """
+    Link videos to their search results, replacing any previous links.
+
+    Results already stored by another video are not written again. Nothing
+    is committed.
+
+    Args:
+        db (Session): Database session
+        results_by_video (dict): video_id -> list of result dictionaries
+        batch_size (int): Rows per statement (DB_BATCH_SIZE)
+    """
+    batch_size = batch_size or get_batch_size()
+    results = {}
+    links = []
+    for video_id, video_results in results_by_video.items():
+        for position, result in enumerate(video_results or []):
+            digest = web_result_hash(result)
+            results[digest] = {'result_hash': digest, **{field: result.get(field) for field in WEB_RESULT_FIELDS}}
+            links.append({'video_id': video_id, 'position': position, 'result_hash': digest})
+
+    for chunk in chunked(list(results_by_video), batch_size):
+        db.execute(delete(VideoWebResult).where(VideoWebResult.video_id.in_(chunk)))
+    rows = list(results.values())
+    for chunk in chunked(rows, batch_size):
+        db.execute(insert_ignore_statement(db, WebResult, chunk, 'result_hash'))
+    for chunk in chunked(links, batch_size):
+        db.execute(insert(VideoWebResult), chunk)
+
+
+def load_web_search_results(db, video_ids, batch_size=None):
+    """
+    Load the search results of videos.
+
+    Returns:
+        dict: video_id -> list of result dictionaries in search order, for
+        videos that have results
+    """
+    batch_size = batch_size or get_batch_size()
+    loaded = {}
+    for chunk in chunked(sorted(set(video_ids)), batch_size):
+        rows = (
+            db.query(VideoWebResult.video_id, *(getattr(WebResult, field) for field in WEB_RESULT_FIELDS))
+            .join(WebResult, WebResult.result_hash == VideoWebResult.result_hash)
+            .filter(VideoWebResult.video_id.in_(chunk))
+            .order_by(VideoWebResult.video_id, VideoWebResult.position)
+        )
+        for video_id, *values in rows:
+            loaded.setdefault(video_id, []).append(dict(zip(WEB_RESULT_FIELDS, values)))
+    return loaded
+
+
+def load_latest_videos(db, channel_ids, batch_size=None):
+    """
+    Load the stored latest video for each channel.
+
+    Args:
+        db (Session): Database session
+        channel_ids (list): Channel IDs to load
+        batch_size (int): Maximum channel IDs per IN clause
+
+    Returns:
+        dict: channel_id -> LatestVideo row
+    """
+    batch_size = batch_size or get_batch_size()
+    channel_ids = list(channel_ids)
+    latest = {}
+    for chunk in chunked(channel_ids, batch_size):
+        for row in db.query(LatestVideo).filter(LatestVideo.channel_id.in_(chunk)):
+            latest[row.channel_id] = row
+    return latest
+
+
+def load_known_video_ids(db, channel_ids, batch_size=None):
+    """
+    Load only the stored video ID for each channel.
+
+    Returns:
+        dict: channel_id -> video_id
+    """
+    batch_size = batch_size or get_batch_size()
+    channel_ids = list(channel_ids)
+    known = {}
+    for chunk in chunked(channel_ids, batch_size):
+        rows = db.query(LatestVideo.channel_id, LatestVideo.video_id).filter(LatestVideo.channel_id.in_(chunk))
+        known.update(dict(rows))
+    return known
+
+
+def load_recorded_video_ids(db, videos, batch_size=None):
+    """
+    Find which of the given videos are already in processed_videos.
+
+    Args:
+        db (Session): Database session
+        videos (list): Video data dictionaries
+        batch_size (int): Maximum video IDs per IN clause
+
+    Returns:
+        set: (channel_id, video_id) pairs found in the history
+    """
+    batch_size = batch_size or get_batch_size()
+    video_ids = sorted({video['video_id'] for video in videos})
+    recorded = set()
+    for chunk in chunked(video_ids, batch_size):
+        rows = db.query(ProcessedVideo.channel_id, ProcessedVideo.video_id).filter(ProcessedVideo.video_id.in_(chunk))
+        recorded.update((channel_id, video_id) for channel_id, video_id in rows)
+    return recorded
+
+
+def save_cycle_results(db, videos, batch_size=None):
+    """
+    Write a cycle's fetched videos using set-based statements.
+
+    A channel may have several new uploads in one cycle; they are given in
+    upload order (oldest first) and recorded as a chain, each one replacing
+    the previous, so every upload ends up in processed_videos and the newest
+    in latest_videos. Current rows are loaded with one query per batch,
+    replaced rows are copied into processed_videos with one bulk insert per
+    batch, and new or changed rows are written with one upsert per batch.
+    Search results of recorded videos are stored with
+    store_web_search_results.
+    For channels with more than one upload, videos already in
+    processed_videos are skipped, which takes one more query per batch.
+    Nothing is committed; the caller commits once for the whole cycle.
+
+    Args:
+        db (Session): Database session
+        videos (list): Video data dictionaries from get_new_videos
+        batch_size (int): Rows per statement (DB_BATCH_SIZE)
+
+    Returns:
+        dict: 'added' and 'replaced' lists of video data that were recorded,
+        in upload order
+    """
+    batch_size = batch_size or get_batch_size()
+    # Group by channel in upload order; a repeated video keeps its first position
+    uploads = {}
+    for video in videos:
+        uploads.setdefault(video['channel_id'], {})[video['video_id']] = video
+    current = load_latest_videos(db, list(uploads), batch_size)
+    several = [video for channel_uploads in uploads.values() if len(channel_uploads) > 1
+               for video in channel_uploads.values()]
+    recorded = load_recorded_video_ids(db, several, batch_size) if several else set()
+    now = datetime.utcnow()
+
+    upserts = []
+    displaced = []
+    searched = {}
+    changes = {'added': [], 'replaced': []}
+    for channel_id, channel_uploads in uploads.items():
+        existing = current.get(channel_id)
+        chain = list(channel_uploads.values())
+        previous = None
+        if existing:
+            previous = {column: getattr(existing, column) for column in VIDEO_COLUMNS}
+            # Uploads up to the stored video were recorded before
+            known = [video['video_id'] for video in chain]
+            if existing.video_id in known:
+                chain = chain[known.index(existing.video_id) + 1:]
+
+        latest = None
+        for video in chain:
+            if (channel_id, video['video_id']) in recorded:
+                continue
+            if previous:
+                displaced.append({
+                    'channel_id': channel_id,
+                    **{column: previous.get(column) for column in VIDEO_COLUMNS},
+                    'processed_at': now,
+                    'action': 'replaced',
+                })
+                changes['replaced'].append(video)
+            else:
+                changes['added'].append(video)
+            if video.get('web_search_results') is not None:
+                searched[video['video_id']] = video['web_search_results']
+            previous = latest = video
+
+        if latest:
+            upserts.append({
+                'channel_id': channel_id,
+                **{column: latest.get(column) for column in VIDEO_COLUMNS},
+                'enrichment_status': latest.get('enrichment_status', ENRICHMENT_DONE),
+                'updated_at': now,
+            })
+
+    for chunk in chunked(displaced, batch_size):
+        db.execute(insert(ProcessedVideo), chunk)
+    for chunk in chunked(upserts, batch_size):
+        db.execute(upsert_statement(db, LatestVideo, chunk, 'channel_id'))
+    if searched:
+        store_web_search_results(db, searched, batch_size)
+
+    # Rows loaded above are now stale
+    db.expire_all()
+    return changes
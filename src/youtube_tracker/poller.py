@@ -0,0 +1,68 @@
+"""
+Concurrent channel polling for the YouTube Tracker
+"""
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+
+
+def get_max_workers():
+    """
+    Read the channel concurrency limit from the environment.
+    """
+    try:
+        max_workers = int(os.getenv('MAX_CONCURRENT_CHANNELS', str(DEFAULT_MAX_WORKERS)))
+    except ValueError:
+        logger.warning("Invalid MAX_CONCURRENT_CHANNELS value, using default")
+        max_workers = DEFAULT_MAX_WORKERS
+    return max(1, max_workers)
+
+
+class ChannelPoller:
+    def __init__(self, fetch, max_workers=None):
+        """
+        Poll channels concurrently using a bounded thread pool.
+
+        Args:
+            fetch (callable): Function taking a channel ID and returning its result
+            max_workers (int): Maximum number of channels fetched at the same time
+        """
+        self.fetch = fetch
+        self.max_workers = max_workers or get_max_workers()
+
+    def _fetch_channel(self, channel_id):
+        try:
+            return self.fetch(channel_id)
+        except Exception as e:
+            logger.error("Error polling channel %s: %s", channel_id, e)
+            return None
+
+    def poll(self, channel_ids):
+        """
+        Fetch all channels concurrently and yield results as they complete.
+
+        Results are yielded in the caller's thread, so database writes done
+        while iterating never run concurrently with each other.
+
+        Args:
+            channel_ids (list): Channel IDs to poll
+
+        Yields:
+            tuple: (channel_id, result) where result is None if the fetch failed
+        """
+        channel_ids = list(dict.fromkeys(c.strip() for c in channel_ids if c and c.strip()))
+        if not channel_ids:
+            return
+
+        workers = min(self.max_workers, len(channel_ids))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='channel-poller') as executor:
+            futures = {
+                executor.submit(self._fetch_channel, channel_id): channel_id
+                for channel_id in channel_ids
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
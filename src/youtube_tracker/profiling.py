@@ -0,0 +1,194 @@
+"""
+On-demand cProfile and tracemalloc capture of polling cycles
+
+Capture is armed for the next N cycles with PROFILE_CYCLES at startup,
+``--profile-cycles`` on the command line or SIGUSR1 while running. Each
+captured cycle is written to PROFILE_DIR as a .prof file (load it with
+pstats or snakeviz) and a tracemalloc snapshot with a text summary of the
+top allocation sites.
+
+cProfile only sees the thread it is enabled in, so work submitted to
+thread pools is wrapped with profiled(): while a capture is active each
+worker thread records into its own profile, and all of them are merged
+when the cycle ends.
+"""
+import os
+import time
+import pstats
+import signal
+import cProfile
+import logging
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+# Allocation sites listed in the text summary
+TOP_ALLOCATIONS = 25
+
+
+class _Capture:
+    def __init__(self, label):
+        self.label = label
+        self.profiles = []
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def thread_profile(self):
+        profile = getattr(self.local, 'profile', None)
+        if profile is None:
+            profile = self.local.profile = cProfile.Profile()
+            with self.lock:
+                self.profiles.append(profile)
+        return profile
+
+
+class CycleProfiler:
+    def __init__(self, output_dir=None, modes=None):
+        """
+        Args:
+            output_dir (str): Where captures are written (PROFILE_DIR)
+            modes (set): 'cpu' and/or 'memory' (PROFILE_MODE, comma-separated)
+        """
+        self.output_dir = output_dir or os.getenv('PROFILE_DIR', 'profiles')
+        if modes is None:
+            modes = {mode.strip().lower() for mode in os.getenv('PROFILE_MODE', 'cpu,memory').split(',')}
+        self.modes = set(modes) & {'cpu', 'memory'}
+        self._remaining = 0
+        self._captured = 0
+        self._capture = None
+        # Reentrant because request() may run in a signal handler on the main thread
+        self._lock = threading.RLock()
+
+    @property
+    def active(self):
+        return self._capture is not None
+
+    def request(self, cycles=1):
+        """
+        Capture the next cycles.
+        """
+        with self._lock:
+            self._remaining = max(self._remaining, cycles)
+        logger.info("Profiling the next %s cycle(s) into %s", cycles, self.output_dir)
+
+    @contextmanager
+    def cycle(self, label='cycle'):
+        """
+        Profile the enclosed cycle if a capture was requested.
+
+        Yields:
+            list: Paths of the files written, filled in when the cycle ends
+        """
+        written = []
+        with self._lock:
+            start = self._remaining > 0 and self._capture is None
+            if start:
+                self._remaining -= 1
+                self._captured += 1
+                capture = self._capture = _Capture(f"{label}-{time.strftime('%Y%m%d-%H%M%S')}-{self._captured}")
+        if not start:
+            yield written
+            return
+
+        tracing = 'memory' in self.modes and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start(10)
+        profile = capture.thread_profile() if 'cpu' in self.modes else None
+        if profile:
+            capture.local.depth = 1
+            profile.enable()
+        try:
+            yield written
+        finally:
+            if profile:
+                profile.disable()
+            snapshot = tracemalloc.take_snapshot() if 'memory' in self.modes and tracemalloc.is_tracing() else None
+            if tracing:
+                tracemalloc.stop()
+            with self._lock:
+                self._capture = None
+            written.extend(self._write(capture, snapshot))
+
+    def _write(self, capture, snapshot):
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, capture.label)
+        written = []
+        try:
+            profiles = [profile for profile in capture.profiles if profile.getstats()]
+            if profiles:
+                stats = pstats.Stats(profiles[0])
+                for profile in profiles[1:]:
+                    stats.add(profile)
+                stats.dump_stats(f"{base}.prof")
+                written.append(f"{base}.prof")
+            if snapshot is not None:
+                snapshot.dump(f"{base}.tracemalloc")
+                with open(f"{base}.tracemalloc.txt", 'w', encoding='utf-8') as summary:
+                    for statistic in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]:
+                        summary.write(f"{statistic}\n")
+                written.extend([f"{base}.tracemalloc", f"{base}.tracemalloc.txt"])
+            logger.info("Wrote profile of %s: %s", capture.label, ', '.join(written))
+        except Exception as e:
+            logger.error("Error writing profile %s: %s", capture.label, e)
+        return written
+
+    def profiled(self, func):
+        """
+        Wrap a function run on a worker thread so active captures include it.
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            capture = self._capture
+            if capture is None or 'cpu' not in self.modes:
+                return func(*args, **kwargs)
+            profile = capture.thread_profile()
+            # Nested wrapped calls on the same thread are already recorded
+            if getattr(capture.local, 'depth', 0):
+                return func(*args, **kwargs)
+            capture.local.depth = 1
+            profile.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.disable()
+                capture.local.depth = 0
+        return wrapper
+
+    def install_signal_handler(self, signum=None, cycles=1):
+        """
+        Arm a capture of the next cycles when the process receives SIGUSR1.
+        """
+        signum = signum or getattr(signal, 'SIGUSR1', None)
+        if signum is None:
+            logger.warning("Signal-triggered profiling is not supported on this platform")
+            return
+        signal.signal(signum, lambda received, frame: self.request(cycles))
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler():
+    """
+    Return the shared cycle profiler.
+    """
+    global _profiler
+    if _profiler is None:
+        with _profiler_lock:
+            if _profiler is None:
+                _profiler = CycleProfiler()
+    return _profiler
+
+
+def profiled(func):
+    """
+    Decorator form of CycleProfiler.profiled for the shared profiler.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        return get_profiler().profiled(func)(*args, **kwargs)
+    return wrapper
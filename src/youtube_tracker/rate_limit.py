@@ -0,0 +1,145 @@
+"""
+Per-host token bucket rate limiting for outbound page fetches
+"""
+import os
+import time
+import logging
+import threading
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        logger.warning("Invalid %s value, using default %s", name, default)
+        return default
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        """
+        Token bucket refilled at a constant rate.
+
+        Callers reserve a token and sleep until it is available, so waiting
+        callers are served in arrival order.
+
+        Args:
+            rate (float): Tokens added per second
+            capacity (float): Maximum tokens stored (burst size)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, max_wait=None):
+        """
+        Take a token and return how many seconds to wait before using it.
+
+        Args:
+            max_wait (float): Take no token if the wait would be longer
+
+        Returns:
+            float: Seconds to wait, or None if no token was taken
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            wait = -self.tokens / self.rate
+            if max_wait is not None and wait > max_wait:
+                self.tokens += 1
+                return None
+            return wait
+
+    def acquire(self, max_wait=None):
+        """
+        Block until a token is available.
+
+        Args:
+            max_wait (float): Give up at once if the wait would be longer
+
+        Returns:
+            float: Seconds spent waiting, or None if the wait was too long
+        """
+        wait = self.reserve(max_wait)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def is_idle(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            return self.tokens >= self.capacity
+
+
+class HostRateLimiter:
+    def __init__(self, rate=None, burst=None, max_hosts=10000, max_wait=None):
+        """
+        Keep one token bucket per host so each site is fetched politely while
+        unrelated sites proceed in parallel.
+
+        Callers run on a shared, bounded fetch pool, so a wait is capped:
+        a request that would wait longer than max_wait is refused instead,
+        and a single busy host cannot hold every fetch thread.
+
+        Args:
+            rate (float): Requests per second allowed for each host
+            burst (float): Requests a host may receive back to back
+            max_hosts (int): Idle buckets are dropped beyond this many hosts
+            max_wait (float): Longest wait for a token (HOST_RATE_MAX_WAIT)
+        """
+        self.rate = rate or _env_float('HOST_RATE_LIMIT', 0.5)
+        self.burst = burst or _env_float('HOST_RATE_BURST', 1)
+        self.max_wait = max_wait if max_wait is not None else _env_float('HOST_RATE_MAX_WAIT', 2)
+        self.max_hosts = max_hosts
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_key(url):
+        host = (urlsplit(url).hostname or '').lower()
+        if host.startswith('www.'):
+            host = host[4:]
+        return host
+
+    def _bucket(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                if len(self._buckets) >= self.max_hosts:
+                    self._buckets = {k: b for k, b in self._buckets.items() if not b.is_idle()}
+                bucket = TokenBucket(self.rate, self.burst)
+                self._buckets[host] = bucket
+            return bucket
+
+    def acquire(self, url, max_wait=None):
+        """
+        Block until the URL's host may be requested.
+
+        Args:
+            url (str): URL about to be requested
+            max_wait (float): Longest wait for this call, defaults to the
+                limiter's max_wait
+
+        Returns:
+            float: Seconds spent waiting, or None if the host may not be
+            requested within max_wait seconds
+        """
+        host = self.host_key(url)
+        max_wait = self.max_wait if max_wait is None else max_wait
+        wait = self._bucket(host).acquire(max_wait)
+        if wait is None:
+            logger.debug("Rate limit on %s would wait over %.1fs", host, max_wait)
+        elif wait > 0:
+            logger.debug("Waited %.2fs for rate limit on %s", wait, host)
+        return wait
@@ -0,0 +1,372 @@
+"""
+Read API for the latest videos
+
+A small HTTP service that answers reads of latest_videos from an in-memory
+snapshot, so consumers no longer query or poll the database. The snapshot
+is refreshed incrementally: a refresh loads only the rows whose updated_at
+is at or after the newest one seen (less REFRESH_OVERLAP, for transactions
+that committed late), together with their web search results. Refreshes
+run every READ_API_REFRESH_INTERVAL seconds, and right away when the
+tracker in the same process records a change.
+
+Endpoints:
+    GET /videos                 Every channel's latest video
+    GET /videos?channel=ID,ID   Latest videos of the given channels
+    GET /videos/<channel_id>    One channel's latest video
+    GET /events                 Server-sent events, one per changed video
+
+Responses carry an ETag derived from their content, so it is the same on
+every replica and across restarts, and a request whose If-None-Match
+matches gets 304 Not Modified. Adding wait=<seconds> to such a request
+turns it into a long poll that returns as soon as the response changes.
+"""
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from datetime import timedelta
+from urllib.parse import parse_qs, unquote, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from sqlalchemy import select
+from .metrics import READ_API_REQUESTS
+from .models import ENRICHMENT_DONE, LatestVideo
+from .persistence import VIDEO_COLUMNS, load_web_search_results
+
+logger = logging.getLogger(__name__)
+
+# Rows updated this long before the newest row seen are read again
+REFRESH_OVERLAP = 60
+# Longest long poll, in seconds
+MAX_WAIT = 300
+# Seconds between comments keeping an idle event stream open
+KEEPALIVE_INTERVAL = 15
+
+
+def make_etag(body):
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Check an If-None-Match header against an ETag (weak comparison).
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return etag in [tag[2:] if tag.startswith('W/') else tag for tag in tags]
+
+
+def _encode(data):
+    return json.dumps(data, ensure_ascii=False, sort_keys=True).encode('utf-8')
+
+
+class LatestVideoSnapshot:
+    def __init__(self, session_factory, refresh_interval=None):
+        """
+        In-memory copy of latest_videos, kept current by incremental refreshes.
+
+        Every refresh that finds changes increments the snapshot version, and
+        each channel remembers the version its video last changed at, which
+        is what event streams and long polls wait on.
+
+        Args:
+            session_factory (callable): Returns a new database session
+            refresh_interval (float): Seconds between refreshes (READ_API_REFRESH_INTERVAL)
+        """
+        self.session_factory = session_factory
+        if refresh_interval is None:
+            refresh_interval = float(os.getenv('READ_API_REFRESH_INTERVAL', '2'))
+        self.refresh_interval = refresh_interval
+        # Event IDs carry it so that a client reconnecting after a restart
+        # gets every video again
+        self.epoch = uuid.uuid4().hex[:8]
+        self.version = 0
+        self._videos = {}
+        self._bodies = {}
+        self._versions = {}
+        self._keys = {}
+        self._watermark = None
+        self._bulk = None
+        self._condition = threading.Condition()
+        self._refresh_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def refresh(self):
+        """
+        Load rows changed since the last refresh.
+
+        Returns:
+            int: Number of channels whose video changed
+        """
+        with self._refresh_lock:
+            query = select(LatestVideo.channel_id, *(getattr(LatestVideo, column) for column in VIDEO_COLUMNS),
+                           LatestVideo.enrichment_status, LatestVideo.updated_at)
+            if self._watermark is not None:
+                query = query.where(LatestVideo.updated_at >= self._watermark - timedelta(seconds=REFRESH_OVERLAP))
+            db = self.session_factory()
+            try:
+                rows = db.execute(query).all()
+                changed = [
+                    row for row in rows
+                    if self._keys.get(row.channel_id) != (row.video_id, row.updated_at, row.enrichment_status)
+                ]
+                results = load_web_search_results(db, [row.video_id for row in changed]) if changed else {}
+            finally:
+                db.close()
+
+            timestamps = [row.updated_at for row in rows if row.updated_at is not None]
+            if timestamps:
+                self._watermark = max([self._watermark or timestamps[0]] + timestamps)
+            if not changed:
+                return 0
+
+            with self._condition:
+                self.version += 1
+                for row in changed:
+                    video = {
+                        'channel_id': row.channel_id,
+                        **{column: getattr(row, column) for column in VIDEO_COLUMNS},
+                        'enrichment_status': row.enrichment_status or ENRICHMENT_DONE,
+                        'web_search_results': results.get(row.video_id, []),
+                        'updated_at': row.updated_at.isoformat() if row.updated_at else None,
+                    }
+                    self._videos[row.channel_id] = video
+                    self._bodies[row.channel_id] = _encode(video)
+                    self._versions[row.channel_id] = self.version
+                    self._keys[row.channel_id] = (row.video_id, row.updated_at, row.enrichment_status)
+                self._bulk = None
+                self._condition.notify_all()
+            logger.debug("Read snapshot version %s: %s channels changed", self.version, len(changed))
+            return len(changed)
+
+    def get_channel(self, channel_id):
+        """
+        Returns:
+            tuple: (version, body, etag) of the channel's video, or (version, None, None)
+        """
+        with self._condition:
+            body = self._bodies.get(channel_id)
+            return self.version, body, make_etag(body) if body is not None else None
+
+    def get_videos(self, channel_ids=None):
+        """
+        Serialized latest videos, all of them ordered by channel or those of channel_ids in that order.
+
+        Returns:
+            tuple: (version, body, etag)
+        """
+        with self._condition:
+            if channel_ids is None and self._bulk is not None and self._bulk[0] == self.version:
+                return self._bulk
+            ids = sorted(self._bodies) if channel_ids is None else channel_ids
+            bodies = [self._bodies[channel_id] for channel_id in ids if channel_id in self._bodies]
+            version = self.version
+        body = b'{"videos": [' + b', '.join(bodies) + b']}'
+        response = (version, body, make_etag(body))
+        if channel_ids is None:
+            with self._condition:
+                if self.version == version:
+                    self._bulk = response
+        return response
+
+    def wait_for_change(self, version, timeout):
+        """
+        Block until the snapshot is newer than version, the timeout expires or the snapshot stops.
+
+        Returns:
+            int: The current version
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self.version > version or self._stopped.is_set(), timeout)
+            return self.version
+
+    def changes_since(self, version, channel_ids=None):
+        """
+        Videos that changed after a version, oldest change first.
+
+        Returns:
+            list: (version, video) tuples
+        """
+        with self._condition:
+            changes = [
+                (self._versions[channel_id], video) for channel_id, video in self._videos.items()
+                if self._versions[channel_id] > version and (channel_ids is None or channel_id in channel_ids)
+            ]
+        return sorted(changes, key=lambda change: (change[0], change[1]['channel_id']))
+
+    def notify(self):
+        """
+        Refresh as soon as possible, e.g. after the tracker committed a change.
+        """
+        self._wake.set()
+
+    @property
+    def stopped(self):
+        return self._stopped.is_set()
+
+    def start(self):
+        """
+        Load the snapshot, then keep refreshing it on a background thread.
+        """
+        if self._thread is not None:
+            return
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error("Error loading read snapshot: %s", e)
+        self._thread = threading.Thread(target=self._run, name='read-snapshot', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.refresh_interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error("Error refreshing read snapshot: %s", e)
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self._thread = None
+
+
+def _split_channels(params):
+    values = params.get('channel')
+    if not values:
+        return None
+    return [channel_id for value in values for channel_id in value.split(',') if channel_id]
+
+
+class _ReadAPIHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = url.path.rstrip('/')
+        params = parse_qs(url.query)
+        snapshot = self.server.snapshot
+        channel_ids = _split_channels(params)
+
+        if path == '/events':
+            READ_API_REQUESTS.inc(route='events', status='200')
+            self._stream(snapshot, channel_ids)
+            return
+        if path == '/videos':
+            route, read = 'videos', lambda: snapshot.get_videos(channel_ids)
+        elif path.startswith('/videos/'):
+            channel_id = unquote(path[len('/videos/'):])
+            route, read = 'channel', lambda: snapshot.get_channel(channel_id)
+        else:
+            self._send_error(404, 'other')
+            return
+
+        try:
+            wait = min(max(float(params.get('wait', ['0'])[0]), 0), MAX_WAIT)
+        except ValueError:
+            self._send_error(400, route)
+            return
+
+        version, body, etag = read()
+        if_none_match = self.headers.get('If-None-Match')
+        deadline = time.monotonic() + wait
+        # Long poll: hold a not-modified answer until the response changes
+        while body is not None and etag_matches(if_none_match, etag) and not snapshot.stopped:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if snapshot.wait_for_change(version, remaining) > version:
+                version, body, etag = read()
+
+        if body is None:
+            self._send_error(404, route)
+        elif etag_matches(if_none_match, etag):
+            READ_API_REQUESTS.inc(route=route, status='304')
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+        else:
+            READ_API_REQUESTS.inc(route=route, status='200')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            self.wfile.write(body)
+
+    def _send_error(self, status, route):
+        READ_API_REQUESTS.inc(route=route, status=str(status))
+        self.send_error(status)
+
+    def _stream(self, snapshot, channel_ids):
+        # A client resuming a stream of this process only gets what it missed;
+        # a new client starts from now, one from before a restart from scratch
+        last_event_id = self.headers.get('Last-Event-ID', '')
+        epoch, _, last_version = last_event_id.partition('-')
+        if not last_event_id:
+            version = snapshot.version
+        elif epoch == snapshot.epoch and last_version.isdigit():
+            version = int(last_version)
+        else:
+            version = 0
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        wanted = set(channel_ids) if channel_ids else None
+        try:
+            self.wfile.write(b': connected\n\n')
+            while not snapshot.stopped:
+                current = snapshot.version
+                changes = snapshot.changes_since(version, wanted)
+                for change_version, video in changes:
+                    event = (f"id: {snapshot.epoch}-{change_version}\nevent: video\n"
+                             f"data: {json.dumps(video, ensure_ascii=False, sort_keys=True)}\n\n")
+                    self.wfile.write(event.encode('utf-8'))
+                # Changes to other channels move the stream along as well
+                version = max([current] + [change_version for change_version, _ in changes])
+                if snapshot.wait_for_change(version, KEEPALIVE_INTERVAL) == version and not snapshot.stopped:
+                    self.wfile.write(b': keepalive\n\n')
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_read_api(snapshot, port=None, host=None):
+    """
+    Start the snapshot's refreshes and serve the read API on a background thread.
+
+    Args:
+        snapshot (LatestVideoSnapshot): Snapshot to serve
+        port (int): Port to listen on (READ_API_PORT); 0 picks a free port
+        host (str): Address to bind (READ_API_HOST, default 127.0.0.1)
+
+    Returns:
+        ThreadingHTTPServer: The running server
+    """
+    port = int(os.getenv('READ_API_PORT', '0')) if port is None else port
+    host = host or os.getenv('READ_API_HOST', '127.0.0.1')
+    snapshot.start()
+    server = ThreadingHTTPServer((host, port), _ReadAPIHandler)
+    server.daemon_threads = True
+    server.snapshot = snapshot
+    threading.Thread(target=server.serve_forever, name='read-api-server', daemon=True).start()
+    logger.info("Serving the read API on http://%s:%s/videos", host, server.server_address[1])
+    return server
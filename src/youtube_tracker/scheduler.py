@@ -0,0 +1,183 @@
+"""
+Adaptive per-channel polling scheduler
+
+Each channel is checked at an interval derived from how often it uploads,
+learned from the times its videos were replaced in processed_videos.
+Channels are kept in a priority queue ordered by their next check time.
+"""
+import os
+import time
+import heapq
+import random
+import logging
+import threading
+from datetime import datetime, timedelta
+from statistics import median
+from .models import LatestVideo, ProcessedVideo
+
+logger = logging.getLogger(__name__)
+
+# Upload times kept per channel when estimating its cadence
+HISTORY_SIZE = 10
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        logger.warning("Invalid %s value, using default %s", name, default)
+        return default
+
+
+def load_upload_history(db, lookback_days=90):
+    """
+    Load recent detection times of new videos per channel.
+
+    processed_at marks when a channel's previous video was replaced, which
+    is when a new upload was detected; latest_videos.updated_at adds the
+    most recent one.
+
+    Returns:
+        dict: channel_id -> list of datetimes, oldest first
+    """
+    since = datetime.utcnow() - timedelta(days=lookback_days)
+    history = {}
+    rows = (
+        db.query(ProcessedVideo.channel_id, ProcessedVideo.processed_at)
+        .filter(ProcessedVideo.processed_at >= since)
+        .order_by(ProcessedVideo.processed_at)
+    )
+    for channel_id, processed_at in rows:
+        history.setdefault(channel_id, []).append(processed_at)
+    for channel_id, updated_at in db.query(LatestVideo.channel_id, LatestVideo.updated_at):
+        if updated_at and updated_at >= since:
+            times = history.setdefault(channel_id, [])
+            if not times or times[-1] < updated_at:
+                times.append(updated_at)
+    return {channel_id: times[-HISTORY_SIZE:] for channel_id, times in history.items()}
+
+
+class AdaptiveScheduler:
+    def __init__(self, default_interval, min_interval=None, max_interval=None,
+                 jitter=None, factor=None, clock=time.time, rng=None):
+        """
+        Args:
+            default_interval (float): Seconds between checks for channels without history
+            min_interval (float): Shortest interval in seconds (POLL_MIN_INTERVAL minutes)
+            max_interval (float): Longest interval in seconds (POLL_MAX_INTERVAL minutes)
+            jitter (float): Random spread applied to each interval, as a fraction
+            factor (float): Fraction of the typical gap between uploads used as interval
+            clock (callable): Returns the current time in seconds
+            rng (random.Random): Random source for jitter
+        """
+        self.min_interval = min_interval or _env_float('POLL_MIN_INTERVAL', 5) * 60
+        self.max_interval = max_interval or _env_float('POLL_MAX_INTERVAL', 1440) * 60
+        self.default_interval = self._clamp(default_interval)
+        self.jitter = jitter if jitter is not None else _env_float('POLL_JITTER', 0.1)
+        self.factor = factor or _env_float('POLL_INTERVAL_FACTOR', 0.25)
+        self.clock = clock
+        self.rng = rng or random.Random()
+
+        self._history = {}
+        self._intervals = {}
+        self._queue = []
+        self._due = {}
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def _clamp(self, interval):
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def learn(self, history):
+        """
+        Set per-channel intervals from upload history.
+
+        Args:
+            history (dict): channel_id -> list of datetimes, oldest first
+        """
+        with self._lock:
+            for channel_id, times in history.items():
+                self._history[channel_id] = list(times)[-HISTORY_SIZE:]
+                self._intervals[channel_id] = self._estimate(self._history[channel_id])
+
+    def _estimate(self, times):
+        gaps = [(later - earlier).total_seconds() for earlier, later in zip(times, times[1:])]
+        gaps = [gap for gap in gaps if gap > 0]
+        if not gaps:
+            return self.default_interval
+        return self._clamp(median(gaps) * self.factor)
+
+    def interval_for(self, channel_id):
+        return self._intervals.get(channel_id, self.default_interval)
+
+    def _jittered(self, interval):
+        return interval * (1 + self.rng.uniform(-self.jitter, self.jitter))
+
+    def _push(self, channel_id, due):
+        self._counter += 1
+        self._due[channel_id] = due
+        heapq.heappush(self._queue, (due, self._counter, channel_id))
+
+    def add(self, channel_id, due=None):
+        """
+        Start scheduling a channel, due immediately unless a time is given.
+        """
+        with self._lock:
+            if channel_id not in self._due:
+                self._push(channel_id, self.clock() if due is None else due)
+
+    def remove(self, channel_id):
+        with self._lock:
+            # Heap entries are dropped lazily when popped
+            self._due.pop(channel_id, None)
+
+    def channels(self):
+        with self._lock:
+            return set(self._due)
+
+    def pop_due(self):
+        """
+        Remove and return every channel whose check time has passed.
+
+        Returned channels stay unscheduled until reschedule() is called.
+        """
+        now = self.clock()
+        due = []
+        with self._lock:
+            while self._queue and self._queue[0][0] <= now:
+                due_at, _, channel_id = heapq.heappop(self._queue)
+                if self._due.get(channel_id) == due_at:
+                    del self._due[channel_id]
+                    due.append(channel_id)
+        return due
+
+    def reschedule(self, channel_id, changed=False):
+        """
+        Schedule a channel's next check after it has been polled.
+
+        A channel that just changed is checked again at the minimum interval,
+        since uploads tend to come in bursts, and its cadence estimate is
+        updated with the new upload.
+        """
+        now = self.clock()
+        with self._lock:
+            if changed:
+                times = self._history.setdefault(channel_id, [])
+                times.append(datetime.utcfromtimestamp(now))
+                del times[:-HISTORY_SIZE]
+                self._intervals[channel_id] = self._estimate(times)
+                interval = self.min_interval
+            else:
+                interval = self.interval_for(channel_id)
+            self._push(channel_id, now + self._jittered(interval))
+
+    def seconds_until_next(self):
+        """
+        Seconds until the next channel is due, or None if nothing is scheduled.
+        """
+        with self._lock:
+            while self._queue and self._due.get(self._queue[0][2]) != self._queue[0][0]:
+                heapq.heappop(self._queue)
+            if not self._queue:
+                return None
+            return max(0.0, self._queue[0][0] - self.clock())
@@ -0,0 +1,306 @@
+"""
+Extractive summaries of web search results
+
+A video's search results are summarized locally, without network access,
+by picking the most central sentences of their page contexts. Sentences
+are weighted with TF-IDF (each sentence a document, so weights do not
+depend on other videos), compared by cosine similarity and ranked with
+TextRank, i.e. PageRank over the sentence similarity graph. The highest
+ranked sentences that are not near-duplicates of one already picked are
+joined in their original order, up to SUMMARY_MAX_CHARS characters.
+
+All of it runs as NumPy array operations over a whole group of videos at
+once: each group becomes a (videos x sentences x terms) tensor, padded to
+its largest video, and similarity and rank iteration are batched matrix
+products. Videos are sorted by sentence count before grouping, so padding
+stays small. A backfill therefore costs a few array operations per
+MATRIX_BATCH videos rather than a Python loop per sentence pair.
+
+New videos are summarized by the enrichment worker as their searches
+complete; `python -m youtube_tracker summarize` backfills stored videos.
+"""
+import os
+import re
+import time
+import logging
+import numpy as np
+from datetime import datetime
+from sqlalchemy import or_, select, update
+from .metrics import stage_timer
+from .models import ENRICHMENT_DONE, LatestVideo, ProcessedVideo
+from .persistence import get_batch_size, load_web_search_results
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CHARS = 600
+# Videos per tensor; bounds memory at MATRIX_BATCH * MAX_SENTENCES * terms floats
+MATRIX_BATCH = 64
+# Sentences considered per video, taken in search result order
+MAX_SENTENCES = 80
+MAX_SUMMARY_SENTENCES = 5
+MIN_SENTENCE_WORDS = 5
+# Longer runs of text without sentence punctuation are cut into pieces of this many words
+MAX_SENTENCE_WORDS = 50
+# Sentences this similar to a picked one are skipped
+DUPLICATE_SIMILARITY = 0.7
+DAMPING = 0.85
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-5
+
+# Splits after sentence punctuation, keeping it as a group, and at line breaks
+_SENTENCE_END = re.compile(r'([.!?])\s+|\n')
+_WORD = re.compile(r'[^\W_]+')
+
+STOP_WORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her here
+hers herself him himself his how i if in into is it its itself just me more most my myself no nor not now of off
+on once only or other our ours ourselves out over own same she should so some such than that the their theirs
+them themselves then there these they this those through to too under until up very was we were what when where
+which while who whom why will with would you your yours yourself yourselves
+""".split())
+
+
+def get_max_chars():
+    """
+    Read the summary length limit (SUMMARY_MAX_CHARS); 0 disables summaries.
+    """
+    try:
+        return max(0, int(os.getenv('SUMMARY_MAX_CHARS', str(DEFAULT_MAX_CHARS))))
+    except ValueError:
+        logger.warning("Invalid SUMMARY_MAX_CHARS value, using default")
+        return DEFAULT_MAX_CHARS
+
+
+def split_sentences(text):
+    """
+    Split page text into sentences of at least MIN_SENTENCE_WORDS words.
+
+    Returns:
+        list: Sentences in text order
+    """
+    sentences = []
+    parts = _SENTENCE_END.split(text or '')
+    pieces = [piece + (end or '') for piece, end in zip(parts[::2], parts[1::2] + [None])]
+    pieces = [piece.strip() for piece in pieces if piece.strip()]
+    # Contexts are cut at a character budget, so their last piece is usually a fragment
+    if len(pieces) > 1 and not pieces[-1].endswith(('.', '!', '?')):
+        pieces.pop()
+    for piece in pieces:
+        words = piece.split()
+        for start in range(0, len(words), MAX_SENTENCE_WORDS):
+            sentence = words[start:start + MAX_SENTENCE_WORDS]
+            if len(sentence) >= MIN_SENTENCE_WORDS:
+                sentences.append(' '.join(sentence))
+    return sentences
+
+
+def tokenize(sentence):
+    return [word for word in _WORD.findall(sentence.lower()) if len(word) > 1 and word not in STOP_WORDS]
+
+
+def _sentences(results):
+    """
+    Returns:
+        tuple: (sentences, token lists) of a video's results, at most MAX_SENTENCES
+    """
+    sentences = []
+    tokens = []
+    for result in results or []:
+        for sentence in split_sentences(result.get('context') or result.get('snippet')):
+            words = tokenize(sentence)
+            if words:
+                sentences.append(sentence)
+                tokens.append(words)
+            if len(sentences) == MAX_SENTENCES:
+                return sentences, tokens
+    return sentences, tokens
+
+
+def _similarities(token_lists):
+    """
+    Build the padded TF-IDF sentence similarity tensor of a group of videos.
+
+    Args:
+        token_lists (list): Per video, the token list of each sentence
+
+    Returns:
+        tuple: (similarity array of shape (videos, sentences, sentences),
+        boolean mask of real sentences of shape (videos, sentences))
+    """
+    sentence_counts = np.array([len(tokens) for tokens in token_lists])
+    lengths = np.array([len(words) for tokens in token_lists for words in tokens])
+    vocabulary = {}
+    words = np.array([vocabulary.setdefault(word, len(vocabulary))
+                      for tokens in token_lists for sentence in tokens for word in sentence], dtype=np.int64)
+
+    # Video and sentence position of every token
+    sentence_videos = np.repeat(np.arange(len(token_lists)), sentence_counts)
+    offsets = np.concatenate(([0], np.cumsum(sentence_counts)[:-1]))
+    sentence_positions = np.arange(len(sentence_videos)) - np.repeat(offsets, sentence_counts)
+    videos = np.repeat(sentence_videos, lengths)
+    sentences = np.repeat(sentence_positions, lengths)
+
+    # Number the terms of each video from 0, so each video's terms stay dense
+    keys, inverse = np.unique(videos * len(vocabulary) + words, return_inverse=True)
+    key_videos = keys // len(vocabulary)
+    terms = (np.arange(len(keys)) - np.searchsorted(key_videos, key_videos))[inverse]
+
+    size = int(sentence_counts.max())
+    vocabulary_size = int(np.bincount(key_videos).max())
+    shape = (len(token_lists), size, vocabulary_size)
+    counts = np.bincount(np.ravel_multi_index((videos, sentences, terms), shape),
+                         minlength=int(np.prod(shape))).reshape(shape).astype(np.float32)
+    mask = np.arange(size)[None, :] < sentence_counts[:, None]
+    totals = mask.sum(axis=1, keepdims=True).astype(np.float32)
+
+    # Sublinear term frequency and smoothed inverse sentence frequency
+    frequency = (counts > 0).sum(axis=1)
+    idf = np.where(frequency > 0, np.log((1 + totals) / (1 + frequency)) + 1, 0).astype(np.float32)
+    weights = np.log1p(counts) * idf[:, None, :]
+    norms = np.linalg.norm(weights, axis=2, keepdims=True)
+    weights /= np.where(norms > 0, norms, 1)
+
+    similarity = weights @ weights.transpose(0, 2, 1)
+    similarity[:, np.arange(size), np.arange(size)] = 0
+    return similarity, mask
+
+
+def _rank(similarity, mask):
+    """
+    Run TextRank on every video of a similarity tensor at once.
+
+    Returns:
+        ndarray: Scores of shape (videos, sentences), 0 for padding
+    """
+    uniform = mask / mask.sum(axis=1, keepdims=True).clip(min=1)
+    totals = similarity.sum(axis=2, keepdims=True)
+    # A sentence similar to no other one links to every sentence of its video
+    transition = np.where(totals > 0, similarity / np.where(totals > 0, totals, 1), uniform[:, None, :])
+    scores = uniform
+    for _ in range(MAX_ITERATIONS):
+        updated = (1 - DAMPING) * uniform + DAMPING * np.einsum('bij,bi->bj', transition, scores) * mask
+        converged = np.abs(updated - scores).max() < TOLERANCE
+        scores = updated
+        if converged:
+            break
+    return scores
+
+
+def _select(sentences, scores, similarity, max_chars):
+    picked = []
+    length = 0
+    for index in np.argsort(-scores[:len(sentences)], kind='stable'):
+        added = len(sentences[index]) + (1 if picked else 0)
+        if length + added > max_chars:
+            continue
+        if any(similarity[index, other] > DUPLICATE_SIMILARITY for other in picked):
+            continue
+        picked.append(index)
+        length += added
+        if len(picked) == MAX_SUMMARY_SENTENCES:
+            break
+    if not picked:
+        # Even the best sentence is too long
+        best = sentences[int(np.argmax(scores[:len(sentences)]))]
+        keep = max(max_chars - 3, 0)
+        # One character more shows whether the cut ends a word; a single long word is cut mid-word
+        return (best[:keep + 1].rsplit(' ', 1)[0][:keep] + '...')[:max_chars]
+    return ' '.join(sentences[index] for index in sorted(picked))
+
+
+def summarize_batch(results_per_video, max_chars=None):
+    """
+    Summarize the search results of many videos.
+
+    Args:
+        results_per_video (list): Per video, its list of result dictionaries
+            with 'context' (or 'snippet') text
+        max_chars (int): Longest summary (SUMMARY_MAX_CHARS)
+
+    Returns:
+        list: Summary per video, in the given order; None for videos whose
+        results have no usable sentences, or for all with SUMMARY_MAX_CHARS=0
+    """
+    max_chars = get_max_chars() if max_chars is None else max_chars
+    if not max_chars:
+        return [None] * len(results_per_video)
+    prepared = [_sentences(results) for results in results_per_video]
+    summaries = [None] * len(prepared)
+    # Similar sizes share a tensor, so little of it is padding
+    order = sorted((index for index, (sentences, _) in enumerate(prepared) if sentences),
+                   key=lambda index: len(prepared[index][0]))
+    for start in range(0, len(order), MATRIX_BATCH):
+        group = order[start:start + MATRIX_BATCH]
+        similarity, mask = _similarities([prepared[index][1] for index in group])
+        scores = _rank(similarity, mask)
+        for position, index in enumerate(group):
+            summaries[index] = _select(prepared[index][0], scores[position], similarity[position], max_chars)
+    return summaries
+
+
+def summarize(results, max_chars=None):
+    """
+    Summarize the search results of one video.
+
+    Returns:
+        str | None: The summary, or None if the results have no usable sentences
+    """
+    return summarize_batch([results], max_chars)[0]
+
+
+def backfill_summaries(session_factory, batch_size=None, overwrite=False, max_chars=None):
+    """
+    Summarize stored videos that have search results but no summary.
+
+    latest_videos and processed_videos are read in primary key order, a
+    batch at a time, and each batch is summarized with one summarize_batch
+    call and committed. Summarized latest_videos rows get a new updated_at,
+    so read API snapshots pick the summaries up.
+
+    Args:
+        session_factory (callable): Returns a new database session
+        batch_size (int): Videos per batch (DB_BATCH_SIZE)
+        overwrite (bool): Summarize videos that already have a summary again
+        max_chars (int): Longest summary (SUMMARY_MAX_CHARS)
+
+    Returns:
+        dict: Numbers of videos 'summarized' and 'skipped' for lack of usable text
+    """
+    batch_size = batch_size or get_batch_size()
+    counts = {'summarized': 0, 'skipped': 0}
+    start = time.perf_counter()
+    for model in (LatestVideo, ProcessedVideo):
+        key, = model.__table__.primary_key.columns
+        last = None
+        while True:
+            query = select(key, model.video_id).order_by(key).limit(batch_size)
+            if not overwrite:
+                query = query.where(model.summary.is_(None))
+            if model is LatestVideo:
+                query = query.where(or_(model.enrichment_status.is_(None), model.enrichment_status == ENRICHMENT_DONE))
+            if last is not None:
+                query = query.where(key > last)
+            db = session_factory()
+            try:
+                rows = db.execute(query).all()
+                if not rows:
+                    break
+                last = getattr(rows[-1], key.name)
+                results = load_web_search_results(db, [row.video_id for row in rows])
+                rows = [row for row in rows if row.video_id in results]
+                with stage_timer('summarize'):
+                    summaries = summarize_batch([results[row.video_id] for row in rows], max_chars)
+                values = {'updated_at': datetime.utcnow()} if model is LatestVideo else {}
+                updates = [{key.name: getattr(row, key.name), 'summary': summary, **values}
+                           for row, summary in zip(rows, summaries) if summary is not None]
+                if updates:
+                    db.execute(update(model), updates)
+                db.commit()
+            finally:
+                db.close()
+            counts['summarized'] += len(updates)
+            counts['skipped'] += len(rows) - len(updates)
+    logger.info("Summarized %d videos in %.1fs, %d without usable text", counts['summarized'],
+                time.perf_counter() - start, counts['skipped'])
+    return counts
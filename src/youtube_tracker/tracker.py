@@ -2,280 +2,401 @@ import os
 import time
 import schedule
 import logging
-from dotenv import load_dotenv
-from datetime import datetime
-from sqlalchemy import create_engine, Column, String, DateTime, Integer, JSON
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-import requests
-from bs4 import BeautifulSoup
-import re
-from .web_search import WebSearcher
-
-# Configure logging
-log_level = os.getenv('LOG_LEVEL', 'INFO')
-log_format = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-
-# Create logs directory if it doesn't exist
-os.makedirs('logs', exist_ok=True)
-
-# Configure file handler
-file_handler = logging.FileHandler('logs/youtube_tracker.log')
-file_handler.setFormatter(log_format)
-
-# Configure console handler
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(log_format)
-
-# Setup logger
+import threading
+from .app import get_app
+from .channels import record_channel_checks
+from .coordination import LeaseCoordinator
+from .enrichment import EnrichmentWorker, get_enrichment_mode
+from .extractor import youtube_base_url
+from .governor import CircuitOpenError
+from .logging_config import setup_logging
+from .metrics import CHANNELS_CHECKED, LAST_CYCLE, VIDEOS_RECORDED, stage_timer, start_metrics_server
+from .models import ENRICHMENT_DONE, ENRICHMENT_PENDING, LatestVideo, ProcessedVideo
+from .persistence import load_known_video_ids, save_cycle_results
+from .poller import ChannelPoller
+from .profiling import get_profiler, profiled
+from .read_api import start_read_api
+from .scheduler import AdaptiveScheduler, load_upload_history
+
+__all__ = [
+    'UNCHANGED', 'CYCLE_SUMMARY_FIELDS', 'NO_CHANNELS_MESSAGE',
+    'build_search_query', 'perform_web_search', 'summarize_results', 'enrich_job', 'get_max_new_uploads',
+    'select_new_uploads', 'get_new_videos', 'get_latest_video', 'check_channel', 'get_channel_ids',
+    'update_latest_videos', 'run_fixed_schedule', 'run_adaptive_schedule', 'process_claimed_channels',
+    'run_sharded_schedule', 'create_enrichment_worker', 'start_enrichment_worker', 'run_enrichment_worker',
+    'start_read_api_server', 'startup', 'main',
+    # The models used to live in this module and are re-exported for code that imports them from here
+    'LatestVideo', 'ProcessedVideo',
+]
+
 logger = logging.getLogger(__name__)
-logger.setLevel(getattr(logging, log_level))
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
-
-# Load environment variables
-load_dotenv()
-
-# Database configuration
-DB_HOST = os.getenv('DB_HOST', 'localhost')
-DB_PORT = os.getenv('DB_PORT', '5432')
-DB_NAME = os.getenv('DB_NAME', 'youtube_tracker')
-DB_USER = os.getenv('DB_USER', 'postgres')
-DB_PASSWORD = os.getenv('DB_PASSWORD', 'postgres')
-
-# Create database connection
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# Define database models
-Base = declarative_base()
-
-class LatestVideo(Base):
-    __tablename__ = "latest_videos"
-
-    channel_id = Column(String, primary_key=True)
-    video_id = Column(String, nullable=False)
-    title = Column(String, nullable=False)
-    url = Column(String, nullable=False)
-    thumbnail = Column(String, nullable=False)
-    description = Column(String)
-    web_search_results = Column(JSON, nullable=True)
-    updated_at = Column(DateTime, default=datetime.utcnow)
-
-class ProcessedVideo(Base):
-    __tablename__ = "processed_videos"
-
-    id = Column(Integer, primary_key=True)
-    channel_id = Column(String, nullable=False)
-    video_id = Column(String, nullable=False)
-    title = Column(String, nullable=False)
-    url = Column(String, nullable=False)
-    thumbnail = Column(String, nullable=False)
-    description = Column(String)
-    web_search_results = Column(JSON, nullable=True)
-    processed_at = Column(DateTime, default=datetime.utcnow)
-    action = Column(String, nullable=False)  # 'replaced' or 'removed'
-
-# Create tables
-Base.metadata.create_all(bind=engine)
-
-# Initialize web searcher
-web_searcher = WebSearcher()
-
-def perform_web_search(title, description):
+
+# Returned by check_channel when the probe found no new video
+UNCHANGED = 'unchanged'
+# Counts in the summary record logged after every cycle
+CYCLE_SUMMARY_FIELDS = ('channels', 'changed', 'unchanged', 'failed', 'added', 'replaced')
+
+def build_search_query(title, description):
+    """
+    Combine the title and the first 20 words of the description.
+    """
+    desc_words = description.split()[:20] if description else []
+    return f"{title} {' '.join(desc_words)}"
+
+def perform_web_search(title, description, web_searcher=None, raise_errors=False):
     """
     Perform web search based on video title and description.
+
+    With raise_errors=True search failures are raised instead of returning
+    an empty list, so the enrichment worker can retry them.
     """
+    web_searcher = web_searcher or get_app().web_searcher
     try:
-        # Combine title and first few words of description for search
-        desc_words = description.split()[:20] if description else []
-        search_query = f"{title} {' '.join(desc_words)}"
+        search_query = build_search_query(title, description)
         
-        logger.info(f"Performing web search for: {search_query[:100]}...")
-        results = web_searcher.search(search_query)
+        logger.debug("Performing web search for: %.100s...", search_query)
+        results = web_searcher.search(search_query, raise_errors=raise_errors)
         
         if results:
-            logger.info(f"Found {len(results)} web search results")
+            logger.debug("Found %d web search results", len(results))
         else:
             logger.warning("No web search results found")
             
         return results
     except Exception as e:
-        logger.error(f"Error performing web search: {str(e)}")
+        logger.error("Error performing web search: %s", e)
+        if raise_errors:
+            raise
         return []
 
-def get_latest_video(channel_id):
+def summarize_results(results):
     """
-    Fetch the latest video details from a YouTube channel without using the API.
+    Summarize a video's web search results, unless SUMMARY_MAX_CHARS=0.
+
+    Returns:
+        str | None: The summary, or None without one
+    """
+    # Imported here so importing the tracker does not load NumPy
+    from .summarizer import get_max_chars, summarize
+    if not results or not get_max_chars():
+        return None
+    try:
+        with stage_timer('summarize'):
+            return summarize(results)
+    except Exception as e:
+        logger.error("Error summarizing web search results: %s", e)
+        return None
+
+def enrich_job(job):
+    """
+    Run the web search for a queued enrichment job.
+    """
+    with stage_timer('web_search'):
+        return perform_web_search(job['title'], job['description'], raise_errors=True)
+
+def get_max_new_uploads():
+    """
+    Read the most uploads recorded per channel and check (MAX_NEW_UPLOADS).
+    """
+    return max(1, int(os.getenv('MAX_NEW_UPLOADS', '10')))
+
+def select_new_uploads(videos, known_video_id=None, limit=None):
+    """
+    Pick the uploads listed above the stored video on a channel page.
+
+    Args:
+        videos (list): VideoRecord objects in page order (newest first)
+        known_video_id (str): Stored latest video of the channel
+        limit (int): Most uploads to return (MAX_NEW_UPLOADS)
+
+    Returns:
+        list: New VideoRecord objects, oldest first. A channel without a
+        stored video only gets its latest upload, and so does a channel
+        whose stored video is no longer listed (deleted or unlisted): which
+        of the listed videos came after it is unknown, and recording older
+        ones would add uploads to the history that were never replaced.
+    """
+    limit = limit or get_max_new_uploads()
+    listed = [video.video_id for video in videos]
+    if known_video_id is None or known_video_id not in listed:
+        new = videos[:1]
+    else:
+        new = videos[:listed.index(known_video_id)]
+    return list(reversed(new[:limit]))
+
+def get_new_videos(channel_id, known_video_id=None, http_client=None, enrich=None, limit=None, parse_pool=None):
     """
+    Fetch every new upload of a YouTube channel without using the API.
+
+    The channel's videos page lists its recent uploads, so a single request
+    finds all videos published since known_video_id; only their watch pages
+    are fetched for the descriptions.
+
+    With ENRICHMENT_MODE=queue (the default) the web search is left to the
+    enrichment worker and videos are returned with enrichment_status
+    'pending'; with ENRICHMENT_MODE=inline they are searched right away.
+
+    Args:
+        channel_id (str): YouTube channel ID
+        known_video_id (str): Stored latest video of the channel
+        http_client (HttpClient): Client for YouTube pages
+        enrich (bool): Search inline, defaults to ENRICHMENT_MODE=inline
+        limit (int): Most uploads to return (MAX_NEW_UPLOADS)
+        parse_pool (ParsePool): Parses the pages, in worker processes with
+            PARSE_WORKERS set
+
+    Returns:
+        list | None: Video data dictionaries oldest first, or None if the
+        channel could not be fetched
+    """
+    http_client = http_client or get_app().http_client
+    parse_pool = parse_pool or get_app().parse_pool
+    if enrich is None:
+        enrich = get_enrichment_mode() == 'inline'
     try:
-        logger.debug(f"Fetching latest video for channel {channel_id}")
+        logger.debug("Fetching new videos for channel %s", channel_id)
         
         # Construct the channel's videos page URL
-        channel_url = f"https://www.youtube.com/channel/{channel_id}/videos"
+        channel_url = f"{youtube_base_url()}/channel/{channel_id}/videos"
         
-        # Send request with headers to mimic browser
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(channel_url, headers=headers)
-        response.raise_for_status()
+        # The shared client sends browser-like headers over pooled connections
+        with stage_timer('channel_fetch'):
+            response = http_client.get(channel_url)
+            response.raise_for_status()
         
-        # Parse the page content
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Find the script tag containing video information
-        scripts = soup.find_all('script')
-        video_data = None
-        
-        for script in scripts:
-            if script.string and '"videoRenderer"' in script.string:
-                match = re.search(r'"videoRenderer":({.+?})}', script.string)
-                if match:
-                    video_data = match.group(1)
-                    break
-        
-        if not video_data:
-            logger.warning(f"No video data found for channel {channel_id}")
+        # Decode the embedded ytInitialData payload without building a DOM
+        with stage_timer('channel_parse'):
+            videos = parse_pool.channel_videos(response.content)
+        if not videos:
+            logger.warning("No video data found for channel %s", channel_id)
             return None
+
+        uploads = select_new_uploads(videos, known_video_id, limit)
+        if len(uploads) > 1:
+            logger.debug("Found %d new uploads for channel %s", len(uploads), channel_id)
+
+        results = []
+        for upload in uploads:
+            # Fetch video page to get description
+            with stage_timer('watch_fetch'):
+                video_response = http_client.get(upload.url)
+                video_response.raise_for_status()
             
-        # Extract basic video information using regex
-        video_id_match = re.search(r'"videoId":"(.*?)"', video_data)
-        title_match = re.search(r'"title":{"runs":\[{"text":"(.*?)"}', video_data)
-        thumbnail_match = re.search(r'"thumbnail":{"thumbnails":\[{"url":"(.*?)"', video_data)
-        
-        if not all([video_id_match, title_match, thumbnail_match]):
-            logger.warning(f"Could not extract all required fields for channel {channel_id}")
-            return None
+            with stage_timer('watch_parse'):
+                description = parse_pool.description(video_response.content)
             
-        video_id = video_id_match.group(1)
-        title = title_match.group(1)
-        thumbnail_url = thumbnail_match.group(1)
-        video_url = f"https://www.youtube.com/watch?v={video_id}"
-        
-        # Fetch video page to get description
-        video_response = requests.get(video_url, headers=headers)
-        video_response.raise_for_status()
-        
-        # Find the script tag containing video description
-        description = ""
-        video_soup = BeautifulSoup(video_response.text, 'html.parser')
-        for script in video_soup.find_all('script'):
-            if script.string and '"description":{"simpleText":"' in script.string:
-                desc_match = re.search(r'"description":{"simpleText":"(.*?)"}', script.string)
-                if desc_match:
-                    full_description = desc_match.group(1)
-                    # Decode any HTML entities and unicode escapes
-                    full_description = full_description.encode().decode('unicode-escape').replace('\\n', ' ').strip()
-                    words = full_description.split()
-                    description = ' '.join(words[:100])
-                    if len(words) > 100:
-                        description += "..."
-                    break
-        
-        # Perform web search for context
-        web_search_results = perform_web_search(title, description)
-        
-        logger.debug(f"Successfully fetched video data for channel {channel_id}")
-        return {
-            "channel_id": channel_id,
-            "video_id": video_id,
-            "title": title,
-            "url": video_url,
-            "thumbnail": thumbnail_url,
-            "description": description,
-            "web_search_results": web_search_results
-        }
+            # Perform web search for context, or leave it to the enrichment queue
+            if enrich:
+                with stage_timer('web_search'):
+                    web_search_results = perform_web_search(upload.title, description)
+                summary = summarize_results(web_search_results)
+            else:
+                web_search_results = summary = None
+            
+            results.append({
+                "channel_id": channel_id,
+                "video_id": upload.video_id,
+                "title": upload.title,
+                "url": upload.url,
+                "thumbnail": upload.thumbnail,
+                "description": description,
+                "summary": summary,
+                "web_search_results": web_search_results,
+                "enrichment_status": ENRICHMENT_DONE if enrich else ENRICHMENT_PENDING,
+            })
+
+        logger.debug("Successfully fetched video data for channel %s", channel_id)
+        return results
         
+    except CircuitOpenError as e:
+        # Expected while YouTube throttles us; the governor already logged why
+        logger.debug("Skipping channel %s: %s", channel_id, e)
+        return None
     except Exception as e:
-        logger.error(f"Error fetching video for channel {channel_id}: {str(e)}")
+        logger.error("Error fetching video for channel %s: %s", channel_id, e)
         return None
 
-def update_latest_videos():
+def get_latest_video(channel_id, http_client=None, enrich=None):
+    """
+    Fetch the latest video details from a YouTube channel without using the API.
+
+    Returns:
+        dict | None: Video data, or None if the channel could not be fetched
+    """
+    videos = get_new_videos(channel_id, http_client=http_client, enrich=enrich)
+    return videos[-1] if videos else None
+
+def check_channel(channel_id, known_video_id=None, use_probe=True):
+    """
+    Probe a channel cheaply and fetch its new uploads only if it changed.
+
+    Returns:
+        list | str | None: Video data of the new uploads oldest first,
+        UNCHANGED if the probe found nothing new, or None if the fetch failed
+    """
+    logger.debug("Checking channel: %s", channel_id)
+    if use_probe:
+        with stage_timer('feed_probe'):
+            changed = get_app().feed_probe.has_new_video(channel_id, known_video_id)
+        if not changed:
+            logger.debug("No new video for channel %s", channel_id)
+            return UNCHANGED
+    return get_new_videos(channel_id, known_video_id)
+
+# Logged when the channel registry has no enabled channel
+NO_CHANNELS_MESSAGE = "No channels configured; import them with `python -m youtube_tracker channels import`"
+
+def get_channel_ids():
+    """
+    Read the enabled channels from the channel registry, highest priority first.
+
+    The registry reloads channels whose settings changed at most every
+    CHANNEL_RELOAD_INTERVAL seconds, so imports reach a running tracker
+    without a restart.
+    """
+    registry = get_app().channel_registry
+    registry.reload_if_due()
+    return registry.channel_ids()
+
+def update_latest_videos(channel_ids=None, failed=None):
     """
     Check for new videos and update the database.
+
+    Channels are fetched concurrently (see MAX_CONCURRENT_CHANNELS), highest
+    priority first. With
+    CHANGE_DETECTION=feed (the default) each channel's Atom feed is checked
+    first and only channels with a new video are scraped. Every upload
+    listed above the stored video on the channel page is recorded, up to
+    MAX_NEW_UPLOADS per channel. All results are
+    then written in a single transaction using batched statements (see
+    DB_BATCH_SIZE), together with enrichment jobs for the new videos, which
+    are searched later by the enrichment worker, and with the check times of
+    the channels in the registry. Stage timings are recorded in the
+    metrics registry and the cycle is profiled if a capture was requested.
+    History older than HISTORY_RETENTION_DAYS is pruned at most once per
+    HISTORY_PRUNE_INTERVAL.
+
+    Each cycle logs one summary record at INFO; per-channel details are
+    logged at DEBUG.
+
+    Args:
+        channel_ids (list): Channels to check, defaults to the registry's enabled channels
+        failed (set): If given, receives the IDs of channels whose results
+            could not be stored
+
+    Returns:
+        set: IDs of channels where a new video was recorded
     """
-    logger.info("Starting video update check")
+    summary = dict.fromkeys(CYCLE_SUMMARY_FIELDS, 0)
+    start = time.perf_counter()
+    with get_profiler().cycle(), stage_timer('cycle'):
+        changed = _update_latest_videos(channel_ids, summary, failed if failed is not None else set())
+    summary['seconds'] = round(time.perf_counter() - start, 3)
+    logger.info("Cycle checked %d channels in %.1fs: %d changed, %d unchanged, %d failed; "
+                "%d videos added, %d replaced", summary['channels'], summary['seconds'], summary['changed'],
+                summary['unchanged'], summary['failed'], summary['added'], summary['replaced'],
+                extra={'event': 'cycle_summary', **summary})
+    LAST_CYCLE.set(time.time())
+    with stage_timer('history_prune'):
+        get_app().history_pruner.prune_if_due()
+    return changed
+
+def _update_latest_videos(channel_ids, summary, failed):
+    logger.debug("Starting video update check")
     try:
-        # Get channel IDs from environment
-        channel_ids = os.getenv('YOUTUBE_CHANNEL_IDS', '').split(',')
-        if not channel_ids or not channel_ids[0]:
-            logger.error("No channel IDs configured in .env file")
-            return
+        if channel_ids is None:
+            channel_ids = get_channel_ids()
+            if not channel_ids:
+                logger.error(NO_CHANNELS_MESSAGE)
+                return set()
+
+        use_probe = os.getenv('CHANGE_DETECTION', 'feed').lower() == 'feed'
+        app = get_app()
+        summary['channels'] = len(channel_ids)
 
         # Create database session
-        db = SessionLocal()
-        updates_found = False
-        
+        db = app.session()
+
         try:
-            for channel_id in channel_ids:
-                channel_id = channel_id.strip()
-                if not channel_id:
-                    continue
-                    
-                logger.info(f"Checking channel: {channel_id}")
-                    
-                # Get latest video for channel
-                video_data = get_latest_video(channel_id)
-                if not video_data:
-                    logger.warning(f"Could not fetch video data for channel {channel_id}")
-                    continue
-                
-                # Check if we already have this video
-                existing_video = db.query(LatestVideo).filter_by(channel_id=channel_id).first()
-                
-                if existing_video:
-                    if existing_video.video_id != video_data['video_id']:
-                        # Store the existing video in processed_videos
-                        processed_video = ProcessedVideo(
-                            channel_id=existing_video.channel_id,
-                            video_id=existing_video.video_id,
-                            title=existing_video.title,
-                            url=existing_video.url,
-                            thumbnail=existing_video.thumbnail,
-                            description=existing_video.description,
-                            web_search_results=existing_video.web_search_results,
-                            action='replaced'
-                        )
-                        db.add(processed_video)
-                        
-                        # Update the existing record
-                        for key, value in video_data.items():
-                            setattr(existing_video, key, value)
-                        existing_video.updated_at = datetime.utcnow()
-                        
-                        logger.info(f"New video found for channel {channel_id}: {video_data['title']}")
-                        updates_found = True
-                    else:
-                        logger.info(f"No new video for channel {channel_id}")
-                else:
-                    # Create new record
-                    new_video = LatestVideo(**video_data, updated_at=datetime.utcnow())
-                    db.add(new_video)
-                    logger.info(f"Added first video for channel {channel_id}: {video_data['title']}")
-                    updates_found = True
-                
-                db.commit()
-                
+            with stage_timer('db_load'):
+                known_videos = load_known_video_ids(db, channel_ids)
+            poller = ChannelPoller(profiled(
+                lambda channel_id: check_channel(channel_id, known_videos.get(channel_id), use_probe)
+            ))
+
+            fetched = []
+            fetched_channels = []
+            checked_channels = []
+            with stage_timer('poll'):
+                for channel_id, uploads in poller.poll(channel_ids):
+                    if uploads == UNCHANGED:
+                        CHANNELS_CHECKED.inc(result='unchanged')
+                        summary['unchanged'] += 1
+                        checked_channels.append(channel_id)
+                        continue
+                    if uploads is None:
+                        CHANNELS_CHECKED.inc(result='failed')
+                        summary['failed'] += 1
+                        logger.debug("Could not fetch video data for channel %s", channel_id)
+                        continue
+                    fetched_channels.append(channel_id)
+                    checked_channels.append(channel_id)
+                    fetched.extend(uploads)
+
+            try:
+                with stage_timer('db_save'):
+                    changes = save_cycle_results(db, fetched)
+                    pending = [
+                        video_data for video_data in changes['added'] + changes['replaced']
+                        if video_data.get('enrichment_status') == ENRICHMENT_PENDING
+                    ]
+                    app.enrichment_queue.enqueue(db, pending)
+                    record_channel_checks(db, checked_channels, {
+                        video_data['channel_id'] for video_data in changes['added'] + changes['replaced']
+                    })
+                    db.commit()
+                if changes['added'] or changes['replaced']:
+                    app.notify_latest_videos_changed()
+            except Exception as e:
+                db.rollback()
+                CHANNELS_CHECKED.inc(len(fetched_channels), result='failed')
+                summary['failed'] += len(fetched_channels)
+                failed.update(fetched_channels)
+                logger.error("Error saving videos: %s", e)
+                return set()
+
+            for channel_id in fetched_channels:
+                app.feed_probe.acknowledge(channel_id)
+
         finally:
             db.close()
-            
-        if not updates_found:
-            logger.info("No new videos found in this check")
+
+        for action in ('added', 'replaced'):
+            VIDEOS_RECORDED.inc(len(changes[action]), action=action)
+        changed = {video_data['channel_id'] for video_data in changes['added'] + changes['replaced']}
+        CHANNELS_CHECKED.inc(len(changed), result='changed')
+        CHANNELS_CHECKED.inc(len(fetched_channels) - len(changed), result='unchanged')
+        summary['changed'] = len(changed)
+        summary['unchanged'] += len(fetched_channels) - len(changed)
+        summary['added'] = len(changes['added'])
+        summary['replaced'] = len(changes['replaced'])
+
+        for video_data in changes['added']:
+            logger.debug("Added first video for channel %s: %s", video_data['channel_id'], video_data['title'])
+        for video_data in changes['replaced']:
+            logger.debug("New video found for channel %s: %s", video_data['channel_id'], video_data['title'])
+
+        return changed
             
     except Exception as e:
-        logger.error(f"Error in update_latest_videos: {str(e)}")
+        failed.update(channel_ids or ())
+        logger.error("Error in update_latest_videos: %s", e)
+        return set()
 
-def main():
+def run_fixed_schedule(check_interval):
     """
-    Main function to run the tracker with scheduling.
+    Check every channel every check_interval minutes.
     """
-    # Get check interval from environment (default to 15 minutes)
-    check_interval = int(os.getenv('CHECK_INTERVAL', '15'))
-    
-    logger.info(f"YouTube Tracker starting... (Checking every {check_interval} minutes)")
-    
     # Run initial check
     update_latest_videos()
     
@@ -287,5 +408,195 @@ def main():
         schedule.run_pending()
         time.sleep(1)
 
+def run_adaptive_schedule(check_interval):
+    """
+    Check each channel at an interval learned from its upload history.
+    """
+    scheduler = AdaptiveScheduler(default_interval=check_interval * 60)
+
+    db = get_app().session()
+    try:
+        scheduler.learn(load_upload_history(db))
+    finally:
+        db.close()
+
+    registry = get_app().channel_registry
+    registry.reload()
+    channel_ids = registry.channel_ids()
+    if not channel_ids:
+        logger.warning(NO_CHANNELS_MESSAGE)
+    for channel_id in channel_ids:
+        scheduler.add(channel_id)
+
+    while True:
+        # Channels imported or disabled since the last reload
+        added, removed = registry.reload_if_due()
+        for channel_id in added:
+            scheduler.add(channel_id)
+        for channel_id in removed:
+            scheduler.remove(channel_id)
+
+        due = scheduler.pop_due()
+        if due:
+            changed = update_latest_videos(due)
+            for channel_id in due:
+                scheduler.reschedule(channel_id, changed=channel_id in changed)
+            continue
+
+        wait = scheduler.seconds_until_next()
+        time.sleep(1 if wait is None else min(wait, 1))
+
+def process_claimed_channels(channel_ids):
+    """
+    Check a batch of leased channels.
+
+    Returns:
+        set: Channels whose results could not be stored, to be released
+        instead of completed
+    """
+    failed = set()
+    update_latest_videos(channel_ids, failed=failed)
+    return failed
+
+def run_sharded_schedule(check_interval):
+    """
+    Share channels with other replicas through leases in channel_leases.
+
+    Every replica runs the same loop; each cycle of check_interval minutes
+    the replicas claim disjoint batches until all channels are processed.
+    """
+    coordinator = LeaseCoordinator(get_app().session_factory, cycle_seconds=check_interval * 60)
+    registry = get_app().channel_registry
+    logger.info("Running as replica %s", coordinator.replica_id)
+
+    synced_version = None
+    while True:
+        try:
+            channel_ids = get_channel_ids()
+            # channel_leases only needs syncing when the registry changed
+            if registry.version != synced_version:
+                if not channel_ids:
+                    logger.warning(NO_CHANNELS_MESSAGE)
+                coordinator.sync_channels(channel_ids)
+                synced_version = registry.version
+            processed = coordinator.run_cycle(process_claimed_channels)
+            logger.info("Replica %s processed %s channels this cycle", coordinator.replica_id, processed)
+        except Exception as e:
+            logger.error("Error in sharded cycle: %s", e)
+
+        time.sleep(max(1, coordinator.seconds_until_next_cycle()))
+
+def create_enrichment_worker(app=None):
+    """
+    Build a worker draining the application's enrichment queue.
+    """
+    app = app or get_app()
+    return EnrichmentWorker(app.enrichment_queue, enrich_job, summarize=summarize_results)
+
+def start_enrichment_worker():
+    """
+    Drain the enrichment queue on a background thread of this process.
+
+    Does nothing with ENRICHMENT_MODE=inline or ENRICHMENT_IN_PROCESS=false,
+    the latter for deployments running `python -m youtube_tracker enrich`
+    as a separate process.
+
+    Returns:
+        EnrichmentWorker | None: The running worker
+    """
+    if get_enrichment_mode() != 'queue':
+        return None
+    if os.getenv('ENRICHMENT_IN_PROCESS', 'true').lower() not in ('1', 'true', 'yes', 'on'):
+        logger.info("Enrichment queue is drained by a separate worker process")
+        return None
+    worker = create_enrichment_worker()
+    worker.start()
+    logger.info("Started enrichment worker with %s threads", worker.concurrency)
+    return worker
+
+def run_enrichment_worker(once=False):
+    """
+    Drain the enrichment queue in this process, e.g. `python -m youtube_tracker enrich`.
+
+    Args:
+        once (bool): Return once no job is due instead of running forever
+
+    Returns:
+        int: Number of jobs processed
+    """
+    worker = create_enrichment_worker()
+    logger.info("Enrichment worker starting with %s threads", worker.concurrency)
+    if once:
+        return worker.drain()
+    return worker.run()
+
+def start_read_api_server():
+    """
+    Serve the read API from this process if READ_API_PORT is set.
+
+    The tracker refreshes the served snapshot as soon as a cycle records a
+    change, so event streams see new videos without waiting for the next
+    READ_API_REFRESH_INTERVAL.
+
+    Returns:
+        ThreadingHTTPServer | None: The running server
+    """
+    if not int(os.getenv('READ_API_PORT', '0')):
+        return None
+    return start_read_api(get_app().latest_snapshot)
+
+def startup(profile_cycles=None):
+    """
+    Configure logging and, unless AUTO_MIGRATE=false, migrate the schema.
+
+    Also starts the metrics endpoint if METRICS_PORT is set and arms
+    profiling of the first profile_cycles (PROFILE_CYCLES) cycles; SIGUSR1
+    profiles the next cycle at any time.
+
+    Args:
+        profile_cycles (int): Cycles to profile from the start
+
+    Returns:
+        AppContext: The application context
+    """
+    app = get_app()
+    setup_logging()
+    if os.getenv('AUTO_MIGRATE', 'true').lower() in ('1', 'true', 'yes', 'on'):
+        app.migrate()
+
+    if int(os.getenv('METRICS_PORT', '0')):
+        start_metrics_server()
+
+    profiler = get_profiler()
+    profile_cycles = profile_cycles or int(os.getenv('PROFILE_CYCLES', '0'))
+    if profile_cycles:
+        profiler.request(profile_cycles)
+    if threading.current_thread() is threading.main_thread():
+        profiler.install_signal_handler()
+    return app
+
+def main(profile_cycles=None):
+    """
+    Main function to run the tracker with scheduling.
+    """
+    startup(profile_cycles)
+    start_enrichment_worker()
+    start_read_api_server()
+
+    # Get check interval from environment (default to 15 minutes)
+    check_interval = int(os.getenv('CHECK_INTERVAL', '15'))
+    scheduler_mode = os.getenv('SCHEDULER_MODE', 'fixed').lower()
+    coordination_mode = os.getenv('COORDINATION_MODE', 'none').lower()
+    
+    if coordination_mode == 'lease':
+        logger.info("YouTube Tracker starting... (Sharded across replicas, cycle every %s minutes)", check_interval)
+        run_sharded_schedule(check_interval)
+    elif scheduler_mode == 'adaptive':
+        logger.info("YouTube Tracker starting... (Adaptive polling, default every %s minutes)", check_interval)
+        run_adaptive_schedule(check_interval)
+    else:
+        logger.info("YouTube Tracker starting... (Checking every %s minutes)", check_interval)
+        run_fixed_schedule(check_interval)
+
 if __name__ == "__main__":
     main()
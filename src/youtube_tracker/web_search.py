@@ -1,96 +1,398 @@
-import requests
 from bs4 import BeautifulSoup
+import os
+import time
 import logging
 import json
-import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from googlesearch import search
+from .cache import PageContextCache, SearchCache
+from .governor import get_governor
+from .http_client import get_http_client
+from .metrics import CACHE_LOOKUPS, PAGE_BODIES, stage_timer
+from .page_text import DEFAULT_CONTENT_TYPES, DEFAULT_MAX_CHARS, extract_visible_text, is_allowed_content_type, parse_content_type
+from .parse_pool import ParsePool, parse_page_html, parse_page_text
+from .profiling import profiled
+from .rate_limit import HostRateLimiter
 
 logger = logging.getLogger(__name__)
 
+# Bytes read from a result page per chunk in streaming mode
+PAGE_CHUNK_SIZE = 16384
+# Bytes of a streamed page first sent to a parse worker; the window grows
+# fourfold while the text found falls short of the budget
+PARSE_WINDOW_BYTES = 65536
+
+
+@dataclass
+class SearchHit:
+    url: str
+    title: str = ''
+    description: str = ''
+
+
+def google_backend(query, num_results):
+    """
+    Search Google through googlesearch-python.
+
+    Returns:
+        iterable: Results with url, title and description attributes
+    """
+    return search(query, num_results=num_results, advanced=True)
+
+
+class HttpSearchBackend:
+    def __init__(self, base_url, http_client=None):
+        """
+        Search through an HTTP endpoint answering
+        GET {base_url}/search?q=<query>&num=<n> with
+        {"results": [{"url": ..., "title": ..., "description": ...}]}.
+
+        Args:
+            base_url (str): Base URL of the search service
+            http_client (HttpClient): Client used for the requests
+        """
+        self.base_url = base_url.rstrip('/')
+        self.http_client = http_client or get_http_client()
+
+    def __call__(self, query, num_results):
+        response = self.http_client.get(f"{self.base_url}/search", params={'q': query, 'num': num_results})
+        response.raise_for_status()
+        return [
+            SearchHit(item['url'], item.get('title') or '', item.get('description') or '')
+            for item in response.json().get('results', [])
+        ]
+
+
+def get_search_backend(http_client=None):
+    """
+    Use the HTTP backend at SEARCH_BACKEND_URL if set, otherwise Google.
+    """
+    base_url = os.getenv('SEARCH_BACKEND_URL')
+    if base_url:
+        return HttpSearchBackend(base_url, http_client)
+    return google_backend
+
+
 class WebSearcher:
-    def __init__(self):
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
+    def __init__(self, http_client=None, cache=None, page_cache=None, rate_limiter=None, fetch_concurrency=None,
+                 backend=None, page_context_mode=None, max_page_bytes=None, content_types=None, parse_pool=None,
+                 governor=None, page_deadline=None):
+        """
+        Args:
+            http_client (HttpClient): Client used to fetch result pages,
+                defaults to the shared pooled client
+            cache (SearchCache): Search result cache, defaults to one built
+                from the SEARCH_CACHE_* settings; pass False to disable
+            page_cache (PageContextCache): Page context cache, defaults to one
+                built from the PAGE_CACHE_* settings; pass False to disable
+            rate_limiter (HostRateLimiter): Per-host limiter for result page
+                fetches, defaults to one built from HOST_RATE_* settings
+            fetch_concurrency (int): Maximum result pages fetched at once
+                across all searches (SEARCH_FETCH_CONCURRENCY)
+            backend (callable): Called with (query, num_results) and returning
+                hits with url, title and description, defaults to
+                get_search_backend()
+            page_context_mode (str): 'stream' reads result pages incrementally
+                and stops early, 'full' parses the whole page with
+                BeautifulSoup (PAGE_CONTEXT_MODE, default stream)
+            max_page_bytes (int): Most bytes read from a result page in
+                streaming mode (PAGE_MAX_BYTES)
+            content_types (tuple): Media types read in streaming mode
+                (PAGE_CONTENT_TYPES, comma-separated)
+            parse_pool (ParsePool): Processes parsing result pages, defaults
+                to one with PARSE_WORKERS workers
+            governor (Governor): Governs search backend calls as the 'search'
+                target, defaults to the shared governor; pass False to disable
+            page_deadline (float): Seconds a search spends on its result
+                pages, including waits for busy hosts (PAGE_FETCH_DEADLINE)
+        """
+        self.http_client = http_client or get_http_client()
+        self.backend = backend or get_search_backend(self.http_client)
+        self.cache = cache if cache is not None else SearchCache.from_env()
+        self.page_cache = page_cache if page_cache is not None else PageContextCache.from_env()
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        self.fetch_concurrency = fetch_concurrency or int(os.getenv('SEARCH_FETCH_CONCURRENCY', '5'))
+        self.page_context_mode = (page_context_mode or os.getenv('PAGE_CONTEXT_MODE', 'stream')).lower()
+        self.max_page_bytes = max_page_bytes or int(os.getenv('PAGE_MAX_BYTES', str(2 * 1024 * 1024)))
+        if content_types is None:
+            configured = os.getenv('PAGE_CONTENT_TYPES')
+            content_types = configured.split(',') if configured else DEFAULT_CONTENT_TYPES
+        self.content_types = tuple(content_type.strip().lower() for content_type in content_types)
+        self.parse_pool = parse_pool or ParsePool()
+        self.governor = governor if governor is not None else get_governor()
+        self.page_deadline = page_deadline if page_deadline is not None else float(os.getenv('PAGE_FETCH_DEADLINE', '10'))
+        # Shared by all searches so the cap is global; threads start on first use
+        self._fetch_executor = ThreadPoolExecutor(
+            max_workers=self.fetch_concurrency, thread_name_prefix='page-fetch'
+        )
 
-    def search(self, query, num_results=5):
+    def search(self, query, num_results=5, use_cache=True, raise_errors=False):
         """
         Search Google for the given query and return results with context.
         
         Args:
             query (str): Search query
             num_results (int): Number of results to return
+            use_cache (bool): Set to False to bypass the search cache
+            raise_errors (bool): Raise search backend errors instead of
+                returning an empty list, so callers can retry
             
         Returns:
-            list: List of dictionaries containing URL and context
+            list: List of dictionaries containing URL and context; a result
+            whose page could not be read in time has an empty context and
+            incomplete=True
         """
+        if use_cache and self.cache:
+            cached = self.cache.get(query, num_results)
+            if cached is not None:
+                CACHE_LOOKUPS.inc(cache='search', result='hit')
+                logger.debug("Using cached search results for: %s", query)
+                return cached
+            CACHE_LOOKUPS.inc(cache='search', result='miss')
+
+        results = self._search(query, num_results, raise_errors)
+
+        # Empty results usually mean a failure, and results with an unread
+        # page would serve that failure for the whole TTL, so neither is cached
+        if results and self.cache and not any(result.get('incomplete') for result in results):
+            self.cache.set(query, num_results, results)
+        return results
+
+    def _search(self, query, num_results, raise_errors=False):
         try:
-            logger.info(f"Performing Google search for: {query}")
+            logger.debug("Performing web search for: %s", query)
             results = []
             
-            # Use googlesearch-python to get search results
-            search_results = search(query, num_results=num_results, advanced=True)
+            with stage_timer('search_backend'):
+                # googlesearch yields lazily, so the requests happen while iterating
+                if self.governor:
+                    search_results = self.governor.call('search', lambda: list(self.backend(query, num_results)))
+                else:
+                    search_results = list(self.backend(query, num_results))
             
+            hits = []
             for result in search_results:
                 try:
                     # Extract information from search result
-                    url = result.url
-                    title = result.title or "No title available"
-                    snippet = result.description or "No description available"
-                    
-                    # Get additional context from the webpage
-                    page_context = self.get_page_context(url)
-                    
-                    results.append({
-                        'url': url,
-                        'title': title,
-                        'snippet': snippet,
-                        'context': page_context
-                    })
-                    
-                    # Be nice to servers
-                    time.sleep(2)
-                    
+                    hits.append((
+                        result.url,
+                        result.title or "No title available",
+                        result.description or "No description available",
+                    ))
                 except Exception as e:
-                    logger.warning(f"Error processing search result: {str(e)}")
+                    logger.warning("Error processing search result: %s", e)
                     continue
             
-            logger.info(f"Found {len(results)} results")
+            with stage_timer('page_contexts'):
+                contexts = self.get_page_contexts([hit[0] for hit in hits])
+            
+            for (url, title, snippet), page_context in zip(hits, contexts):
+                result = {
+                    'url': url,
+                    'title': title,
+                    'snippet': snippet,
+                    'context': page_context or ""
+                }
+                if page_context is None:
+                    result['incomplete'] = True
+                results.append(result)
+            
+            logger.debug("Found %d results", len(results))
             return results
             
         except Exception as e:
-            logger.error(f"Error performing web search: {str(e)}")
+            logger.error("Error performing web search: %s", e)
+            if raise_errors:
+                raise
             return []
             
-    def get_page_context(self, url):
+    def get_page_contexts(self, urls):
+        """
+        Get the context of several result pages in parallel.
+
+        The per-host rate limiter keeps each server from being hammered. A
+        page whose host is busy is not waited for on the shared fetch pool;
+        it is fetched after the others, with this thread waiting for the
+        host's token, until page_deadline runs out.
+
+        Args:
+            urls (list): URLs to fetch
+
+        Returns:
+            list: Context of each URL, None where the page could not be read
+        """
+        deadline = time.monotonic() + self.page_deadline
+        contexts = list(self._fetch_executor.map(profiled(self.get_page_context), urls))
+        retries = {}
+        for index, url in enumerate(urls):
+            remaining = deadline - time.monotonic()
+            if contexts[index] is not None or remaining <= 0:
+                continue
+            with stage_timer('page_rate_limit'):
+                if self.rate_limiter.acquire(url, remaining) is None:
+                    continue
+            retries[index] = self._fetch_executor.submit(profiled(self.get_page_context), url, False)
+        for index, future in retries.items():
+            contexts[index] = future.result()
+        if None in contexts:
+            logger.debug("Could not read %d of %d result pages", contexts.count(None), len(urls))
+        return contexts
+
+    def get_page_context(self, url, rate_limit=True):
         """
         Get additional context from the webpage.
         
         Args:
             url (str): URL to fetch
+            rate_limit (bool): Take a token from the host's rate limiter
+                first; False if the caller already took it
             
         Returns:
-            str: Extracted context or empty string if failed
+            str: Extracted context, empty if the page has none, or None if
+            the host was busy or the fetch failed and may succeed later
         """
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Remove script and style elements
-            for script in soup(['script', 'style']):
-                script.decompose()
-                
-            # Get text content
-            text = soup.get_text(separator=' ', strip=True)
-            
-            # Clean up whitespace
-            text = ' '.join(text.split())
-            
-            # Limit to first 1000 characters
-            return text[:1000]
+            cached = self.page_cache.get(url) if self.page_cache else None
+            if cached and self.page_cache.is_fresh(cached):
+                self.page_cache.count('fresh_hits')
+                CACHE_LOOKUPS.inc(cache='page', result='fresh')
+                return cached['context']
+
+            # Revalidate a stale entry so an unchanged page is neither downloaded nor parsed
+            headers = {}
+            if cached and cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached and cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+
+            if rate_limit:
+                with stage_timer('page_rate_limit'):
+                    if self.rate_limiter.acquire(url) is None:
+                        # The host is busy; waiting would hold a fetch thread other hosts need
+                        PAGE_BODIES.inc(result='rate_limited')
+                        return None
+            streaming = self.page_context_mode == 'stream'
+            with stage_timer('page_fetch'):
+                # With stream=True only the headers have arrived at this point
+                response = self.http_client.get(url, headers=headers, stream=streaming)
+            try:
+                if cached and response.status_code == 304:
+                    self.page_cache.count('revalidated')
+                    CACHE_LOOKUPS.inc(cache='page', result='revalidated')
+                    self.page_cache.touch(url, cached)
+                    return cached['context']
+                response.raise_for_status()
+
+                with stage_timer('page_parse'):
+                    if streaming:
+                        context = self.read_context(response, url)
+                    elif self.parse_pool.workers:
+                        context = self.parse_pool.run(parse_page_html, response.content, response.encoding)
+                    else:
+                        context = self.extract_context(response.text)
+            finally:
+                # Returns the connection to the pool, or drops it if the body was not read to the end
+                response.close()
+            if self.page_cache:
+                self.page_cache.count('misses')
+                CACHE_LOOKUPS.inc(cache='page', result='miss')
+                self.page_cache.set(url, context, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            return context
             
         except Exception as e:
-            logger.warning(f"Error fetching page context for {url}: {str(e)}")
+            logger.warning("Error fetching page context for %s: %s", url, e)
+            status = e.response.status_code if isinstance(e, requests.HTTPError) and e.response is not None else None
+            # A missing or forbidden page stays that way; anything else is worth another try
+            if status is not None and 400 <= status < 500 and status != 429:
+                return ""
+            return None
+
+    def read_context(self, response, url):
+        """
+        Extract the context from a streamed response without reading all of it.
+
+        Pages with a media type outside content_types are not read at all;
+        otherwise reading stops once enough text is found or after
+        max_page_bytes.
+
+        Args:
+            response (requests.Response): Response opened with stream=True
+            url (str): Page URL, for logging
+
+        Returns:
+            str: Extracted context
+        """
+        content_type = response.headers.get('Content-Type')
+        if not is_allowed_content_type(content_type, self.content_types):
+            PAGE_BODIES.inc(result='content_type')
+            logger.debug("Skipping %s with content type %s", url, content_type)
             return ""
+
+        _, charset = parse_content_type(content_type)
+        if self.parse_pool.workers:
+            context, reason = self._read_context_in_pool(response.iter_content(PAGE_CHUNK_SIZE), charset)
+        else:
+            context, reason = extract_visible_text(
+                response.iter_content(PAGE_CHUNK_SIZE),
+                max_chars=DEFAULT_MAX_CHARS,
+                max_bytes=self.max_page_bytes,
+                charset=charset,
+            )
+        PAGE_BODIES.inc(result=reason)
+        if reason == 'byte_cap':
+            logger.debug("Stopped reading %s after %s bytes", url, self.max_page_bytes)
+        return context
+
+    def _read_context_in_pool(self, chunks, charset):
+        # A worker cannot be fed chunk by chunk, so it gets growing prefixes
+        # of the body until the budget is met; at most about a third more
+        # is parsed than a single pass would
+        body = bytearray()
+        window = PARSE_WINDOW_BYTES
+        chunks = iter(chunks)
+        exhausted = False
+        while True:
+            while len(body) < window and len(body) <= self.max_page_bytes:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                body += chunk
+            capped = len(body) > self.max_page_bytes
+            context, reason = self.parse_pool.run(parse_page_text, bytes(body[:self.max_page_bytes]), charset,
+                                                  DEFAULT_MAX_CHARS)
+            if reason == 'budget':
+                return context, reason
+            if capped:
+                return context, 'byte_cap'
+            if exhausted:
+                return context, 'complete'
+            window *= 4
+
+    @staticmethod
+    def extract_context(html):
+        """
+        Extract the first 1000 characters of visible text from a page.
+        
+        Args:
+            html (str): Page content
+            
+        Returns:
+            str: Extracted context
+        """
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        # Remove script and style elements
+        for script in soup(['script', 'style']):
+            script.decompose()
+            
+        # Get text content
+        text = soup.get_text(separator=' ', strip=True)
+        
+        # Clean up whitespace
+        text = ' '.join(text.split())
+        
+        # Limit to first 1000 characters
+        return text[:1000]
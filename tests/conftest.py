@@ -7,3 +7,9 @@ import sys
 
 # Add src directory to Python path for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    """Keep the persistent caches out of the working directory"""
+    monkeypatch.setenv('SEARCH_CACHE_PATH', str(tmp_path / 'web_search.db'))
+    monkeypatch.setenv('PAGE_CACHE_PATH', str(tmp_path / 'web_search.db'))
@@ -0,0 +1,65 @@
+import json
+import importlib.util
+import pytest
+from pathlib import Path
+
+BENCHMARKS = Path(__file__).parent.parent / 'benchmarks'
+
+def load(name):
+    spec = importlib.util.spec_from_file_location(f'benchmark_{name}', BENCHMARKS / f'{name}.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture(scope='module')
+def suite():
+    return load('suite')
+
+def test_every_case_runs(suite):
+    """Test that each benchmark runs once offline and produces a report"""
+    report = suite.run_suite(iterations=1, warmup=0)
+
+    assert report['schema'] == suite.SCHEMA_VERSION
+    assert set(report['benchmarks']) == set(suite.CASES)
+    assert 'page_context.encyclopedia' in report['benchmarks']
+    for result in report['benchmarks'].values():
+        assert result['iterations'] == 1
+        assert result['median_s'] > 0
+    json.dumps(report)
+
+def test_cases_exercise_real_paths(suite):
+    """Test that the stubbed cases return real extraction results"""
+    with suite.CASES['youtube.get_latest_video']() as (func, items):
+        assert func()['video_id'] == 'X1fH-ZM9TBr'
+    with suite.CASES['page_context.news_article']() as (func, items):
+        context = func()
+        assert context.startswith('YouTuber builds 100 homes')
+        assert 'var cfg' not in context
+
+def test_compare_flags_regressions(suite):
+    """Test comparison of median times against a baseline"""
+    def report(**medians):
+        return {'benchmarks': {name: {'median_s': median} for name, median in medians.items()}}
+
+    rows = suite.compare(report(a=1.5, b=1.0, c=0.5, d=1.0), report(a=1.0, b=0.95, c=1.0), threshold=0.1)
+
+    assert [(row[0], row[4]) for row in rows] == [('a', 'regression'), ('b', 'same'), ('c', 'improvement')]
+
+def test_main_exit_code(suite, tmp_path):
+    """Test that main writes the report and fails on a regression"""
+    output = tmp_path / 'current.json'
+    assert suite.main(['--filter', 'query.', '--iterations', '2', '--output', str(output)]) == 0
+
+    baseline = json.loads(output.read_text())
+    baseline['benchmarks']['query.build_search_query']['median_s'] /= 100
+    baseline_path = tmp_path / 'baseline.json'
+    baseline_path.write_text(json.dumps(baseline))
+
+    assert suite.main(['--filter', 'query.', '--iterations', '2', '--compare', str(baseline_path)]) == 1
+
+def test_fixtures_are_reproducible():
+    """Test that the fixture generator rebuilds the checked-in pages byte for byte"""
+    make_fixtures = load('make_fixtures')
+
+    for name, page in make_fixtures.generate().items():
+        assert (make_fixtures.FIXTURES / name).read_bytes() == page.encode('utf-8'), name
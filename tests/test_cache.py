@@ -0,0 +1,182 @@
+import time
+import pytest
+from unittest.mock import Mock, patch
+from src.youtube_tracker.cache import LRUCache, PageContextCache, SearchCache, canonicalize_url, normalize_query
+from src.youtube_tracker.web_search import WebSearcher
+
+RESULTS = [{'url': 'https://example.com', 'title': 'T', 'snippet': 'S', 'context': 'C'}]
+
+@pytest.fixture
+def cache(tmp_path):
+    return SearchCache(path=str(tmp_path / 'cache.db'), ttl=60, max_entries=3, memory_entries=2, evict_interval=1)
+
+def test_normalize_query():
+    """Test that near-identical queries normalize to the same key"""
+    assert normalize_query('  Hello,   WORLD! ') == 'hello world'
+    assert normalize_query('"Ｈｅｌｌｏ" world') == 'hello world'
+    assert normalize_query('C++ - news') == 'c++ news'
+
+def test_lru_evicts_least_recently_used():
+    """Test LRU eviction order"""
+    lru = LRUCache(max_entries=2, ttl=60)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    lru.get('a')
+    lru.set('c', 3)
+
+    assert lru.get('a') == 1
+    assert lru.get('b') is None
+    assert lru.get('c') == 3
+
+def test_lru_expires_entries():
+    """Test that entries older than the TTL are dropped"""
+    lru = LRUCache(max_entries=2, ttl=10)
+    lru.set('a', 1, stored_at=time.time() - 11)
+    assert lru.get('a') is None
+
+def test_search_cache_hits_and_misses(cache):
+    """Test memory and disk tier hits and miss counting"""
+    assert cache.get('query', 5) is None
+    cache.set('Query!', 5, RESULTS)
+
+    assert cache.get('query', 5) == RESULTS
+    assert cache.get('query', 3) is None
+    assert cache.stats == {'memory_hits': 1, 'disk_hits': 0, 'misses': 2}
+
+def test_search_cache_survives_restart(cache, tmp_path):
+    """Test that the persistent tier is used by a new cache instance"""
+    cache.set('query', 5, RESULTS)
+
+    restarted = SearchCache(path=str(tmp_path / 'cache.db'), ttl=60)
+    assert restarted.get('query', 5) == RESULTS
+    assert restarted.stats['disk_hits'] == 1
+    # Promoted to the memory tier
+    assert restarted.get('query', 5) == RESULTS
+    assert restarted.stats['memory_hits'] == 1
+
+def test_search_cache_size_and_ttl_eviction(cache, tmp_path):
+    """Test that the persistent tier is trimmed to its size and TTL"""
+    for i in range(5):
+        cache.set(f'query {i}', 5, RESULTS)
+
+    rows = cache.store.execute("SELECT key FROM {table} ORDER BY key")
+    assert [row[0] for row in rows] == ['5:query 2', '5:query 3', '5:query 4']
+
+    expired = SearchCache(path=str(tmp_path / 'cache.db'), ttl=-1)
+    assert expired.get('query 4', 5) is None
+
+def test_eviction_runs_every_interval(tmp_path):
+    """Test that the persistent tier is swept on the first write and then every evict_interval writes"""
+    cache = SearchCache(path=str(tmp_path / 'cache.db'), ttl=60, max_entries=2, evict_interval=3)
+    with patch.object(cache.store, 'evict', wraps=cache.store.evict) as evict:
+        for i in range(7):
+            cache.set(f'query {i}', 5, RESULTS)
+    assert evict.call_count == 3
+
+    # Swept after the seventh write
+    rows = cache.store.execute("SELECT key FROM {table} ORDER BY key")
+    assert [row[0] for row in rows] == ['5:query 5', '5:query 6']
+    indexes = cache.store.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = '{table}'")
+    assert {'ix_search_results_accessed_at', 'ix_search_results_stored_at'} <= {row[0] for row in indexes}
+
+def test_web_searcher_uses_cache(cache):
+    """Test that repeated searches are served from the cache"""
+    searcher = WebSearcher(cache=cache)
+    with patch.object(WebSearcher, '_search', return_value=RESULTS) as mock_search:
+        assert searcher.search('test query') == RESULTS
+        assert searcher.search('Test  query.') == RESULTS
+        assert mock_search.call_count == 1
+
+        # Bypass flag always searches
+        searcher.search('test query', use_cache=False)
+        assert mock_search.call_count == 2
+
+def test_web_searcher_does_not_cache_empty_results(cache):
+    """Test that failed searches are retried"""
+    searcher = WebSearcher(cache=cache)
+    with patch.object(WebSearcher, '_search', return_value=[]) as mock_search:
+        searcher.search('test query')
+        searcher.search('test query')
+        assert mock_search.call_count == 2
+
+def test_web_searcher_does_not_cache_incomplete_results(cache):
+    """Test that results with a page that could not be read are searched again"""
+    searcher = WebSearcher(cache=cache)
+    incomplete = RESULTS + [{'url': 'https://example.org', 'title': 'T', 'snippet': 'S', 'context': '',
+                             'incomplete': True}]
+    with patch.object(WebSearcher, '_search', side_effect=[incomplete, RESULTS, RESULTS]) as mock_search:
+        assert searcher.search('test query') == incomplete
+        assert searcher.search('test query') == RESULTS
+        assert searcher.search('test query') == RESULTS
+        assert mock_search.call_count == 2
+
+def test_cache_disabled_from_env(monkeypatch):
+    """Test the SEARCH_CACHE_ENABLED switch"""
+    monkeypatch.setenv('SEARCH_CACHE_ENABLED', 'false')
+    assert SearchCache.from_env() is None
+    assert not WebSearcher().cache
+
+def make_page_response(status_code=200, text='<p>Fresh content</p>', headers=None):
+    response = Mock()
+    response.status_code = status_code
+    response.text = text
+    response.iter_content.return_value = [text.encode('utf-8')]
+    response.headers = headers or {}
+    response.raise_for_status.return_value = None
+    return response
+
+@pytest.fixture
+def page_cache(tmp_path):
+    return PageContextCache(path=str(tmp_path / 'cache.db'), fresh_ttl=60, max_age=3600)
+
+def test_canonicalize_url():
+    """Test that equivalent URLs share a canonical form"""
+    expected = 'https://en.wikipedia.org/wiki/Python?a=1&b=2'
+    assert canonicalize_url('HTTPS://En.Wikipedia.org:443/wiki/Python?b=2&a=1#History') == expected
+    assert canonicalize_url('https://en.wikipedia.org/wiki/Python?a=1&utm_source=x&b=2&gclid=y') == expected
+    assert canonicalize_url('http://example.com:8080') == 'http://example.com:8080/'
+
+def test_page_cache_survives_restart(page_cache, tmp_path):
+    """Test that contexts and validators persist across instances"""
+    page_cache.set('https://example.com/a?utm_medium=x', 'context', '"etag"', 'Fri, 16 Oct 2026 18:12:01 GMT')
+
+    restarted = PageContextCache(path=str(tmp_path / 'cache.db'))
+    entry = restarted.get('https://EXAMPLE.com/a')
+    assert entry['context'] == 'context'
+    assert entry['etag'] == '"etag"'
+    assert entry['last_modified'] == 'Fri, 16 Oct 2026 18:12:01 GMT'
+
+def test_fresh_page_context_skips_request(page_cache):
+    """Test that a fresh entry is served without any request"""
+    http_client = Mock()
+    searcher = WebSearcher(http_client=http_client, cache=False, page_cache=page_cache)
+    page_cache.set('https://example.com', 'cached context')
+
+    assert searcher.get_page_context('https://example.com') == 'cached context'
+    http_client.get.assert_not_called()
+    assert page_cache.stats['fresh_hits'] == 1
+
+def test_stale_page_context_is_revalidated(page_cache):
+    """Test that a 304 response reuses the cached context"""
+    http_client = Mock()
+    http_client.get.return_value = make_page_response(status_code=304, text='')
+    searcher = WebSearcher(http_client=http_client, cache=False, page_cache=page_cache)
+    page_cache.set('https://example.com', 'cached context', '"v1"', None)
+    page_cache.fresh_ttl = -1
+
+    assert searcher.get_page_context('https://example.com') == 'cached context'
+    assert http_client.get.call_args.kwargs['headers'] == {'If-None-Match': '"v1"'}
+    assert page_cache.stats['revalidated'] == 1
+
+def test_changed_page_context_is_replaced(page_cache):
+    """Test that a 200 response is parsed and stored with its validators"""
+    http_client = Mock()
+    http_client.get.return_value = make_page_response(headers={'ETag': '"v2"'})
+    searcher = WebSearcher(http_client=http_client, cache=False, page_cache=page_cache)
+    page_cache.set('https://example.com', 'old context', '"v1"', None)
+    page_cache.fresh_ttl = -1
+
+    assert searcher.get_page_context('https://example.com') == 'Fresh content'
+    entry = page_cache.get('https://example.com')
+    assert entry['context'] == 'Fresh content'
+    assert entry['etag'] == '"v2"'
@@ -0,0 +1,157 @@
+import os
+import sys
+import json
+import subprocess
+import pytest
+from pathlib import Path
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.youtube_tracker.channels import (
+    ChannelRegistry, import_channels, parse_channel_file, record_channel_checks, set_channels_enabled
+)
+from src.youtube_tracker.migrations import migrate
+from src.youtube_tracker.models import Channel
+
+ROOT = Path(__file__).parent.parent
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    monkeypatch.delenv('YOUTUBE_CHANNEL_IDS', raising=False)
+    engine = create_engine(f"sqlite:///{tmp_path / 'channels.db'}")
+    migrate(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def run_import(session_factory, channels, **kwargs):
+    db = session_factory()
+    try:
+        counts = import_channels(db, channels, **kwargs)
+        db.commit()
+        return counts
+    finally:
+        db.close()
+
+def test_parse_csv_and_jsonl():
+    """Test both file formats, with and without a CSV header"""
+    channels, errors = parse_channel_file('channel_id,title,priority,enabled\nUC1,One,5,yes\nUC2,,,\nUC1,Uno,,\n')
+    assert errors == []
+    assert channels == [{'channel_id': 'UC1', 'title': 'Uno'}, {'channel_id': 'UC2'}]
+
+    channels, errors = parse_channel_file('UC1\n\nUC2,ignored\n')
+    assert [channel['channel_id'] for channel in channels] == ['UC1', 'UC2']
+
+    channels, errors = parse_channel_file(
+        '{"channel_id": "UC1", "enabled": false, "priority": 2}\n"UC2"\n{oops\n{"channel_id": "a b"}\n',
+        'jsonl'
+    )
+    assert channels == [{'channel_id': 'UC1', 'enabled': False, 'priority': 2}, {'channel_id': 'UC2'}]
+    assert [error.split(':')[0] for error in errors] == ['line 3', 'line 4']
+
+def test_import_is_incremental(session_factory):
+    """Test that imports add, update and disable only what changed"""
+    counts = run_import(session_factory, [{'channel_id': 'UC1', 'priority': 5}, {'channel_id': 'UC2'},
+                                          {'channel_id': 'UC3', 'title': 'Three'}])
+    assert counts == {'added': 3, 'updated': 0, 'unchanged': 0, 'disabled': 0}
+
+    # Settings left out of a row keep their stored values
+    counts = run_import(session_factory, [{'channel_id': 'UC1'}, {'channel_id': 'UC2', 'priority': 1}],
+                        disable_missing=True)
+    assert counts == {'added': 0, 'updated': 1, 'unchanged': 1, 'disabled': 1}
+
+    db = session_factory()
+    rows = {row.channel_id: (row.enabled, row.priority, row.title) for row in db.query(Channel)}
+    db.close()
+    assert rows == {'UC1': (True, 5, None), 'UC2': (True, 1, None), 'UC3': (False, 0, 'Three')}
+
+def test_registry_reloads_changed_rows(session_factory, monkeypatch):
+    """Test hot reload of imported and disabled channels"""
+    monkeypatch.setenv('YOUTUBE_CHANNEL_IDS', 'UC1, UC2')
+    clock = Clock()
+    registry = ChannelRegistry(session_factory, reload_interval=30, clock=clock)
+
+    assert registry.reload() == ({'UC1', 'UC2'}, set())
+    run_import(session_factory, [{'channel_id': 'UC3', 'priority': 10}])
+    # Not due yet
+    assert registry.reload_if_due() == (set(), set())
+    clock.now = 30
+    assert registry.reload_if_due() == ({'UC3'}, set())
+    assert registry.channel_ids() == ['UC3', 'UC1', 'UC2']
+
+    db = session_factory()
+    set_channels_enabled(db, ['UC1'], False)
+    db.commit()
+    db.close()
+    version = registry.version
+    assert registry.reload() == (set(), {'UC1'})
+    assert registry.reload() == (set(), set())
+    assert registry.version == version + 1
+    assert registry.channel_ids() == ['UC3', 'UC2']
+
+def test_registry_starting_empty_picks_up_imports(session_factory):
+    """Test that reloads keep working after a first reload that found no channels"""
+    registry = ChannelRegistry(session_factory, reload_interval=0)
+
+    assert registry.reload() == (set(), set())
+    assert registry.reload() == (set(), set())
+    run_import(session_factory, [{'channel_id': 'UC1'}])
+    assert registry.reload() == ({'UC1'}, set())
+    assert registry.channel_ids() == ['UC1']
+
+def test_disabled_channel_stays_disabled_while_in_env(session_factory, monkeypatch):
+    """Test that YOUTUBE_CHANNEL_IDS only adds missing channels"""
+    run_import(session_factory, [{'channel_id': 'UC1', 'enabled': False}])
+    monkeypatch.setenv('YOUTUBE_CHANNEL_IDS', 'UC1,UC2')
+
+    registry = ChannelRegistry(session_factory, reload_interval=0)
+    registry.reload()
+
+    assert registry.channel_ids() == ['UC2']
+
+def test_checks_do_not_trigger_reloads(session_factory):
+    """Test that recording checks stamps times without changing updated_at"""
+    run_import(session_factory, [{'channel_id': 'UC1'}, {'channel_id': 'UC2'}])
+    registry = ChannelRegistry(session_factory, reload_interval=0)
+    registry.reload()
+    now = datetime(2024, 1, 1)
+
+    db = session_factory()
+    record_channel_checks(db, ['UC1', 'UC2'], {'UC2'}, now=now)
+    db.commit()
+    rows = {row.channel_id: (row.last_checked_at, row.last_changed_at) for row in db.query(Channel)}
+    db.close()
+
+    assert rows == {'UC1': (now, None), 'UC2': (now, now)}
+    assert registry.reload() == (set(), set())
+
+def test_channels_command(tmp_path):
+    """Test importing and listing channels with the entry point"""
+    database = tmp_path / 'cli.db'
+    env = dict(os.environ, PYTHONPATH=str(ROOT / 'src'), DATABASE_URL=f"sqlite:///{database}")
+    env.pop('YOUTUBE_CHANNEL_IDS', None)
+    channels = tmp_path / 'channels.jsonl'
+    channels.write_text('{"channel_id": "UC1", "priority": 1}\n"UC2"\n')
+    command = [sys.executable, '-m', 'youtube_tracker']
+    subprocess.run(command + ['migrate'], cwd=tmp_path, env=env, check=True, timeout=60)
+
+    output = subprocess.run(command + ['channels', 'import', str(channels)], cwd=tmp_path, env=env, check=True,
+                            timeout=60, capture_output=True, text=True).stdout
+    assert output.startswith('Imported 2 channels: 2 added')
+    subprocess.run(command + ['channels', 'disable', 'UC2'], cwd=tmp_path, env=env, check=True, timeout=60)
+    listed = subprocess.run(command + ['channels', 'list', '--all', '--format', 'jsonl'], cwd=tmp_path, env=env,
+                            check=True, timeout=60, capture_output=True, text=True).stdout
+
+    assert [(item['channel_id'], item['enabled']) for item in map(json.loads, listed.splitlines())] == \
+        [('UC1', True), ('UC2', False)]
+    channels.write_text('{"channel_id": ""}\n')
+    invalid = subprocess.run(command + ['channels', 'import', str(channels)], cwd=tmp_path, env=env, timeout=60,
+                             capture_output=True, text=True)
+    assert invalid.returncode == 2
+    assert invalid.stderr.startswith('line 1: invalid channel_id')
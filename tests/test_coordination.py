@@ -0,0 +1,151 @@
+import time
+import threading
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.youtube_tracker.coordination import LeaseCoordinator
+from src.youtube_tracker.models import Base, ChannelLease
+
+CHANNELS = [f'UC{i:03d}' for i in range(10)]
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # A file database so every coordinator gets its own connection, like separate replicas
+    engine = create_engine(f"sqlite:///{tmp_path / 'leases.db'}", connect_args={'timeout': 30})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+def make_replica(session_factory, clock, name, claim_size=4):
+    return LeaseCoordinator(session_factory, cycle_seconds=900, replica_id=name,
+                            lease_seconds=60, claim_size=claim_size, clock=clock)
+
+def test_sync_channels(session_factory, clock):
+    """Test that lease rows follow the configured channel list"""
+    replica = make_replica(session_factory, clock, 'a')
+    replica.sync_channels(CHANNELS)
+    replica.sync_channels(CHANNELS[2:] + ['UCnew'])
+
+    db = session_factory()
+    assert sorted(row.channel_id for row in db.query(ChannelLease)) == sorted(CHANNELS[2:] + ['UCnew'])
+    db.close()
+
+def test_replicas_claim_disjoint_batches(session_factory, clock):
+    """Test that two replicas never hold the same channel"""
+    a = make_replica(session_factory, clock, 'a')
+    b = make_replica(session_factory, clock, 'b')
+    a.sync_channels(CHANNELS)
+    cycle = a.current_cycle()
+
+    _, claimed_a = a.claim(cycle)
+    _, claimed_b = b.claim(cycle)
+
+    assert len(claimed_a) == 4
+    assert len(claimed_b) == 4
+    assert not set(claimed_a) & set(claimed_b)
+
+def test_each_channel_processed_once_per_cycle(session_factory, clock):
+    """Test that a full cycle across replicas covers every channel exactly once"""
+    a = make_replica(session_factory, clock, 'a')
+    b = make_replica(session_factory, clock, 'b')
+    a.sync_channels(CHANNELS)
+    processed = []
+
+    a.run_cycle(processed.extend)
+    b.run_cycle(processed.extend)
+    assert sorted(processed) == CHANNELS
+
+    # Nothing left until the next cycle starts
+    assert a.run_cycle(processed.extend) == 0
+    clock.now += 900
+    assert b.run_cycle(processed.extend) == len(CHANNELS)
+
+def test_expired_lease_is_taken_over(session_factory, clock):
+    """Test that channels of a dead replica are rebalanced after the lease expires"""
+    dead = make_replica(session_factory, clock, 'dead')
+    alive = make_replica(session_factory, clock, 'alive', claim_size=100)
+    dead.sync_channels(CHANNELS)
+    cycle = dead.current_cycle()
+
+    _, abandoned = dead.claim(cycle)
+    token, claimed = alive.claim(cycle)
+    assert not set(abandoned) & set(claimed)
+    alive.complete(token, cycle)
+
+    clock.now += 61
+    _, recovered = alive.claim(cycle)
+    assert sorted(recovered) == sorted(abandoned)
+
+def test_failed_batch_is_released(session_factory, clock):
+    """Test that an error gives the batch back for another attempt"""
+    replica = make_replica(session_factory, clock, 'a', claim_size=100)
+    replica.sync_channels(CHANNELS)
+
+    def fail(channel_ids):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        replica.run_cycle(fail)
+    assert replica.run_cycle(lambda channel_ids: None) == len(CHANNELS)
+
+def test_failed_channels_are_retried(session_factory, clock):
+    """Test that channels reported as failed are released, not completed"""
+    replica = make_replica(session_factory, clock, 'a', claim_size=100)
+    replica.sync_channels(CHANNELS)
+
+    assert replica.run_cycle(lambda channel_ids: {CHANNELS[0]}) == len(CHANNELS) - 1
+    # Held back for the retry delay, then claimable again in the same cycle
+    assert replica.run_cycle(lambda channel_ids: None) == 0
+    clock.now += replica.retry_delay + 1
+    processed = []
+    assert replica.run_cycle(processed.extend) == 1
+    assert processed == [CHANNELS[0]]
+
+def test_heartbeat_keeps_slow_batch_leased(session_factory, clock):
+    """Test that a batch running past LEASE_SECONDS is not taken over"""
+    slow = LeaseCoordinator(session_factory, cycle_seconds=900, replica_id='slow', lease_seconds=0.3,
+                            claim_size=100, clock=clock)
+    other = make_replica(session_factory, clock, 'other')
+    slow.sync_channels(CHANNELS)
+    stolen = []
+
+    def process(channel_ids):
+        # Well past the original lease; heartbeats run every 0.1s
+        clock.now += 10
+        time.sleep(0.5)
+        stolen.extend(other.claim(other.current_cycle())[1])
+
+    slow.run_cycle(process)
+
+    assert stolen == []
+    assert other.run_cycle(lambda channel_ids: None) == 0
+
+def test_concurrent_replicas(session_factory, clock):
+    """Test replicas running in parallel threads"""
+    channels = [f'UC{i:04d}' for i in range(200)]
+    replicas = [make_replica(session_factory, clock, f'r{i}', claim_size=7) for i in range(4)]
+    replicas[0].sync_channels(channels)
+    processed = []
+    lock = threading.Lock()
+
+    def process(channel_ids):
+        with lock:
+            processed.extend(channel_ids)
+
+    threads = [threading.Thread(target=replica.run_cycle, args=(process,)) for replica in replicas]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(processed) == channels
@@ -0,0 +1,202 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.youtube_tracker.enrichment import EnrichmentQueue, EnrichmentWorker
+from src.youtube_tracker.migrations import migrate
+from src.youtube_tracker.models import EnrichmentJob, LatestVideo, ProcessedVideo
+from src.youtube_tracker.persistence import load_web_search_results, save_cycle_results
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'enrichment.db'}")
+    migrate(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def queue(session_factory, clock):
+    return EnrichmentQueue(session_factory, lease_seconds=60, max_attempts=3, retry_delay=10,
+                           max_pending=100, clock=clock)
+
+def make_result(url):
+    return {'url': url, 'title': 'Title', 'snippet': 'Snippet', 'context': 'Context'}
+
+def make_video(channel_id, video_id):
+    return {
+        'channel_id': channel_id,
+        'video_id': video_id,
+        'title': f'Video {video_id}',
+        'url': f'https://www.youtube.com/watch?v={video_id}',
+        'thumbnail': f'https://i.ytimg.com/vi/{video_id}/hqdefault.jpg',
+        'description': 'Description',
+        'web_search_results': None,
+        'enrichment_status': 'pending',
+    }
+
+def record(session_factory, queue, videos):
+    """Save videos and their jobs in one transaction, as a cycle does"""
+    db = session_factory()
+    try:
+        save_cycle_results(db, videos)
+        queue.enqueue(db, videos)
+        db.commit()
+    finally:
+        db.close()
+
+def latest(session_factory, channel_id):
+    db = session_factory()
+    try:
+        row = db.query(LatestVideo).filter_by(channel_id=channel_id).one()
+        return row.video_id, row.enrichment_status, load_web_search_results(db, [row.video_id]).get(row.video_id)
+    finally:
+        db.close()
+
+def test_enqueue_is_idempotent(session_factory, queue):
+    """Test that a video gets one job however often it is enqueued"""
+    record(session_factory, queue, [make_video('UC1', 'a'), make_video('UC2', 'b')])
+    record(session_factory, queue, [make_video('UC1', 'a')])
+
+    assert queue.depth() == 2
+
+def test_claim_is_exclusive(session_factory, queue, clock):
+    """Test that claimed jobs are not handed out again until the claim expires"""
+    record(session_factory, queue, [make_video('UC1', 'a'), make_video('UC2', 'b')])
+
+    first = queue.claim(1)
+    second = queue.claim(5)
+    assert [job['video_id'] for job in first] == ['a']
+    assert [job['video_id'] for job in second] == ['b']
+    assert queue.claim(5) == []
+
+    clock.now += 61
+    assert [job['attempts'] for job in queue.claim(5)] == [2, 2]
+
+def test_complete_stores_results(session_factory, queue):
+    """Test that results are stored for the video and the job is removed"""
+    record(session_factory, queue, [make_video('UC1', 'a')])
+    assert latest(session_factory, 'UC1') == ('a', 'pending', None)
+
+    job, = queue.claim(5)
+    queue.complete(job, [make_result('https://example.com')])
+
+    assert latest(session_factory, 'UC1') == ('a', 'done', [make_result('https://example.com')])
+    assert queue.depth() == 0
+
+def test_complete_after_replacement(session_factory, queue):
+    """Test that results of a video replaced meanwhile are still stored"""
+    record(session_factory, queue, [make_video('UC1', 'a')])
+    job, = queue.claim(5)
+    record(session_factory, queue, [make_video('UC1', 'b')])
+
+    queue.complete(job, [make_result('https://example.com')], 'Summary')
+
+    assert latest(session_factory, 'UC1') == ('b', 'pending', None)
+    db = session_factory()
+    assert db.query(ProcessedVideo).filter_by(video_id='a').one().summary == 'Summary'
+    assert load_web_search_results(db, ['a']) == {'a': [make_result('https://example.com')]}
+    db.close()
+
+def test_complete_with_lost_claim_is_dropped(session_factory, queue, clock):
+    """Test that a worker whose claim expired cannot complete a job claimed again"""
+    record(session_factory, queue, [make_video('UC1', 'a')])
+    stale, = queue.claim(5)
+    clock.now += 61
+    current, = queue.claim(5)
+
+    assert queue.complete(stale, [make_result('https://stale.example')]) == 0
+    assert latest(session_factory, 'UC1') == ('a', 'pending', None)
+    assert queue.complete(current, [make_result('https://example.com')]) == 1
+    assert latest(session_factory, 'UC1') == ('a', 'done', [make_result('https://example.com')])
+
+def test_retry_with_backoff_then_fail(session_factory, queue, clock):
+    """Test exponential backoff between attempts and the final failure"""
+    record(session_factory, queue, [make_video('UC1', 'a')])
+
+    job, = queue.claim(5)
+    assert queue.fail(job, RuntimeError('search down'))
+    assert queue.claim(5) == []
+    clock.now += 10
+    job, = queue.claim(5)
+    assert queue.fail(job, RuntimeError('search down'))
+    clock.now += 10
+    assert queue.claim(5) == []
+    clock.now += 10
+    job, = queue.claim(5)
+    assert not queue.fail(job, RuntimeError('search down'))
+
+    assert latest(session_factory, 'UC1') == ('a', 'failed', None)
+    assert queue.depth() == 0
+    db = session_factory()
+    failed = db.query(EnrichmentJob).one()
+    assert (failed.status, failed.attempts, failed.last_error) == ('failed', 3, 'search down')
+    db.close()
+
+def test_full_queue_drops_superseded_jobs(session_factory, clock):
+    """Test that over max_pending, older jobs of the same channel are dropped"""
+    queue = EnrichmentQueue(session_factory, max_pending=2, clock=clock)
+    record(session_factory, queue, [make_video('UC1', 'a'), make_video('UC2', 'b')])
+    record(session_factory, queue, [make_video('UC1', 'c')])
+
+    db = session_factory()
+    assert sorted(job.video_id for job in db.query(EnrichmentJob)) == ['b', 'c']
+    db.close()
+
+def test_worker_drains_queue(session_factory, queue):
+    """Test that the worker enriches every job and retries failures later"""
+    record(session_factory, queue, [make_video(f'UC{index}', f'v{index}') for index in range(6)])
+
+    def enrich(job):
+        if job['video_id'] == 'v3':
+            raise RuntimeError('search down')
+        return [make_result(f"https://example.com/{job['video_id']}")]
+
+    worker = EnrichmentWorker(queue, enrich, concurrency=2, poll_interval=0.01)
+    assert worker.drain() == 6
+
+    assert latest(session_factory, 'UC0') == ('v0', 'done', [make_result('https://example.com/v0')])
+    assert latest(session_factory, 'UC3') == ('v3', 'pending', None)
+    assert queue.depth() == 1
+
+def test_worker_stores_summaries(session_factory, queue):
+    """Test that summaries are stored with the results and a failing summary only loses itself"""
+    record(session_factory, queue, [make_video('UC1', 'v1'), make_video('UC2', 'v2')])
+
+    def summarize(results):
+        if results[0]['url'].endswith('v2'):
+            raise ValueError('no text')
+        return f"Summary of {len(results)} results"
+
+    worker = EnrichmentWorker(queue, lambda job: [make_result(f"https://example.com/{job['video_id']}")],
+                              concurrency=1, poll_interval=0.01, summarize=summarize)
+    assert worker.drain() == 2
+
+    db = session_factory()
+    rows = {row.channel_id: (row.enrichment_status, row.summary) for row in db.query(LatestVideo)}
+    db.close()
+    assert rows == {'UC1': ('done', 'Summary of 1 results'), 'UC2': ('done', None)}
+
+def test_worker_retries_incomplete_results(session_factory, queue, clock):
+    """Test that results with unread pages are retried and stored on the last attempt"""
+    record(session_factory, queue, [make_video('UC1', 'v1')])
+    result = dict(make_result('https://example.com'), context='', incomplete=True)
+    worker = EnrichmentWorker(queue, lambda job: [result], concurrency=1, poll_interval=0.01)
+
+    assert worker.drain() == 1
+    assert latest(session_factory, 'UC1') == ('v1', 'pending', None)
+
+    clock.now += 10
+    assert worker.drain() == 1
+    clock.now += 20
+    assert worker.drain() == 1
+    assert latest(session_factory, 'UC1') == ('v1', 'done', [dict(make_result('https://example.com'), context='')])
@@ -0,0 +1,82 @@
+import json
+import pytest
+from pathlib import Path
+from src.youtube_tracker.extractor import (
+    VideoRecord,
+    extract_channel_videos,
+    extract_video_description,
+    find_json_payload,
+    shorten_description,
+)
+
+FIXTURES = Path(__file__).parent / 'fixtures' / 'youtube'
+
+@pytest.fixture
+def channel_page():
+    return (FIXTURES / 'channel_videos.html').read_bytes()
+
+@pytest.fixture
+def watch_page():
+    return (FIXTURES / 'watch.html').read_bytes()
+
+def test_extract_channel_videos(channel_page):
+    """Test extracting every video tile from a channel page"""
+    videos = extract_channel_videos(channel_page)
+
+    assert len(videos) == 30
+    assert all(isinstance(video, VideoRecord) for video in videos)
+    assert videos[0].video_id == 'X1fH-ZM9TBr'
+    assert videos[0].title == 'I Built 100 Homes And Gave Them Away!'
+    assert videos[0].thumbnail.startswith('https://i.ytimg.com/vi/X1fH-ZM9TBr/')
+    assert videos[0].url == 'https://www.youtube.com/watch?v=X1fH-ZM9TBr'
+    assert videos[0].published == '1 days ago'
+
+def test_extract_channel_videos_keeps_unicode_and_escapes(channel_page):
+    """Test that non-ASCII text and escaped characters are decoded correctly"""
+    titles = [video.title for video in extract_channel_videos(channel_page)]
+
+    assert 'Café ☕ in Tōkyō – 日本語で話そう' in titles
+    assert 'He said "don\'t" & then <left>' in titles
+    assert 'Backslash \\ test / slash' in titles
+
+def test_extract_video_description(watch_page):
+    """Test extracting the full description from a watch page"""
+    description = extract_video_description(watch_page)
+
+    assert description.startswith('Watch the full story of the café ☕ build in Tōkyō – 日本語.\n')
+    assert 'He said "don\'t" and left.' in description
+
+def test_find_json_payload_assignment_forms():
+    """Test the different ways YouTube assigns the payload"""
+    payload = {'a': [1, {'b': 'c;</script>'}]}
+    encoded = json.dumps(payload)
+
+    assert find_json_payload(f'<script>var ytInitialData = {encoded};</script>', 'ytInitialData') == payload
+    assert find_json_payload(f'<script>window["ytInitialData"] = {encoded};</script>', 'ytInitialData') == payload
+    # A mention of the name that is not an assignment is skipped
+    page = f'<script>if (ytInitialData) {{}}</script><script>var ytInitialData={encoded};</script>'
+    assert find_json_payload(page, 'ytInitialData') == payload
+
+def test_missing_or_broken_payload():
+    """Test pages without a usable payload"""
+    assert find_json_payload(b'<html></html>', 'ytInitialData') is None
+    assert find_json_payload(b'<script>var ytInitialData = {"broken": ;</script>', 'ytInitialData') is None
+    assert extract_channel_videos(b'<html></html>') == []
+    assert extract_video_description(b'<html></html>') == ''
+
+def test_grid_video_renderer_and_incomplete_tiles():
+    """Test older grid renderers and tiles missing required fields"""
+    data = {'items': [
+        {'gridVideoRenderer': {'videoId': 'abc', 'title': {'simpleText': 'Grid'},
+                               'thumbnail': {'thumbnails': [{'url': 'https://i.ytimg.com/abc.jpg'}]}}},
+        {'videoRenderer': {'videoId': 'def', 'title': {'runs': [{'text': 'No thumbnail'}]}}},
+    ]}
+    videos = extract_channel_videos(f'var ytInitialData = {json.dumps(data)};</script>')
+
+    assert [video.video_id for video in videos] == ['abc']
+    assert videos[0].title == 'Grid'
+
+def test_shorten_description():
+    """Test description truncation"""
+    assert shorten_description('  a\n\nb  c ') == 'a b c'
+    assert shorten_description(' '.join(['w'] * 101)) == ' '.join(['w'] * 100) + '...'
@@ -0,0 +1,73 @@
+import pytest
+from pathlib import Path
+from unittest.mock import Mock
+from src.youtube_tracker.feed import FeedProbe, parse_feed_video_ids
+
+FEED = (Path(__file__).parent / 'fixtures' / 'youtube' / 'feed.xml').read_bytes()
+
+def make_response(status_code=200, content=FEED, headers=None):
+    response = Mock()
+    response.status_code = status_code
+    response.content = content
+    response.headers = headers or {}
+    response.raise_for_status.return_value = None
+    return response
+
+@pytest.fixture
+def http_client():
+    client = Mock()
+    client.get.return_value = make_response(headers={'ETag': '"v1"', 'Last-Modified': 'Fri, 16 Oct 2026 18:12:01 GMT'})
+    return client
+
+def test_parse_feed_video_ids():
+    """Test extracting video IDs from a channel feed"""
+    assert parse_feed_video_ids(FEED) == ['X1fH-ZM9TBr', 'riGp_58WAm-']
+
+def test_unchanged_channel_skips_scrape(http_client):
+    """Test that a channel whose newest feed entry is stored needs no scrape"""
+    probe = FeedProbe(http_client=http_client)
+    assert probe.has_new_video('UC1', 'X1fH-ZM9TBr') is False
+
+def test_changed_channel_needs_scrape(http_client):
+    """Test that a new feed entry triggers a scrape"""
+    probe = FeedProbe(http_client=http_client)
+    assert probe.has_new_video('UC1', 'riGp_58WAm-') is True
+
+def test_unknown_channel_and_errors_fall_back_to_scrape(http_client):
+    """Test that missing state and probe failures never hide a change"""
+    probe = FeedProbe(http_client=http_client)
+    assert probe.has_new_video('UC1', None) is True
+    http_client.get.assert_not_called()
+
+    http_client.get.side_effect = Exception("Test error")
+    assert probe.has_new_video('UC1', 'X1fH-ZM9TBr') is True
+
+def test_conditional_request_uses_validators(http_client):
+    """Test that the second probe sends validators and reuses the cached ID on 304"""
+    probe = FeedProbe(http_client=http_client)
+    probe.latest_video_id('UC1')
+
+    http_client.get.return_value = make_response(status_code=304, content=b'')
+    assert probe.latest_video_id('UC1') == 'X1fH-ZM9TBr'
+
+    headers = http_client.get.call_args.kwargs['headers']
+    assert headers['If-None-Match'] == '"v1"'
+    assert headers['If-Modified-Since'] == 'Fri, 16 Oct 2026 18:12:01 GMT'
+
+def test_acknowledged_change_is_not_reported_again(http_client):
+    """Test that a feed-only upload stops triggering scrapes once handled"""
+    probe = FeedProbe(http_client=http_client)
+
+    assert probe.has_new_video('UC1', 'older') is True
+    # Not acknowledged yet (e.g. the scrape failed): still reported
+    assert probe.has_new_video('UC1', 'older') is True
+
+    probe.acknowledge('UC1')
+    assert probe.has_new_video('UC1', 'older') is False
+
+def test_feed_url_follows_youtube_base_url(http_client, monkeypatch):
+    """Test that YOUTUBE_BASE_URL redirects feed requests"""
+    monkeypatch.setenv('YOUTUBE_BASE_URL', 'http://127.0.0.1:8800/')
+    FeedProbe(http_client=http_client).latest_video_id('UC1')
+
+    assert http_client.get.call_args[0][0] == 'http://127.0.0.1:8800/feeds/videos.xml?channel_id=UC1'
@@ -0,0 +1,245 @@
+import io
+import threading
+import pytest
+import requests
+from datetime import datetime, timezone
+from unittest.mock import Mock, patch
+from src.youtube_tracker.governor import (
+    CLOSED, ERROR, HALF_OPEN, IGNORED, OK, OPEN, THROTTLED, CircuitOpenError, Governor, TargetLimiter, classify,
+    parse_retry_after, target_for
+)
+from src.youtube_tracker.http_client import HttpClient
+from src.youtube_tracker.web_search import HttpSearchBackend, SearchHit, WebSearcher
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+def make_response(status, url='https://www.youtube.com/channel/UC1/videos', retry_after=None):
+    response = requests.Response()
+    response.status_code = status
+    response.url = url
+    response.raw = io.BytesIO(b'')
+    if retry_after is not None:
+        response.headers['Retry-After'] = retry_after
+    return response
+
+def make_governor(clock, **kwargs):
+    settings = dict(max_limit=4, latency_target=5, max_retries=2, retry_delay=1, max_wait=60,
+                    failure_threshold=3, open_seconds=60)
+    settings.update(kwargs)
+    return Governor(clock=clock, sleep=clock.sleep, **settings)
+
+def test_classify_responses_and_errors():
+    """Test how outcomes and Retry-After are read from responses and exceptions"""
+    now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    assert parse_retry_after('120') == 120
+    assert parse_retry_after('Mon, 01 Jan 2024 00:00:30 GMT', now=now) == 30
+    assert parse_retry_after('soon') is None
+
+    assert classify(make_response(200)) == (OK, None)
+    assert classify(make_response(429, retry_after='7')) == (THROTTLED, 7)
+    assert classify(make_response(302, url='https://www.google.com/sorry/index')) == (THROTTLED, None)
+    assert classify(make_response(502)) == (ERROR, None)
+    assert classify(['parsed', 'results']) == (OK, None)
+    assert classify(error=requests.ConnectionError()) == (ERROR, None)
+    assert classify(error=requests.HTTPError(response=make_response(404))) == (IGNORED, None)
+    assert classify(error=requests.HTTPError(response=make_response(429))) == (THROTTLED, None)
+    assert classify(error=ValueError()) == (IGNORED, None)
+
+def test_target_for(monkeypatch):
+    """Test that YouTube and the stand-in server are governed, other sites are not"""
+    monkeypatch.setenv('YOUTUBE_BASE_URL', 'http://127.0.0.1:8080')
+    assert target_for('https://www.youtube.com/watch?v=1') == 'youtube'
+    assert target_for('http://127.0.0.1:8080/channel/UC1/videos') == 'youtube'
+    assert target_for('https://example.com/page') is None
+
+def test_limit_shrinks_once_per_round_trip_and_grows_additively():
+    """Test AIMD: a quarter less after a throttled round, one more slot per round of successes"""
+    clock = Clock()
+    limiter = TargetLimiter('youtube', 8, latency_target=5, max_wait=60, failure_threshold=10, open_seconds=60,
+                            clock=clock)
+    # A whole window of requests throttled together counts as one signal
+    for _ in range(8):
+        limiter.acquire()
+    for _ in range(8):
+        limiter.release(THROTTLED, 1.0)
+    assert limiter.limit == 6
+
+    for _ in range(6):
+        limiter.acquire()
+        limiter.release(OK, 1.0)
+    assert int(limiter.limit) == 6
+    limiter.acquire()
+    limiter.release(OK, 1.0)
+    assert int(limiter.limit) == 7
+
+    limit = limiter.limit
+    clock.now += 2
+    limiter.acquire()
+    limiter.release(OK, 10.0)  # slower than the latency target
+    assert limiter.limit == pytest.approx(limit * 0.75)
+    assert limiter.failures == 0
+
+def test_call_retries_after_retry_after():
+    """Test that a throttled request is retried once the server's pause is over"""
+    clock = Clock()
+    governor = make_governor(clock)
+    responses = [make_response(429, retry_after='10'), make_response(200)]
+
+    response = governor.call('youtube', lambda: responses.pop(0))
+
+    assert response.status_code == 200
+    assert clock.now >= 10
+    # A quarter less after the 429, then one step up
+    assert governor.target('youtube').limit == 3 + 1 / 3
+
+def test_call_gives_up_after_max_retries():
+    """Test that the last failed response is returned to the caller"""
+    clock = Clock()
+    governor = make_governor(clock, failure_threshold=10)
+    send = Mock(side_effect=lambda: make_response(503))
+
+    assert governor.call('youtube', send).status_code == 503
+    assert send.call_count == 3
+    # Full jitter keeps every delay below its exponential bound
+    assert clock.now <= 1 + 2
+
+    send = Mock(side_effect=requests.ConnectionError('refused'))
+    with pytest.raises(requests.ConnectionError):
+        governor.call('youtube', send)
+    assert send.call_count == 3
+
+def test_client_errors_are_not_retried():
+    """Test that a 404 is returned at once without lowering the limit"""
+    clock = Clock()
+    governor = make_governor(clock)
+    send = Mock(return_value=make_response(404))
+
+    assert governor.call('youtube', send).status_code == 404
+    assert send.call_count == 1
+    assert governor.target('youtube').limit == 4
+
+def test_circuit_opens_fails_fast_and_recovers():
+    """Test open, half-open with a single probe, reopening for longer and closing"""
+    clock = Clock()
+    governor = make_governor(clock, max_retries=0)
+    limiter = governor.target('youtube')
+    throttled = Mock(return_value=make_response(429))
+    for _ in range(3):
+        governor.call('youtube', throttled)
+    assert limiter.state == OPEN
+
+    with pytest.raises(CircuitOpenError):
+        governor.call('youtube', throttled)
+    assert throttled.call_count == 3
+
+    # The failed probe reopens the circuit for twice as long
+    clock.now += 60
+    governor.call('youtube', throttled)
+    assert limiter.state == OPEN and limiter.open_until == 180
+
+    clock.now = 180
+    assert limiter.acquire() is True
+    assert limiter.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        limiter.acquire()
+    limiter.release(OK, 1.0, probe=True)
+    assert limiter.state == CLOSED
+    assert governor.call('youtube', Mock(return_value=make_response(200))).status_code == 200
+
+def test_circuit_opening_before_retry_returns_last_response_unread():
+    """Test that the response kept when the circuit opens before a retry can still be read"""
+    clock = Clock()
+    governor = make_governor(clock, failure_threshold=1)
+    response = make_response(503)
+    response.raw = io.BytesIO(b'Service unavailable')
+    send = Mock(return_value=response)
+
+    assert governor.call('youtube', send) is response
+    assert send.call_count == 1
+    assert response.text == 'Service unavailable'
+
+def test_long_retry_after_opens_circuit():
+    """Test that a pause longer than max_wait fails callers fast instead of holding them"""
+    clock = Clock()
+    governor = make_governor(clock, max_wait=30)
+    send = Mock(return_value=make_response(429, retry_after='3600'))
+
+    assert governor.call('youtube', send).status_code == 429
+    assert send.call_count == 1
+    with pytest.raises(CircuitOpenError):
+        governor.call('youtube', send)
+    clock.now = 3600
+    assert governor.target('youtube').acquire() is True
+
+def test_concurrency_is_capped_per_target():
+    """Test that callers beyond the limit wait while other targets proceed"""
+    governor = Governor(max_limit=1, max_retries=0)
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return make_response(200)
+
+    first = threading.Thread(target=governor.call, args=('youtube', slow))
+    first.start()
+    started.wait(5)
+    second_done = threading.Event()
+    second = threading.Thread(target=lambda: (governor.call('youtube', lambda: make_response(200)), second_done.set()))
+    second.start()
+
+    assert governor.call('search', lambda: ['result']) == ['result']
+    assert not second_done.wait(0.2)
+    release.set()
+    assert second_done.wait(5)
+    first.join()
+    second.join()
+
+def test_http_client_governs_youtube_requests():
+    """Test that only YouTube requests are retried by the client"""
+    governor = make_governor(Clock())
+    client = HttpClient(governor=governor)
+
+    with patch('requests.Session.get', side_effect=[make_response(429), make_response(200)]) as mock_get:
+        assert client.get('https://www.youtube.com/channel/UC1/videos').status_code == 200
+        assert mock_get.call_count == 2
+
+    with patch('requests.Session.get', return_value=make_response(429, url='https://example.com')) as mock_get:
+        assert client.get('https://example.com').status_code == 429
+        assert mock_get.call_count == 1
+
+def test_search_backend_is_governed():
+    """Test that a throttled search is retried instead of returning no results"""
+    throttled = requests.HTTPError(response=make_response(429, url='https://www.google.com/search'))
+    backend = Mock(side_effect=[throttled, [SearchHit('https://example.com', 'Title', 'Snippet')]])
+    searcher = WebSearcher(http_client=Mock(), cache=False, page_cache=False, backend=backend,
+                           governor=make_governor(Clock()))
+
+    with patch.object(searcher, 'get_page_context', return_value='context'):
+        results = searcher.search('query')
+
+    assert [result['title'] for result in results] == ['Title']
+    assert backend.call_count == 2
+
+def test_search_backend_on_youtube_host_is_governed_once(monkeypatch):
+    """Test that a backend request is retried as a search, not again by its host"""
+    monkeypatch.setenv('YOUTUBE_BASE_URL', 'http://127.0.0.1:8080')
+    governor = make_governor(Clock(), failure_threshold=10)
+    backend = HttpSearchBackend('http://127.0.0.1:8080', HttpClient(governor=governor))
+    searcher = WebSearcher(http_client=Mock(), cache=False, page_cache=False, backend=backend, governor=governor)
+    throttled = make_response(429, url='http://127.0.0.1:8080/search')
+
+    with patch('requests.Session.get', return_value=throttled) as mock_get:
+        assert searcher.search('query') == []
+
+    assert mock_get.call_count == 3
+    assert governor.target('youtube').limit == 4
@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import subprocess
+import pytest
+from datetime import datetime, timedelta
+from pathlib import Path
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from src.youtube_tracker.history import HistoryPruner, InvalidCursor, iter_history, list_history, prune_history
+from src.youtube_tracker.migrations import migrate
+from src.youtube_tracker.models import ProcessedVideo, VideoWebResult, WebResult
+from src.youtube_tracker.persistence import load_web_search_results, save_cycle_results, store_web_search_results
+
+ROOT = Path(__file__).parent.parent
+START = datetime(2024, 1, 1)
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'history.db'}")
+    migrate(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+def add_history(db, count, channels=('UC1', 'UC2'), start=START, step=timedelta(hours=1)):
+    """Insert count history rows, one per step, cycling through the channels"""
+    rows = [
+        {
+            'channel_id': channels[index % len(channels)],
+            'video_id': f'v{index}',
+            'title': f'Video {index}',
+            'url': f'https://www.youtube.com/watch?v=v{index}',
+            'thumbnail': f'https://i.ytimg.com/vi/v{index}/hqdefault.jpg',
+            'description': 'Description',
+            # Pairs of rows share a timestamp to exercise the id tie-break
+            'processed_at': start + step * (index // 2),
+            'action': 'replaced',
+        }
+        for index in range(count)
+    ]
+    db.execute(insert(ProcessedVideo), rows)
+    db.commit()
+
+def test_pages_cover_history_once_newest_first(db):
+    """Test that following cursors returns every row once, in order"""
+    add_history(db, 25)
+
+    seen = []
+    cursor = None
+    while True:
+        items, cursor = list_history(db, limit=10, cursor=cursor)
+        seen.extend(items)
+        if not cursor:
+            break
+
+    assert len(seen) == 25
+    keys = [(item['processed_at'], item['id']) for item in seen]
+    assert keys == sorted(keys, reverse=True)
+    assert len({item['id'] for item in seen}) == 25
+
+def test_channel_and_time_filters(db):
+    """Test per-channel and time-range history"""
+    add_history(db, 20)
+
+    items = list(iter_history(db, channel_id='UC1', since=START + timedelta(hours=2),
+                              until=START + timedelta(hours=6), limit=2))
+
+    assert [item['video_id'] for item in items] == ['v10', 'v8', 'v6', 'v4']
+
+def test_results_are_included_on_request(db):
+    """Test that a page can carry each video's search results"""
+    add_history(db, 2)
+    result = {'url': 'https://example.com', 'title': 'Example', 'snippet': 'Snippet', 'context': 'Context'}
+    store_web_search_results(db, {'v1': [result]})
+    db.commit()
+
+    items, _ = list_history(db, include_results=True)
+
+    assert {item['video_id']: item['web_search_results'] for item in items} == {'v1': [result], 'v0': []}
+
+def test_invalid_cursor():
+    """Test that a malformed cursor is rejected"""
+    with pytest.raises(InvalidCursor):
+        list_history(None, cursor='not-a-cursor')
+
+@pytest.mark.parametrize('filters,index', [
+    ({'channel_id': 'UC1'}, 'ix_processed_videos_channel_time'),
+    ({}, 'ix_processed_videos_time'),
+])
+def test_pages_use_an_index(engine, db, filters, index):
+    """Test that a deep page is an index range scan rather than a table scan and sort"""
+    add_history(db, 50)
+    _, cursor = list_history(db, limit=10, **filters)
+    statements = []
+    capture = lambda conn, cur, statement, parameters, context, many: statements.append((statement, parameters))
+    event.listen(engine, 'before_cursor_execute', capture)
+    list_history(db, limit=10, cursor=cursor, **filters)
+    event.remove(engine, 'before_cursor_execute', capture)
+
+    statement, parameters = statements[-1]
+    with engine.connect() as connection:
+        plan = ' '.join(row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters))
+    assert f'SEARCH processed_videos USING INDEX {index}' in plan
+    assert 'TEMP B-TREE' not in plan
+
+def test_prune_deletes_old_rows_and_unused_results(db):
+    """Test retention along with the results only old videos used"""
+    old = {'url': 'https://example.com/old', 'title': 'Old', 'snippet': 'S', 'context': 'C'}
+    shared = {'url': 'https://example.com/shared', 'title': 'Shared', 'snippet': 'S', 'context': 'C'}
+    add_history(db, 6, channels=('UC1',), step=timedelta(days=1))
+    save_cycle_results(db, [{'channel_id': 'UC1', 'video_id': 'v0', 'title': 'Video 0', 'url': 'u', 'thumbnail': 't',
+                             'web_search_results': [shared]}])
+    store_web_search_results(db, {'v1': [old, shared], 'v5': [shared]})
+    db.commit()
+
+    deleted = prune_history(db, START + timedelta(days=2), batch_size=1)
+
+    assert deleted == 4
+    assert sorted(row.video_id for row in db.query(ProcessedVideo)) == ['v4', 'v5']
+    # v0 is still the latest video, v1 is gone along with the result only it used
+    assert set(load_web_search_results(db, ['v0', 'v1', 'v5'])) == {'v0', 'v5'}
+    assert sorted(row.url for row in db.query(WebResult)) == ['https://example.com/shared']
+    assert db.query(VideoWebResult).count() == 2
+
+def test_pruner_runs_at_most_once_per_interval(engine):
+    """Test the retention schedule of the tracker"""
+    now = [(START + timedelta(days=6) - datetime(1970, 1, 1)).total_seconds()]
+    session_factory = sessionmaker(bind=engine)
+    db = session_factory()
+    add_history(db, 10, step=timedelta(days=1))
+    db.close()
+
+    pruner = HistoryPruner(session_factory, retention_days=3, interval=60, clock=lambda: now[0])
+    # Rows two per day over five days; the cutoff is day three
+    assert pruner.prune_if_due() == 6
+    assert pruner.prune_if_due() is None
+    now[0] += 60
+    # The cutoff has moved just past the rows of day three
+    assert pruner.prune_if_due() == 2
+    assert HistoryPruner(session_factory, retention_days=0).prune_if_due() is None
+
+def test_history_command(db, tmp_path):
+    """Test paging through history with the command line"""
+    add_history(db, 5)
+    env = dict(os.environ, PYTHONPATH=str(ROOT / 'src'), DATABASE_URL=f"sqlite:///{tmp_path / 'history.db'}")
+    command = [sys.executable, '-m', 'youtube_tracker', 'history', '--channel', 'UC1', '--limit', '2', '--format', 'jsonl']
+
+    first = subprocess.run(command, cwd=tmp_path, env=env, capture_output=True, text=True, check=True, timeout=60)
+    cursor = first.stderr.strip().rsplit(' ', 1)[-1]
+    second = subprocess.run(command + ['--cursor', cursor], cwd=tmp_path, env=env, capture_output=True, text=True,
+                            check=True, timeout=60)
+
+    pages = [[json.loads(line)['video_id'] for line in run.stdout.splitlines()] for run in (first, second)]
+    assert pages == [['v4', 'v2'], ['v0']]
+    assert second.stderr == ''
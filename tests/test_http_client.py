@@ -0,0 +1,41 @@
+from unittest.mock import Mock, patch
+from src.youtube_tracker.http_client import HttpClient, get_http_client
+
+def test_client_configures_pool_and_timeouts():
+    """Test that pool sizes and timeouts are applied"""
+    client = HttpClient(pool_connections=3, pool_maxsize=7, timeout=12, connect_timeout=2)
+
+    adapter = client.session.get_adapter('https://www.youtube.com/')
+    assert adapter._pool_connections == 3
+    assert adapter._pool_maxsize == 7
+
+    with patch('requests.Session.get') as mock_get:
+        mock_get.return_value = Mock()
+        client.get('https://example.com')
+        assert mock_get.call_args.kwargs['timeout'] == (2, 12)
+
+def test_client_reads_settings_from_env(monkeypatch):
+    """Test that defaults come from the environment"""
+    monkeypatch.setenv('HTTP_POOL_MAXSIZE', '32')
+    monkeypatch.setenv('HTTP_TIMEOUT', '3.5')
+
+    client = HttpClient()
+    assert client.pool_maxsize == 32
+    assert client.timeout == 3.5
+
+def test_client_negotiates_compression():
+    """Test that compressed responses are requested"""
+    client = HttpClient()
+    assert 'gzip' in client.session.headers['Accept-Encoding']
+    assert 'Mozilla' in client.session.headers['User-Agent']
+
+def test_explicit_timeout_is_kept():
+    """Test that a per-call timeout overrides the default"""
+    client = HttpClient()
+    with patch('requests.Session.get') as mock_get:
+        client.get('https://example.com', timeout=1)
+        assert mock_get.call_args.kwargs['timeout'] == 1
+
+def test_shared_client_is_reused():
+    """Test that the shared client is created once"""
+    assert get_http_client() is get_http_client()
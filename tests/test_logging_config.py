@@ -0,0 +1,59 @@
+import json
+import logging
+import threading
+import pytest
+from src.youtube_tracker.logging_config import setup_logging, shutdown_logging
+
+@pytest.fixture
+def log_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('LOG_LEVEL', 'INFO')
+    shutdown_logging()
+    yield tmp_path
+    shutdown_logging()
+
+def read_log(log_dir):
+    return (log_dir / 'youtube_tracker.log').read_text(encoding='utf-8').splitlines()
+
+def test_json_lines(log_dir, monkeypatch):
+    """Test JSON output with extra fields and exceptions"""
+    monkeypatch.setenv('LOG_OUTPUT', 'json')
+    setup_logging(str(log_dir))
+    logger = logging.getLogger('src.youtube_tracker.test')
+
+    logger.info("Checked %d channels", 3, extra={'event': 'cycle_summary', 'channels': 3})
+    logger.debug("Below the level %s", 'dropped')
+    try:
+        raise RuntimeError('boom')
+    except RuntimeError:
+        logger.exception("Cycle failed")
+    shutdown_logging()
+
+    first, second = [json.loads(line) for line in read_log(log_dir)]
+    assert (first['level'], first['message'], first['event'], first['channels']) == ('INFO', 'Checked 3 channels',
+                                                                                    'cycle_summary', 3)
+    assert first['logger'] == 'src.youtube_tracker.test'
+    assert second['message'] == 'Cycle failed'
+    assert 'RuntimeError: boom' in second['exception']
+
+def test_records_are_written_by_the_listener(log_dir, monkeypatch):
+    """Test that handlers run on the listener thread with the arguments as they were when logged"""
+    written_by = []
+    emit = logging.FileHandler.emit
+
+    def recording_emit(handler, record):
+        # pytest has a FileHandler of its own
+        if handler.baseFilename.startswith(str(log_dir)):
+            written_by.append(threading.current_thread())
+        emit(handler, record)
+
+    monkeypatch.setattr(logging.FileHandler, 'emit', recording_emit)
+    setup_logging(str(log_dir))
+    channels = ['UC1']
+
+    logging.getLogger('src.youtube_tracker.test').info("Checking %s", channels)
+    channels.append('UC2')
+    shutdown_logging()
+
+    assert written_by and threading.current_thread() not in written_by
+    line, = read_log(log_dir)
+    assert line.endswith(" - INFO - Checking ['UC1']")
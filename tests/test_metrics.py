@@ -0,0 +1,67 @@
+import pytest
+import requests
+from src.youtube_tracker.metrics import Counter, Gauge, Histogram, Registry, stage_timer, start_metrics_server, STAGE_ERRORS, STAGE_SECONDS
+
+@pytest.fixture
+def registry():
+    return Registry()
+
+def test_counter_and_gauge_rendering(registry):
+    """Test the text exposition of counters and gauges"""
+    counter = Counter('requests_total', 'Requests', ['route'], registry=registry)
+    gauge = Gauge('last_run_seconds', 'Last run', registry=registry)
+    counter.inc(route='feed')
+    counter.inc(2, route='say "hi"\n')
+    gauge.set(12.5)
+
+    lines = registry.render().splitlines()
+
+    assert lines[:2] == ['# HELP requests_total Requests', '# TYPE requests_total counter']
+    assert 'requests_total{route="feed"} 1' in lines
+    assert 'requests_total{route="say \\"hi\\"\\n"} 2' in lines
+    assert 'last_run_seconds 12.5' in lines
+
+def test_histogram_buckets_are_cumulative(registry):
+    """Test histogram bucket, sum and count lines"""
+    histogram = Histogram('stage_seconds', 'Stages', ['stage'], buckets=(0.1, 1), registry=registry)
+    for value in (0.05, 0.5, 0.7, 3):
+        histogram.observe(value, stage='fetch')
+
+    lines = registry.render().splitlines()
+
+    assert 'stage_seconds_bucket{stage="fetch",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="fetch",le="1.0"} 3' in lines
+    assert 'stage_seconds_bucket{stage="fetch",le="+Inf"} 4' in lines
+    assert 'stage_seconds_sum{stage="fetch"} 4.25' in lines
+    assert 'stage_seconds_count{stage="fetch"} 4' in lines
+
+def test_labels_must_match(registry):
+    """Test that wrong label names are rejected"""
+    counter = Counter('requests_total', 'Requests', ['route'], registry=registry)
+    with pytest.raises(ValueError):
+        counter.inc(stage='feed')
+
+def test_stage_timer_counts_errors():
+    """Test that a failing stage is timed and counted as an error"""
+    before = STAGE_SECONDS.count(stage='test_failing')
+    with pytest.raises(RuntimeError):
+        with stage_timer('test_failing'):
+            raise RuntimeError('boom')
+
+    assert STAGE_SECONDS.count(stage='test_failing') == before + 1
+    assert STAGE_ERRORS.value(stage='test_failing') >= 1
+
+def test_metrics_endpoint(registry):
+    """Test serving the registry over HTTP"""
+    Counter('served_total', 'Served', registry=registry).inc()
+    server = start_metrics_server(port=0, registry=registry)
+    try:
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        response = requests.get(f"{base_url}/metrics", timeout=5)
+        assert response.status_code == 200
+        assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+        assert 'served_total 1' in response.text
+        assert requests.get(f"{base_url}/other", timeout=5).status_code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,89 @@
+import pytest
+from pathlib import Path
+from unittest.mock import Mock
+from src.youtube_tracker.page_text import extract_visible_text, is_allowed_content_type, parse_content_type, sniff_encoding
+from src.youtube_tracker.web_search import WebSearcher
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+def chunked(body, size):
+    return [body[start:start + size] for start in range(0, len(body), size)]
+
+@pytest.mark.parametrize('path', sorted(FIXTURES.rglob('*.html')), ids=lambda path: path.name)
+@pytest.mark.parametrize('chunk_size', [7, 16384])
+def test_matches_beautifulsoup_extraction(path, chunk_size):
+    """Test that streaming gives the same context as the full parse"""
+    body = path.read_bytes()
+    text, _ = extract_visible_text(chunked(body, chunk_size))
+    assert text == WebSearcher.extract_context(body.decode('utf-8'))
+
+def test_stops_reading_once_budget_is_met():
+    """Test that the rest of a large page is not read"""
+    body = (FIXTURES / 'pages' / 'encyclopedia.html').read_bytes()
+    chunks = chunked(body, 4096)
+    consumed = []
+
+    def reader():
+        for chunk in chunks:
+            consumed.append(chunk)
+            yield chunk
+
+    text, reason = extract_visible_text(reader(), max_chars=200)
+
+    assert reason == 'budget'
+    assert len(text) == 200
+    assert len(consumed) < len(chunks) / 4
+
+def test_byte_cap():
+    """Test that reading stops at the byte cap"""
+    body = b'<html><body>' + b'<p>word</p>' * 1000 + b'</body></html>'
+    text, reason = extract_visible_text(chunked(body, 100), max_chars=10000, max_bytes=250)
+
+    assert reason == 'byte_cap'
+    assert text.split() == ['word'] * text.count('word')
+    assert 0 < text.count('word') < 25
+
+def test_script_and_style_are_skipped():
+    """Test skipping of script and style content across chunk boundaries"""
+    body = b'<p>Before</p><script>var x = "<p>not text</p>";</script><style>p { x: y }</style><p>After &amp; more</p>'
+    text, reason = extract_visible_text(chunked(body, 3))
+
+    assert text == 'Before After & more'
+    assert reason == 'complete'
+
+def test_charset_detection():
+    """Test decoding with the header charset, a meta tag and a BOM"""
+    latin = '<p>Café</p>'.encode('latin-1')
+    assert extract_visible_text([latin], charset='iso-8859-1')[0] == 'Café'
+    assert extract_visible_text([b'<meta charset="windows-1252">' + latin])[0] == 'Café'
+    assert extract_visible_text([b'\xef\xbb\xbf<p>Caf\xc3\xa9</p>'])[0] == 'Café'
+    assert sniff_encoding(b'<p>', 'no-such-charset') == 'utf-8'
+
+def test_content_type_filter():
+    """Test media type parsing and filtering"""
+    assert parse_content_type('Text/HTML; charset="UTF-8"') == ('text/html', 'UTF-8')
+    assert is_allowed_content_type('text/html; charset=utf-8')
+    assert is_allowed_content_type(None)
+    assert not is_allowed_content_type('application/pdf')
+
+def test_searcher_skips_disallowed_content_without_reading():
+    """Test that a PDF result is neither read nor parsed"""
+    response = Mock(status_code=200, headers={'Content-Type': 'application/pdf'})
+    http_client = Mock()
+    http_client.get.return_value = response
+    searcher = WebSearcher(http_client=http_client, cache=False, page_cache=False, rate_limiter=Mock())
+
+    assert searcher.get_page_context('https://example.com/file.pdf') == ''
+    assert http_client.get.call_args.kwargs['stream'] is True
+    response.iter_content.assert_not_called()
+    response.close.assert_called_once()
+
+def test_full_mode_parses_whole_page():
+    """Test the BeautifulSoup mode kept for comparison"""
+    http_client = Mock()
+    http_client.get.return_value = Mock(status_code=200, text='<p>Full</p><script>x</script>', headers={})
+    searcher = WebSearcher(http_client=http_client, cache=False, page_cache=False, rate_limiter=Mock(),
+                           page_context_mode='full')
+
+    assert searcher.get_page_context('https://example.com') == 'Full'
+    assert http_client.get.call_args.kwargs['stream'] is False
@@ -0,0 +1,118 @@
+import os
+import pytest
+import multiprocessing
+from pathlib import Path
+from unittest.mock import Mock
+from src.youtube_tracker import tracker, web_search
+from src.youtube_tracker.extractor import extract_channel_videos
+from src.youtube_tracker.parse_pool import ParsePool, get_parse_workers
+from src.youtube_tracker.web_search import WebSearcher
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+@pytest.fixture(scope='module')
+def pool():
+    # Spawning workers takes a while, so the tests share them
+    pool = ParsePool(workers=2)
+    yield pool
+    pool.close()
+
+def crash_in_worker(value):
+    if multiprocessing.parent_process() is not None:
+        os._exit(1)
+    return value
+
+def streamed(body, headers=None):
+    chunks = [body[start:start + 4096] for start in range(0, len(body), 4096)]
+    response = Mock(status_code=200, headers=headers or {'Content-Type': 'text/html'})
+    response.iter_content.return_value = iter(chunks)
+    return response
+
+def test_worker_count(monkeypatch):
+    """Test reading PARSE_WORKERS"""
+    monkeypatch.setenv('PARSE_WORKERS', '3')
+    assert get_parse_workers() == 3
+    monkeypatch.setenv('PARSE_WORKERS', '-1')
+    assert get_parse_workers() == (os.cpu_count() or 1)
+    monkeypatch.setenv('PARSE_WORKERS', 'many')
+    assert get_parse_workers() == 0
+
+def test_new_videos_match_inline_parsing(pool, monkeypatch):
+    """Test that channel and watch pages parsed in workers give the same videos"""
+    monkeypatch.setenv('ENRICHMENT_MODE', 'queue')
+    pages = {
+        'https://www.youtube.com/channel/UC1/videos': (FIXTURES / 'youtube' / 'channel_videos.html').read_bytes(),
+    }
+    for video in extract_channel_videos(pages['https://www.youtube.com/channel/UC1/videos'])[:3]:
+        pages[video.url] = (FIXTURES / 'youtube' / 'watch.html').read_bytes()
+    http_client = Mock()
+    http_client.get.side_effect = lambda url, **kwargs: Mock(content=pages[url])
+
+    inline = tracker.get_new_videos('UC1', http_client=http_client, limit=3, parse_pool=ParsePool(workers=0))
+    pooled = tracker.get_new_videos('UC1', http_client=http_client, limit=3, parse_pool=pool)
+
+    assert pooled == inline
+    assert len(pooled) == 1
+
+@pytest.mark.parametrize('path', sorted((FIXTURES / 'pages').glob('*.html')), ids=lambda path: path.name)
+@pytest.mark.parametrize('window', [1024, 65536])
+def test_page_context_matches_inline_parsing(pool, path, window, monkeypatch):
+    """Test that result pages parsed in workers, in growing windows, give the same context"""
+    monkeypatch.setattr(web_search, 'PARSE_WINDOW_BYTES', window)
+    body = path.read_bytes()
+    inline = WebSearcher(http_client=Mock(), cache=False, page_cache=False, rate_limiter=Mock(),
+                         parse_pool=ParsePool(workers=0))
+    pooled = WebSearcher(http_client=Mock(), cache=False, page_cache=False, rate_limiter=Mock(), parse_pool=pool)
+
+    assert pooled.read_context(streamed(body), 'https://example.com') == \
+        inline.read_context(streamed(body), 'https://example.com')
+
+def test_windows_stop_reading_once_budget_is_met(pool, monkeypatch):
+    """Test that a large page is only read as far as the window that met the budget"""
+    monkeypatch.setattr(web_search, 'PARSE_WINDOW_BYTES', 4096)
+    body = (FIXTURES / 'pages' / 'encyclopedia.html').read_bytes()
+    chunks = [body[start:start + 1024] for start in range(0, len(body), 1024)]
+    consumed = []
+
+    def reader():
+        for chunk in chunks:
+            consumed.append(chunk)
+            yield chunk
+
+    searcher = WebSearcher(http_client=Mock(), cache=False, page_cache=False, rate_limiter=Mock(), parse_pool=pool)
+    context, reason = searcher._read_context_in_pool(reader(), None)
+
+    assert reason == 'budget'
+    assert len(context) == 1000
+    # Windows of 4, 16 and 64 KB
+    assert len(consumed) == 64 < len(chunks) / 3
+
+def test_byte_cap(pool):
+    """Test that reading stops at the byte cap"""
+    body = b'<html><body>' + b'<p>word</p>' * 1000 + b'</body></html>'
+    searcher = WebSearcher(http_client=Mock(), cache=False, page_cache=False, rate_limiter=Mock(), parse_pool=pool,
+                           max_page_bytes=250)
+
+    context, reason = searcher._read_context_in_pool([body[:100], body[100:200], body[200:300], body[300:]], None)
+
+    assert reason == 'byte_cap'
+    assert 0 < context.count('word') < 25
+
+def test_full_mode_in_workers(pool):
+    """Test BeautifulSoup parsing of whole pages in workers"""
+    http_client = Mock()
+    http_client.get.return_value = Mock(status_code=200, content='<p>Café</p><script>x</script>'.encode('latin-1'),
+                                        encoding='iso-8859-1', headers={})
+    searcher = WebSearcher(http_client=http_client, cache=False, page_cache=False, rate_limiter=Mock(),
+                           page_context_mode='full', parse_pool=pool)
+
+    assert searcher.get_page_context('https://example.com') == 'Café'
+
+def test_dead_worker_is_replaced():
+    """Test that a call whose worker died is parsed inline and the pool replaced"""
+    pool = ParsePool(workers=1)
+    try:
+        assert pool.run(crash_in_worker, 'parsed') == 'parsed'
+        assert pool.run(len, b'abc') == 3
+    finally:
+        pool.close()
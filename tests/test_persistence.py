@@ -0,0 +1,133 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from src.youtube_tracker.models import Base, LatestVideo, ProcessedVideo, VideoWebResult, WebResult
+from src.youtube_tracker.persistence import load_latest_videos, load_web_search_results, save_cycle_results
+
+@pytest.fixture
+def engine():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+RESULT = {'url': 'https://example.com', 'title': 'Example', 'snippet': 'Snippet', 'context': 'C'}
+
+def make_video(channel_id, video_id, title=None):
+    return {
+        'channel_id': channel_id,
+        'video_id': video_id,
+        'title': title or f'Video {video_id}',
+        'url': f'https://www.youtube.com/watch?v={video_id}',
+        'thumbnail': f'https://i.ytimg.com/vi/{video_id}/hqdefault.jpg',
+        'description': 'Description',
+        'web_search_results': [RESULT],
+    }
+
+def count_statements(engine):
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    return statements
+
+def test_first_cycle_inserts_all_channels(db):
+    """Test that new channels are inserted with one upsert"""
+    changes = save_cycle_results(db, [make_video(f'UC{i}', f'v{i}') for i in range(5)])
+    db.commit()
+
+    assert len(changes['added']) == 5
+    assert changes['replaced'] == []
+    assert db.query(LatestVideo).count() == 5
+    assert db.query(ProcessedVideo).count() == 0
+
+def test_replaced_videos_move_to_history(db):
+    """Test that changed channels are upserted and their old video archived"""
+    save_cycle_results(db, [make_video('UC1', 'old1'), make_video('UC2', 'same')])
+    db.commit()
+
+    changes = save_cycle_results(db, [make_video('UC1', 'new1', 'New title'), make_video('UC2', 'same')])
+    db.commit()
+
+    assert [video['video_id'] for video in changes['replaced']] == ['new1']
+    latest = db.query(LatestVideo).filter_by(channel_id='UC1').one()
+    assert latest.video_id == 'new1'
+    assert latest.title == 'New title'
+
+    history = db.query(ProcessedVideo).all()
+    assert len(history) == 1
+    assert history[0].video_id == 'old1'
+    assert history[0].action == 'replaced'
+    assert load_web_search_results(db, ['old1', 'new1']) == {'old1': [RESULT], 'new1': [RESULT]}
+
+def test_statement_count_is_independent_of_channel_count(engine, db):
+    """Test that a cycle uses a fixed number of statements per batch"""
+    save_cycle_results(db, [make_video(f'UC{i}', f'old{i}') for i in range(40)])
+    db.commit()
+
+    statements = count_statements(engine)
+    save_cycle_results(db, [make_video(f'UC{i}', f'new{i}') for i in range(40)], batch_size=100)
+    db.commit()
+
+    # One select, one bulk history insert, one upsert, then the result
+    # links are replaced and the results inserted
+    data_statements = [s for s in statements if not s.startswith(('BEGIN', 'COMMIT'))]
+    assert len(data_statements) == 6
+    assert db.query(ProcessedVideo).count() == 40
+
+def test_batches_split_large_cycles(db):
+    """Test that small batch sizes still write every row"""
+    changes = save_cycle_results(db, [make_video(f'UC{i}', f'v{i}') for i in range(7)], batch_size=3)
+    db.commit()
+
+    assert len(changes['added']) == 7
+    assert len(load_latest_videos(db, [f'UC{i}' for i in range(7)], batch_size=2)) == 7
+
+def test_duplicate_channel_in_cycle_keeps_last(db):
+    """Test that a channel reported twice is written once"""
+    save_cycle_results(db, [make_video('UC1', 'a'), make_video('UC1', 'b')])
+    db.commit()
+
+    assert db.query(LatestVideo).one().video_id == 'b'
+
+def test_several_uploads_are_recorded_in_order(db):
+    """Test that a channel's uploads of one cycle are chained through the history"""
+    save_cycle_results(db, [make_video('UC1', 'a')])
+    db.commit()
+
+    changes = save_cycle_results(db, [make_video('UC1', 'a'), make_video('UC1', 'b'), make_video('UC1', 'c')])
+    db.commit()
+
+    assert [video['video_id'] for video in changes['replaced']] == ['b', 'c']
+    assert db.query(LatestVideo).filter_by(channel_id='UC1').one().video_id == 'c'
+    assert [row.video_id for row in db.query(ProcessedVideo).order_by(ProcessedVideo.id)] == ['a', 'b']
+
+def test_uploads_already_in_history_are_skipped(db):
+    """Test that re-listed uploads are not recorded twice when the stored video disappeared"""
+    save_cycle_results(db, [make_video('UC1', 'a')])
+    db.commit()
+    save_cycle_results(db, [make_video('UC1', 'b')])
+    db.commit()
+
+    # 'b' was deleted from the channel, so the page lists 'a' and a new 'c'
+    changes = save_cycle_results(db, [make_video('UC1', 'a'), make_video('UC1', 'c')])
+    db.commit()
+
+    assert [video['video_id'] for video in changes['replaced']] == ['c']
+    assert db.query(LatestVideo).filter_by(channel_id='UC1').one().video_id == 'c'
+    assert [row.video_id for row in db.query(ProcessedVideo).order_by(ProcessedVideo.id)] == ['a', 'b']
+
+def test_identical_results_are_stored_once(db):
+    """Test that results shared by videos are stored once and linked to each"""
+    save_cycle_results(db, [make_video(f'UC{i}', f'v{i}') for i in range(5)])
+    db.commit()
+    save_cycle_results(db, [make_video(f'UC{i}', f'w{i}') for i in range(5)])
+    db.commit()
+
+    assert db.query(WebResult).count() == 1
+    assert db.query(VideoWebResult).count() == 10
+    assert db.query(ProcessedVideo).filter(ProcessedVideo.web_search_results.is_not(None)).count() == 0
+    assert load_web_search_results(db, ['v0', 'w4']) == {'v0': [RESULT], 'w4': [RESULT]}
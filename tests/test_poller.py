@@ -0,0 +1,59 @@
+import threading
+import time
+from src.youtube_tracker.poller import ChannelPoller, get_max_workers
+
+def test_poll_returns_result_for_every_channel():
+    """Test that every channel is polled exactly once"""
+    poller = ChannelPoller(lambda channel_id: {'channel_id': channel_id}, max_workers=4)
+
+    results = dict(poller.poll(['UC1', ' UC2 ', '', 'UC3', 'UC1']))
+
+    assert set(results) == {'UC1', 'UC2', 'UC3'}
+    assert results['UC2'] == {'channel_id': 'UC2'}
+
+def test_poll_isolates_failures():
+    """Test that one failing channel does not stop the others"""
+    def fetch(channel_id):
+        if channel_id == 'bad':
+            raise RuntimeError("boom")
+        return channel_id
+
+    poller = ChannelPoller(fetch, max_workers=2)
+    results = dict(poller.poll(['good1', 'bad', 'good2']))
+
+    assert results == {'good1': 'good1', 'bad': None, 'good2': 'good2'}
+
+def test_poll_respects_concurrency_limit():
+    """Test that no more than max_workers channels are fetched at once"""
+    lock = threading.Lock()
+    state = {'active': 0, 'peak': 0}
+
+    def fetch(channel_id):
+        with lock:
+            state['active'] += 1
+            state['peak'] = max(state['peak'], state['active'])
+        time.sleep(0.05)
+        with lock:
+            state['active'] -= 1
+        return channel_id
+
+    poller = ChannelPoller(fetch, max_workers=3)
+    start = time.monotonic()
+    results = list(poller.poll([f'UC{i}' for i in range(9)]))
+    elapsed = time.monotonic() - start
+
+    assert len(results) == 9
+    assert state['peak'] == 3
+    # Nine channels at three at a time take about three fetch durations, not nine
+    assert elapsed < 0.05 * 9
+
+def test_get_max_workers_from_env(monkeypatch):
+    """Test reading the concurrency limit from the environment"""
+    monkeypatch.setenv('MAX_CONCURRENT_CHANNELS', '16')
+    assert get_max_workers() == 16
+
+    monkeypatch.setenv('MAX_CONCURRENT_CHANNELS', 'not-a-number')
+    assert get_max_workers() == 8
+
+    monkeypatch.setenv('MAX_CONCURRENT_CHANNELS', '0')
+    assert get_max_workers() == 1
@@ -0,0 +1,49 @@
+import pstats
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from src.youtube_tracker.profiling import CycleProfiler
+
+def busy_worker(count):
+    return sum(index * index for index in range(count))
+
+def test_no_capture_unless_requested(tmp_path):
+    """Test that cycles are not profiled by default"""
+    profiler = CycleProfiler(output_dir=str(tmp_path))
+    with profiler.cycle() as written:
+        assert not profiler.active
+
+    assert written == []
+    assert list(tmp_path.iterdir()) == []
+
+def test_capture_includes_worker_threads(tmp_path):
+    """Test that a requested capture merges worker thread profiles"""
+    profiler = CycleProfiler(output_dir=str(tmp_path), modes={'cpu'})
+    profiler.request(1)
+
+    with profiler.cycle() as written:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(profiler.profiled(busy_worker), [10000, 20000]))
+
+    assert len(written) == 1 and written[0].endswith('.prof')
+    functions = {name for _, _, name in pstats.Stats(written[0]).stats}
+    assert 'busy_worker' in functions
+
+    # Only the requested number of cycles is captured
+    with profiler.cycle() as written:
+        pass
+    assert written == []
+
+def test_memory_capture(tmp_path):
+    """Test the tracemalloc snapshot and its summary"""
+    profiler = CycleProfiler(output_dir=str(tmp_path), modes={'memory'})
+    profiler.request(1)
+
+    with profiler.cycle(label='memory') as written:
+        blocks = [bytearray(1024) for _ in range(100)]
+
+    assert sorted(Path(path).suffix for path in written) == ['.tracemalloc', '.txt']
+    assert tracemalloc.Snapshot.load(next(path for path in written if path.endswith('.tracemalloc')))
+    assert 'test_profiling.py' in Path(next(path for path in written if path.endswith('.txt'))).read_text()
+    assert not tracemalloc.is_tracing()
+    assert len(blocks) == 100
@@ -0,0 +1,104 @@
+import time
+import pytest
+from unittest.mock import Mock, patch
+from src.youtube_tracker.rate_limit import HostRateLimiter, TokenBucket
+from src.youtube_tracker.web_search import WebSearcher
+
+def test_token_bucket_allows_burst_then_waits():
+    """Test that a bucket serves its burst immediately and then paces callers"""
+    bucket = TokenBucket(rate=10, capacity=2)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.02)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.02)
+
+def test_host_limiter_is_per_host():
+    """Test that hosts are limited independently"""
+    limiter = HostRateLimiter(rate=1, burst=1)
+
+    assert limiter.acquire('https://www.example.com/a') == 0
+    assert limiter.acquire('https://other.org/b') == 0
+    # Same host as the first request, www. prefix ignored
+    assert limiter._bucket('example.com').reserve() > 0.9
+
+def test_host_limiter_reads_env(monkeypatch):
+    """Test limiter settings from the environment"""
+    monkeypatch.setenv('HOST_RATE_LIMIT', '4')
+    monkeypatch.setenv('HOST_RATE_BURST', '3')
+
+    limiter = HostRateLimiter()
+    assert limiter.rate == 4
+    assert limiter.burst == 3
+
+def test_search_fetches_result_pages_in_parallel():
+    """Test that results on different hosts are fetched concurrently and keep their order"""
+    hits = [Mock(url=f'https://site{i}.example/page', title=f'Title {i}', description=f'Snippet {i}') for i in range(5)]
+
+    def slow_context(url):
+        time.sleep(0.1)
+        return f'context for {url}'
+
+    searcher = WebSearcher(http_client=Mock(), cache=False, page_cache=False, fetch_concurrency=5)
+    with patch('src.youtube_tracker.web_search.search', return_value=iter(hits)), \
+            patch.object(searcher, 'get_page_context', side_effect=slow_context):
+        start = time.monotonic()
+        results = searcher.search('test query')
+        elapsed = time.monotonic() - start
+
+    assert [result['title'] for result in results] == [f'Title {i}' for i in range(5)]
+    assert results[3]['context'] == 'context for https://site3.example/page'
+    assert elapsed < 0.3
+
+def test_page_fetch_waits_for_host_limiter():
+    """Test that get_page_context acquires the host's token before fetching"""
+    limiter = Mock()
+    http_client = Mock()
+    http_client.get.return_value = Mock(status_code=200, headers={})
+    http_client.get.return_value.iter_content.return_value = [b'<p>Body</p>']
+    searcher = WebSearcher(http_client=http_client, cache=False, page_cache=False, rate_limiter=limiter)
+
+    assert searcher.get_page_context('https://example.com') == 'Body'
+    limiter.acquire.assert_called_once_with('https://example.com')
+
+def test_wait_over_max_wait_takes_no_token():
+    """Test that a refused request leaves the bucket as it was"""
+    bucket = TokenBucket(rate=1, capacity=1)
+
+    assert bucket.acquire(max_wait=0.5) == 0
+    assert bucket.acquire(max_wait=0.5) is None
+    assert bucket.reserve() == pytest.approx(1, abs=0.05)
+
+def test_busy_host_page_is_skipped():
+    """Test that a page is skipped rather than holding a fetch thread for its host"""
+    http_client = Mock()
+    searcher = WebSearcher(http_client=http_client, cache=False, page_cache=False,
+                           rate_limiter=HostRateLimiter(rate=0.01, burst=1, max_wait=0.1))
+    searcher.rate_limiter.acquire('https://example.com/first')
+
+    start = time.monotonic()
+    assert searcher.get_page_context('https://example.com/second') is None
+    assert time.monotonic() - start < 0.1
+    http_client.get.assert_not_called()
+
+def test_busy_host_pages_are_fetched_after_the_others():
+    """Test that pages deferred for a busy host are read within the search deadline"""
+    http_client = Mock()
+    http_client.get.side_effect = lambda url, **kwargs: Mock(status_code=200, headers={},
+                                                            iter_content=Mock(return_value=[f'<p>{url}</p>'.encode()]))
+    hits = [Mock(url=f'https://example.com/{i}', title='T', description='S') for i in range(3)]
+    limiter = HostRateLimiter(rate=20, burst=1, max_wait=0)
+
+    searcher = WebSearcher(http_client=http_client, cache=False, page_cache=False, rate_limiter=limiter,
+                           backend=Mock(return_value=hits), governor=False, page_deadline=5)
+    results = searcher.search('query')
+    assert [result['context'] for result in results] == [f'https://example.com/{i}' for i in range(3)]
+    assert not any(result.get('incomplete') for result in results)
+
+    # Past the deadline the page is left out and its result marked
+    searcher = WebSearcher(http_client=http_client, cache=False, page_cache=False,
+                           rate_limiter=HostRateLimiter(rate=0.01, burst=1, max_wait=0),
+                           backend=Mock(return_value=hits[:2]), governor=False, page_deadline=0.1)
+    results = searcher.search('query')
+    assert results[0]['context'] == 'https://example.com/0'
+    assert results[1]['context'] == "" and results[1]['incomplete'] is True
@@ -0,0 +1,173 @@
+import json
+import time
+import pytest
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.youtube_tracker.enrichment import EnrichmentQueue
+from src.youtube_tracker.migrations import migrate
+from src.youtube_tracker.persistence import save_cycle_results
+from src.youtube_tracker.read_api import LatestVideoSnapshot, etag_matches, start_read_api
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'read_api.db'}")
+    migrate(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+@pytest.fixture
+def snapshot(session_factory):
+    # Refreshed only when notified, so tests control when changes show up
+    snapshot = LatestVideoSnapshot(session_factory, refresh_interval=60)
+    yield snapshot
+    snapshot.stop()
+
+@pytest.fixture
+def base_url(snapshot):
+    server = start_read_api(snapshot, port=0)
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    snapshot.stop()
+    server.shutdown()
+    server.server_close()
+
+def make_video(channel_id, video_id, **fields):
+    return {
+        'channel_id': channel_id,
+        'video_id': video_id,
+        'title': f'Video {video_id}',
+        'url': f'https://www.youtube.com/watch?v={video_id}',
+        'thumbnail': f'https://i.ytimg.com/vi/{video_id}/hqdefault.jpg',
+        'description': 'Description',
+        **fields,
+    }
+
+def record(session_factory, videos):
+    db = session_factory()
+    try:
+        save_cycle_results(db, videos)
+        db.commit()
+    finally:
+        db.close()
+
+def change(session_factory, snapshot, videos):
+    record(session_factory, videos)
+    snapshot.notify()
+
+def test_refresh_loads_only_changes(session_factory, snapshot):
+    """Test incremental refreshes of the snapshot"""
+    record(session_factory, [make_video('UC1', 'a'), make_video('UC2', 'b')])
+    assert snapshot.refresh() == 2
+    assert snapshot.refresh() == 0
+
+    record(session_factory, [make_video('UC1', 'c')])
+    assert snapshot.refresh() == 1
+
+    version, body, _ = snapshot.get_videos()
+    assert version == 2
+    assert [video['video_id'] for video in json.loads(body)['videos']] == ['c', 'b']
+    assert [video['video_id'] for _, video in snapshot.changes_since(1)] == ['c']
+
+def test_enrichment_results_reach_the_snapshot(session_factory, snapshot):
+    """Test that a completed enrichment job counts as a change"""
+    queue = EnrichmentQueue(session_factory)
+    video = make_video('UC1', 'a', enrichment_status='pending')
+    db = session_factory()
+    save_cycle_results(db, [video])
+    queue.enqueue(db, [video])
+    db.commit()
+    db.close()
+    snapshot.refresh()
+    result = {'url': 'https://example.com', 'title': 'Example', 'snippet': 'Snippet', 'context': 'Context'}
+
+    job, = queue.claim(1)
+    queue.complete(job, [result])
+
+    assert snapshot.refresh() == 1
+    _, body, _ = snapshot.get_channel('UC1')
+    assert json.loads(body)['enrichment_status'] == 'done'
+    assert json.loads(body)['web_search_results'] == [result]
+
+def test_etag_matching():
+    """Test If-None-Match parsing"""
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('"x", W/"abc"', '"abc"')
+    assert etag_matches('*', '"abc"')
+    assert not etag_matches(None, '"abc"')
+    assert not etag_matches('"abcd"', '"abc"')
+
+def test_videos_with_etags(session_factory, snapshot, base_url):
+    """Test bulk, subset and per-channel reads and conditional requests"""
+    record(session_factory, [make_video('UC1', 'a'), make_video('UC2', 'b'), make_video('UC3', 'c')])
+    snapshot.refresh()
+
+    response = requests.get(f"{base_url}/videos", timeout=5)
+    assert [video['video_id'] for video in response.json()['videos']] == ['a', 'b', 'c']
+    subset = requests.get(f"{base_url}/videos?channel=UC3,UC1&channel=UC9", timeout=5)
+    assert [video['video_id'] for video in subset.json()['videos']] == ['c', 'a']
+    single = requests.get(f"{base_url}/videos/UC2", timeout=5)
+    assert single.json()['title'] == 'Video b'
+    assert requests.get(f"{base_url}/videos/UC9", timeout=5).status_code == 404
+
+    etag = response.headers['ETag']
+    assert requests.get(f"{base_url}/videos", headers={'If-None-Match': etag}, timeout=5).status_code == 304
+    # A change to a channel outside the subset keeps the subset's ETag
+    record(session_factory, [make_video('UC2', 'd')])
+    snapshot.refresh()
+    assert requests.get(f"{base_url}/videos?channel=UC3,UC1", headers={'If-None-Match': subset.headers['ETag']},
+                        timeout=5).status_code == 304
+    assert requests.get(f"{base_url}/videos", headers={'If-None-Match': etag}, timeout=5).status_code == 200
+
+def test_long_poll_returns_on_change(session_factory, snapshot, base_url):
+    """Test that a conditional request with wait returns once the video changes"""
+    record(session_factory, [make_video('UC1', 'a')])
+    snapshot.refresh()
+    etag = requests.get(f"{base_url}/videos/UC1", timeout=5).headers['ETag']
+
+    with ThreadPoolExecutor(1) as executor:
+        start = time.monotonic()
+        poll = executor.submit(requests.get, f"{base_url}/videos/UC1?wait=30",
+                               headers={'If-None-Match': etag}, timeout=35)
+        time.sleep(0.2)
+        change(session_factory, snapshot, [make_video('UC1', 'b')])
+        response = poll.result()
+
+    assert response.status_code == 200
+    assert response.json()['video_id'] == 'b'
+    assert time.monotonic() - start < 10
+    assert requests.get(f"{base_url}/videos/UC1?wait=0.1", headers={'If-None-Match': response.headers['ETag']},
+                        timeout=5).status_code == 304
+
+def read_events(response, count):
+    events = []
+    event = {}
+    for line in response.iter_lines(chunk_size=1, decode_unicode=True):
+        if line.startswith(('id:', 'data:')):
+            field, _, value = line.partition(': ')
+            event[field] = value
+        elif not line and event:
+            events.append((event['id'], json.loads(event['data'])))
+            event = {}
+            if len(events) == count:
+                return events
+    return events
+
+def test_event_stream(session_factory, snapshot, base_url):
+    """Test pushed changes and resuming a stream from its last event ID"""
+    record(session_factory, [make_video('UC1', 'a'), make_video('UC2', 'b')])
+    snapshot.refresh()
+
+    with requests.get(f"{base_url}/events?channel=UC2", stream=True, timeout=10) as response:
+        assert response.headers['Content-Type'].startswith('text/event-stream')
+        change(session_factory, snapshot, [make_video('UC1', 'c')])
+        change(session_factory, snapshot, [make_video('UC2', 'd')])
+        (event_id, video), = read_events(response, 1)
+    assert video['video_id'] == 'd'
+
+    # Resuming in this process replays only later changes; an unknown epoch replays everything
+    change(session_factory, snapshot, [make_video('UC2', 'e')])
+    with requests.get(f"{base_url}/events", headers={'Last-Event-ID': event_id}, stream=True, timeout=10) as response:
+        assert [video['video_id'] for _, video in read_events(response, 1)] == ['e']
+    with requests.get(f"{base_url}/events", headers={'Last-Event-ID': 'other-7'}, stream=True, timeout=10) as response:
+        assert sorted(video['video_id'] for _, video in read_events(response, 2)) == ['c', 'e']
@@ -0,0 +1,119 @@
+import random
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.youtube_tracker.models import Base, LatestVideo, ProcessedVideo
+from src.youtube_tracker.scheduler import AdaptiveScheduler, load_upload_history
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def scheduler(clock):
+    return AdaptiveScheduler(
+        default_interval=15 * MINUTE, min_interval=5 * MINUTE, max_interval=24 * HOUR,
+        jitter=0, factor=0.25, clock=clock, rng=random.Random(1)
+    )
+
+def uploads(every, count=5):
+    start = datetime(2026, 10, 1)
+    return [start + every * i for i in range(count)]
+
+def test_intervals_follow_upload_cadence(scheduler):
+    """Test that frequent uploaders are polled more often than rare ones"""
+    scheduler.learn({
+        'hourly': uploads(timedelta(hours=1)),
+        'daily': uploads(timedelta(days=1)),
+        'rare': uploads(timedelta(days=180)),
+    })
+
+    assert scheduler.interval_for('hourly') == 15 * MINUTE
+    assert scheduler.interval_for('daily') == 6 * HOUR
+    # Clamped to the bounds
+    assert scheduler.interval_for('rare') == 24 * HOUR
+    assert scheduler.interval_for('unknown') == 15 * MINUTE
+
+def test_pop_due_in_order(scheduler, clock):
+    """Test that channels become due according to their schedule"""
+    scheduler.learn({'daily': uploads(timedelta(days=1))})
+    scheduler.add('daily')
+    scheduler.add('new')
+
+    assert sorted(scheduler.pop_due()) == ['daily', 'new']
+    assert scheduler.pop_due() == []
+
+    scheduler.reschedule('daily')
+    scheduler.reschedule('new')
+    assert scheduler.seconds_until_next() == 15 * MINUTE
+
+    clock.now += 15 * MINUTE
+    assert scheduler.pop_due() == ['new']
+    clock.now += 6 * HOUR
+    assert scheduler.pop_due() == ['daily']
+
+def test_changed_channel_is_polled_sooner(scheduler, clock):
+    """Test that a channel with a new upload is checked at the minimum interval"""
+    scheduler.learn({'daily': uploads(timedelta(days=1))})
+    scheduler.add('daily')
+    scheduler.pop_due()
+
+    scheduler.reschedule('daily', changed=True)
+    clock.now += 5 * MINUTE
+    assert scheduler.pop_due() == ['daily']
+
+def test_jitter_stays_within_bounds(clock):
+    """Test that jitter spreads checks around the interval"""
+    scheduler = AdaptiveScheduler(default_interval=HOUR, min_interval=MINUTE, max_interval=2 * HOUR,
+                                  jitter=0.1, clock=clock, rng=random.Random(3))
+    for i in range(20):
+        scheduler.add(f'UC{i}')
+    start = clock.now
+    for channel_id in scheduler.pop_due():
+        scheduler.reschedule(channel_id)
+
+    due_times = []
+    while scheduler.seconds_until_next() is not None:
+        clock.now += scheduler.seconds_until_next()
+        due_times.extend([clock.now - start] * len(scheduler.pop_due()))
+
+    assert len(due_times) == 20
+    assert all(0.9 * HOUR <= due <= 1.1 * HOUR for due in due_times)
+    assert len(set(due_times)) > 1
+
+def test_removed_channel_is_not_returned(scheduler):
+    """Test removing a channel from the schedule"""
+    scheduler.add('UC1')
+    scheduler.remove('UC1')
+
+    assert scheduler.pop_due() == []
+    assert scheduler.seconds_until_next() is None
+
+def test_load_upload_history():
+    """Test reading detection times from the history tables"""
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    now = datetime.utcnow()
+    for hours in (30, 20, 10):
+        db.add(ProcessedVideo(channel_id='UC1', video_id=f'v{hours}', title='t', url='u', thumbnail='th',
+                              processed_at=now - timedelta(hours=hours), action='replaced'))
+    db.add(ProcessedVideo(channel_id='UC1', video_id='old', title='t', url='u', thumbnail='th',
+                          processed_at=now - timedelta(days=400), action='replaced'))
+    db.add(LatestVideo(channel_id='UC1', video_id='v0', title='t', url='u', thumbnail='th', updated_at=now))
+    db.commit()
+
+    history = load_upload_history(db)
+    assert [round((now - t).total_seconds() / 3600) for t in history['UC1']] == [30, 20, 10, 0]
+    db.close()
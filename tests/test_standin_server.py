@@ -0,0 +1,119 @@
+import importlib.util
+import pytest
+import requests
+from pathlib import Path
+from src.youtube_tracker import tracker
+from src.youtube_tracker.app import create_app
+from src.youtube_tracker.extractor import extract_channel_videos, extract_video_description
+from src.youtube_tracker.feed import parse_feed_video_ids
+from src.youtube_tracker.models import LatestVideo, ProcessedVideo
+from src.youtube_tracker.persistence import load_web_search_results
+
+SERVER_PATH = Path(__file__).parent.parent / 'benchmarks' / 'standin_server.py'
+
+@pytest.fixture(scope='module')
+def standin_module():
+    spec = importlib.util.spec_from_file_location('standin_server', SERVER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture
+def server(standin_module):
+    config = standin_module.StandinConfig(latency_ms=0, jitter_ms=0, churn=1.0, page_padding_kb=1)
+    server = standin_module.start_server(config)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def app(server, tmp_path, monkeypatch):
+    monkeypatch.setenv('YOUTUBE_BASE_URL', server.base_url)
+    monkeypatch.setenv('SEARCH_BACKEND_URL', server.base_url)
+    monkeypatch.setenv('HOST_RATE_LIMIT', '1000')
+    monkeypatch.setenv('HOST_RATE_BURST', '1000')
+    app = create_app(database_url=f"sqlite:///{tmp_path / 'tracker.db'}", load_env=False)
+    app.migrate()
+    yield app
+    app.close()
+
+def test_pages_match_extractors(standin_module):
+    """Test that synthetic pages parse like real YouTube pages"""
+    standin = standin_module.Standin(standin_module.StandinConfig(page_padding_kb=1))
+
+    videos = extract_channel_videos(standin.channel_page('UC1'))
+    assert [video.video_id for video in videos] == [standin.video_id('UC1', 1)]
+    assert len(extract_video_description(standin.watch_page(videos[0].video_id)).split()) == 150
+    feed, etag = standin.feed('UC1')
+    assert parse_feed_video_ids(feed) == [videos[0].video_id]
+
+def test_churn_is_deterministic(standin_module):
+    """Test that uploads depend only on the seed and the epoch"""
+    config = standin_module.StandinConfig(churn=0.3, seed=7)
+    first, second = standin_module.Standin(config), standin_module.Standin(config)
+    for _ in range(5):
+        first.advance()
+        second.advance()
+    uploads = [first.uploads(f'UC{index}') for index in range(200)]
+
+    assert uploads == [second.uploads(f'UC{index}') for index in range(200)]
+    assert 1.1 < sum(uploads) / len(uploads) < 3.5
+
+def test_fault_injection(standin_module, server):
+    """Test injected 429 and 500 responses"""
+    server.standin.config.throttle_rate = 1.0
+    response = requests.get(f"{server.base_url}/channel/UC1/videos")
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '1'
+
+    server.standin.config.throttle_rate = 0.0
+    server.standin.config.error_rate = 1.0
+    assert requests.get(f"{server.base_url}/watch?v=abc").status_code == 500
+
+def test_tracker_cycle_against_standin(app, server):
+    """Test full cycles of the tracker against the stand-in"""
+    assert tracker.update_latest_videos(['UC1', 'UC2']) == {'UC1', 'UC2'}
+
+    # New videos are committed before they are searched
+    db = app.session()
+    row = db.query(LatestVideo).filter_by(channel_id='UC1').one()
+    assert row.enrichment_status == 'pending'
+    assert load_web_search_results(db, [row.video_id]) == {}
+    db.close()
+    assert server.standin.stats['search 200'] == 0
+    assert tracker.run_enrichment_worker(once=True) == 2
+
+    db = app.session()
+    row = db.query(LatestVideo).filter_by(channel_id='UC1').one()
+    assert row.video_id == server.standin.video_id('UC1', 1)
+    assert row.enrichment_status == 'done'
+    assert row.url == f"{server.base_url}/watch?v={row.video_id}"
+    results = load_web_search_results(db, [row.video_id])[row.video_id]
+    assert len(results) == 5
+    assert results[0]['url'].startswith(f"{server.base_url}/page/")
+    assert results[0]['context']
+    db.close()
+
+    # Without an upload only the feeds are fetched, then revalidated with a 304
+    assert tracker.update_latest_videos(['UC1', 'UC2']) == set()
+    assert tracker.update_latest_videos(['UC1', 'UC2']) == set()
+    assert server.standin.stats['feed 200'] == 2
+    assert server.standin.stats['feed 304'] == 2
+    assert server.standin.stats['channel 200'] == 2
+
+    server.standin.advance()
+    assert tracker.update_latest_videos(['UC1', 'UC2']) == {'UC1', 'UC2'}
+
+def test_burst_of_uploads_is_recorded_in_one_check(app, server):
+    """Test that every upload between two cycles is recorded from one channel page"""
+    server.standin.config.burst = 3
+    assert tracker.update_latest_videos(['UC1']) == {'UC1'}
+    server.standin.advance()
+    assert tracker.update_latest_videos(['UC1']) == {'UC1'}
+
+    assert server.standin.stats['channel 200'] == 2
+    db = app.session()
+    assert db.query(LatestVideo).filter_by(channel_id='UC1').one().video_id == server.standin.video_id('UC1', 4)
+    history = [row.video_id for row in db.query(ProcessedVideo).order_by(ProcessedVideo.id)]
+    assert history == [server.standin.video_id('UC1', number) for number in (1, 2, 3)]
+    db.close()
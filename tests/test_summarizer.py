@@ -0,0 +1,93 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.youtube_tracker.migrations import migrate
+from src.youtube_tracker.models import LatestVideo, ProcessedVideo
+from src.youtube_tracker.persistence import save_cycle_results
+from src.youtube_tracker.summarizer import backfill_summaries, split_sentences, summarize, summarize_batch
+
+SOLAR = [
+    "The creator installed solar panels on the roof of every new home.",
+    "Each roof got solar panels so the new homes need no power bills.",
+    "Solar panels on each home roof were donated by a local company.",
+]
+OFF_TOPIC = "Subscribe to our newsletter for weekly coupons and deals today."
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'summaries.db'}")
+    migrate(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+def make_result(*sentences):
+    return {'url': 'https://example.com', 'title': 'Title', 'snippet': 'Snippet', 'context': ' '.join(sentences)}
+
+def test_split_sentences():
+    """Test that short pieces and a trailing fragment are dropped and long runs cut"""
+    text = "Too short. " + SOLAR[0] + "\nMenu Home About\n" + ' '.join(['word'] * 120) + ". And the fragment cut at"
+
+    sentences = split_sentences(text)
+
+    assert sentences[0] == SOLAR[0]
+    assert [len(sentence.split()) for sentence in sentences[1:]] == [50, 50, 20]
+
+def test_summary_picks_central_sentences_once():
+    """Test that the summary prefers sentences the results agree on and skips repeats"""
+    results = [make_result(OFF_TOPIC, SOLAR[0], SOLAR[1]), make_result(SOLAR[0], SOLAR[2])]
+
+    summary = summarize(results, max_chars=140)
+
+    assert OFF_TOPIC not in summary
+    assert summary.count(SOLAR[0]) == 1
+    assert len(summary) <= 140
+
+def test_summary_is_bounded():
+    """Test that a sentence longer than the limit is shortened"""
+    assert summarize([make_result(SOLAR[0])], max_chars=30) == 'The creator installed solar...'
+    assert summarize([make_result(SOLAR[0])], max_chars=0) is None
+    # A first word longer than the limit still fits with its ellipsis
+    long_word = 'Photovoltaic' * 5 + ' panels cover the roof of every new home.'
+    assert summarize([make_result(long_word)], max_chars=20) == 'Photovoltaic' + 'Photo...'
+    assert all(len(summarize([make_result(long_word)], max_chars=n)) <= n for n in range(1, 12))
+
+def test_batch_matches_single_videos():
+    """Test that padding videos into one tensor does not change their summaries"""
+    videos = [
+        [make_result(*SOLAR), make_result(OFF_TOPIC)],
+        [],
+        [make_result(OFF_TOPIC, SOLAR[1])],
+        [{'url': 'https://example.com', 'title': 'Title', 'snippet': SOLAR[2], 'context': ''}],
+        [make_result('No sentence here')],
+    ]
+
+    summaries = summarize_batch(videos, max_chars=300)
+
+    assert summaries == [summarize(results, max_chars=300) for results in videos]
+    assert summaries[1] is None and summaries[4] is None
+    assert summaries[3] == SOLAR[2]
+
+def test_backfill(session_factory):
+    """Test summarizing stored videos in batches"""
+    videos = [
+        {'channel_id': f'UC{index}', 'video_id': f'v{index}', 'title': 'Title', 'url': 'https://youtu.be',
+         'thumbnail': 'https://i.ytimg.com', 'description': None,
+         'web_search_results': [make_result(*SOLAR)] if index != 2 else []}
+        for index in range(5)
+    ]
+    db = session_factory()
+    save_cycle_results(db, videos)
+    # UC0's first video moves to the history
+    save_cycle_results(db, [{**videos[0], 'video_id': 'v5'}])
+    db.commit()
+    db.close()
+
+    assert backfill_summaries(session_factory, batch_size=2) == {'summarized': 5, 'skipped': 0}
+    assert backfill_summaries(session_factory, batch_size=2) == {'summarized': 0, 'skipped': 0}
+
+    db = session_factory()
+    summaries = {row.video_id: row.summary for row in db.query(LatestVideo)}
+    assert summaries['v1'].startswith(SOLAR[0][:20])
+    assert summaries['v2'] is None
+    assert db.query(ProcessedVideo).filter_by(video_id='v0').one().summary == summaries['v1']
+    db.close()
@@ -0,0 +1,251 @@
+import os
+import sys
+import json
+import logging
+import subprocess
+import pytest
+from pathlib import Path
+from unittest.mock import Mock, call, patch
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+from src.youtube_tracker import tracker
+from src.youtube_tracker.app import create_app
+from src.youtube_tracker.extractor import extract_channel_videos
+from src.youtube_tracker.metrics import CHANNELS_CHECKED, STAGE_SECONDS
+from src.youtube_tracker.migrations import migrate
+from src.youtube_tracker.models import Channel, LatestVideo, ProcessedVideo, WebResult
+from src.youtube_tracker.persistence import load_web_search_results
+
+ROOT = Path(__file__).parent.parent
+FIXTURES = Path(__file__).parent / 'fixtures' / 'youtube'
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app(database_url=f"sqlite:///{tmp_path / 'tracker.db'}", load_env=False)
+    app.migrate()
+    yield app
+    app.close()
+
+def make_video(channel_id, video_id):
+    return {
+        'channel_id': channel_id,
+        'video_id': video_id,
+        'title': f'Video {video_id}',
+        'url': f'https://www.youtube.com/watch?v={video_id}',
+        'thumbnail': f'https://i.ytimg.com/vi/{video_id}/hqdefault.jpg',
+        'description': 'Description',
+        'web_search_results': [],
+    }
+
+def test_import_has_no_side_effects(tmp_path):
+    """Test that importing the tracker neither connects to a database, creates log files nor loads NumPy"""
+    env = dict(os.environ, PYTHONPATH=str(ROOT / 'src'), DB_HOST='db.invalid')
+    subprocess.run(
+        [sys.executable, '-c', 'import sys, youtube_tracker.tracker; assert "numpy" not in sys.modules'],
+        cwd=tmp_path, env=env, check=True, timeout=60
+    )
+    assert not (tmp_path / 'logs').exists()
+
+def test_get_latest_video_from_pages():
+    """Test fetching the latest video with the fixture pages"""
+    pages = {
+        'https://www.youtube.com/channel/UC1/videos': (FIXTURES / 'channel_videos.html').read_bytes(),
+        'https://www.youtube.com/watch?v=X1fH-ZM9TBr': (FIXTURES / 'watch.html').read_bytes(),
+    }
+    http_client = Mock()
+    http_client.get.side_effect = lambda url, **kwargs: Mock(content=pages[url])
+
+    with patch.object(tracker, 'perform_web_search', return_value=[]) as mock_search:
+        video = tracker.get_latest_video('UC1', http_client=http_client, enrich=True)
+
+    assert video['video_id'] == 'X1fH-ZM9TBr'
+    assert video['title'] == 'I Built 100 Homes And Gave Them Away!'
+    assert video['description'].startswith('Watch the full story of the café ☕')
+    assert video['description'].endswith('...')
+    assert video['enrichment_status'] == 'done'
+    mock_search.assert_called_once_with(video['title'], video['description'])
+
+def test_get_latest_video_leaves_search_to_queue(monkeypatch):
+    """Test that queue mode returns the video without searching"""
+    monkeypatch.setenv('ENRICHMENT_MODE', 'queue')
+    pages = {
+        'https://www.youtube.com/channel/UC1/videos': (FIXTURES / 'channel_videos.html').read_bytes(),
+        'https://www.youtube.com/watch?v=X1fH-ZM9TBr': (FIXTURES / 'watch.html').read_bytes(),
+    }
+    http_client = Mock()
+    http_client.get.side_effect = lambda url, **kwargs: Mock(content=pages[url])
+
+    with patch.object(tracker, 'perform_web_search') as mock_search:
+        video = tracker.get_latest_video('UC1', http_client=http_client)
+
+    assert video['web_search_results'] is None
+    assert video['enrichment_status'] == 'pending'
+    mock_search.assert_not_called()
+
+def test_update_latest_videos_records_changes(app, monkeypatch):
+    """Test a full cycle against the database"""
+    monkeypatch.setenv('YOUTUBE_CHANNEL_IDS', 'UC1, UC2,')
+    monkeypatch.setenv('CHANGE_DETECTION', 'off')
+
+    with patch.object(tracker, 'get_new_videos', side_effect=lambda c, known: [make_video(c, f'{c}-a')]):
+        assert tracker.update_latest_videos() == {'UC1', 'UC2'}
+
+    fetch = {'UC1': [make_video('UC1', 'UC1-b'), make_video('UC1', 'UC1-c')], 'UC2': []}
+    with patch.object(tracker, 'get_new_videos', side_effect=lambda c, known: fetch[c]) as mock_fetch:
+        assert tracker.update_latest_videos() == {'UC1'}
+
+    assert sorted(mock_fetch.call_args_list) == [call('UC1', 'UC1-a'), call('UC2', 'UC2-a')]
+    db = app.session()
+    assert db.query(LatestVideo).filter_by(channel_id='UC1').one().video_id == 'UC1-c'
+    assert [row.video_id for row in db.query(ProcessedVideo).order_by(ProcessedVideo.id)] == ['UC1-a', 'UC1-b']
+    # YOUTUBE_CHANNEL_IDS seeded the channel registry, which records the checks
+    checks = {row.channel_id: row for row in db.query(Channel)}
+    assert checks['UC1'].last_changed_at > checks['UC2'].last_changed_at
+    assert checks['UC1'].last_checked_at == checks['UC2'].last_checked_at
+    db.close()
+
+def test_cycle_logs_one_summary(app, monkeypatch, caplog):
+    """Test that a cycle logs its counts in a single INFO record"""
+    monkeypatch.setenv('CHANGE_DETECTION', 'off')
+    fetch = {'UC1': [make_video('UC1', 'a'), make_video('UC1', 'b')], 'UC2': [], 'UC3': None}
+
+    with patch.object(tracker, 'get_new_videos', side_effect=lambda c, known: fetch[c]), \
+            caplog.at_level(logging.INFO):
+        tracker.update_latest_videos(['UC1', 'UC2', 'UC3'])
+
+    records = [record for record in caplog.records if record.levelno >= logging.INFO]
+    assert [record.event for record in records] == ['cycle_summary']
+    summary = records[0]
+    assert (summary.channels, summary.changed, summary.unchanged, summary.failed) == (3, 1, 1, 1)
+    assert (summary.added, summary.replaced) == (1, 1)
+
+def test_failed_save_reports_channels(app, monkeypatch):
+    """Test that channels whose results were not stored are reported for a retry"""
+    monkeypatch.setenv('CHANGE_DETECTION', 'off')
+    fetch = {'UC1': [make_video('UC1', 'a')], 'UC2': []}
+
+    with patch.object(tracker, 'get_new_videos', side_effect=lambda c, known: fetch[c]), \
+            patch.object(tracker, 'save_cycle_results', side_effect=RuntimeError('database gone')):
+        assert tracker.process_claimed_channels(['UC1', 'UC2']) == {'UC1', 'UC2'}
+
+def test_get_new_videos_records_every_upload(monkeypatch):
+    """Test that all uploads above the stored video are returned, oldest first"""
+    monkeypatch.setenv('ENRICHMENT_MODE', 'queue')
+    channel = (FIXTURES / 'channel_videos.html').read_bytes()
+    listed = [video.video_id for video in extract_channel_videos(channel)]
+    http_client = Mock()
+    http_client.get.side_effect = lambda url, **kwargs: Mock(
+        content=channel if url.endswith('/videos') else (FIXTURES / 'watch.html').read_bytes()
+    )
+
+    videos = tracker.get_new_videos('UC1', listed[3], http_client=http_client)
+
+    assert [video['video_id'] for video in videos] == listed[2::-1]
+    # One channel page and one watch page per new upload
+    assert http_client.get.call_count == 4
+    assert tracker.get_new_videos('UC1', listed[0], http_client=http_client) == []
+
+def test_select_new_uploads():
+    """Test the diff of a channel page against the stored video"""
+    videos = [Mock(video_id=video_id) for video_id in ['e', 'd', 'c', 'b', 'a']]
+    ids = lambda uploads: [upload.video_id for upload in uploads]
+
+    assert ids(tracker.select_new_uploads(videos, 'b')) == ['c', 'd', 'e']
+    assert ids(tracker.select_new_uploads(videos, None)) == ['e']
+    # The stored video was deleted, so only the newest upload is known to be new
+    assert ids(tracker.select_new_uploads(videos, 'gone', limit=2)) == ['e']
+    assert ids(tracker.select_new_uploads(videos, 'a', limit=2)) == ['d', 'e']
+
+def test_update_latest_videos_skips_unchanged_channels(app):
+    """Test that channels rejected by the feed probe are not scraped"""
+    probe = Mock()
+    probe.has_new_video.side_effect = lambda channel_id, known: channel_id == 'UC2'
+    app._objects['feed_probe'] = probe
+
+    with patch.object(tracker, 'get_new_videos', side_effect=lambda c, known: [make_video(c, 'v1')]) as mock_fetch:
+        assert tracker.update_latest_videos(['UC1', 'UC2']) == {'UC2'}
+
+    mock_fetch.assert_called_once_with('UC2', None)
+    probe.acknowledge.assert_called_once_with('UC2')
+
+def test_update_latest_videos_records_metrics(app):
+    """Test that a cycle records stage timings and channel outcomes"""
+    cycles = STAGE_SECONDS.count(stage='cycle')
+    saves = STAGE_SECONDS.count(stage='db_save')
+    changed = CHANNELS_CHECKED.value(result='changed')
+    failed = CHANNELS_CHECKED.value(result='failed')
+    fetch = {'UC1': [make_video('UC1', 'v1')], 'UC2': None}
+
+    with patch.object(tracker, 'check_channel', side_effect=lambda c, known, use_probe: fetch[c]):
+        tracker.update_latest_videos(['UC1', 'UC2'])
+
+    assert STAGE_SECONDS.count(stage='cycle') == cycles + 1
+    assert STAGE_SECONDS.count(stage='db_save') == saves + 1
+    assert CHANNELS_CHECKED.value(result='changed') == changed + 1
+    assert CHANNELS_CHECKED.value(result='failed') == failed + 1
+
+def test_migrate_adds_missing_columns(tmp_path):
+    """Test that migrations add columns to tables created by older versions"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE latest_videos (channel_id VARCHAR PRIMARY KEY, video_id VARCHAR NOT NULL, "
+            "title VARCHAR NOT NULL, url VARCHAR NOT NULL, thumbnail VARCHAR NOT NULL)"
+        ))
+
+    migrate(engine)
+    migrate(engine)
+
+    columns = {column['name'] for column in inspect(engine).get_columns('latest_videos')}
+    assert {'description', 'web_search_results', 'updated_at'} <= columns
+    assert 'processed_videos' in inspect(engine).get_table_names()
+
+def test_migrate_adds_missing_indexes(tmp_path):
+    """Test that indexes added to existing tables are created after the schema transaction"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    migrate(engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_processed_videos_channel_time"))
+
+    migrate(engine)
+
+    assert 'ix_processed_videos_channel_time' in {index['name'] for index in inspect(engine).get_indexes('processed_videos')}
+
+def test_migrate_moves_json_results_to_web_results(tmp_path):
+    """Test that legacy web_search_results JSON is moved into the result tables"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    result = {'url': 'https://example.com', 'title': 'Example', 'snippet': 'Snippet', 'context': 'Context'}
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE latest_videos (channel_id VARCHAR PRIMARY KEY, video_id VARCHAR NOT NULL, "
+            "title VARCHAR NOT NULL, url VARCHAR NOT NULL, thumbnail VARCHAR NOT NULL, web_search_results JSON)"
+        ))
+        connection.execute(text(
+            "CREATE TABLE processed_videos (id INTEGER PRIMARY KEY, channel_id VARCHAR NOT NULL, "
+            "video_id VARCHAR NOT NULL, title VARCHAR NOT NULL, url VARCHAR NOT NULL, thumbnail VARCHAR NOT NULL, "
+            "web_search_results JSON, action VARCHAR NOT NULL)"
+        ))
+        connection.execute(text(
+            "INSERT INTO latest_videos VALUES ('UC1', 'v2', 'T', 'u', 't', :results), ('UC2', 'v3', 'T', 'u', 't', 'null')"
+        ), {'results': json.dumps([result])})
+        connection.execute(text(
+            "INSERT INTO processed_videos VALUES (1, 'UC1', 'v1', 'T', 'u', 't', :results, 'replaced')"
+        ), {'results': json.dumps([result, result])})
+
+    migrate(engine)
+    migrate(engine)
+
+    db = sessionmaker(bind=engine)()
+    assert load_web_search_results(db, ['v1', 'v2', 'v3']) == {'v1': [result, result], 'v2': [result]}
+    assert db.query(WebResult).count() == 1
+    assert db.query(LatestVideo).filter(LatestVideo.web_search_results.is_not(None)).count() == 0
+    assert db.query(ProcessedVideo).filter(ProcessedVideo.web_search_results.is_not(None)).count() == 0
+    db.close()
+
+def test_main_migrate_command(tmp_path, monkeypatch):
+    """Test the migrate command of the entry point"""
+    database = tmp_path / 'cli.db'
+    env = dict(os.environ, PYTHONPATH=str(ROOT / 'src'), DATABASE_URL=f"sqlite:///{database}")
+    subprocess.run([sys.executable, '-m', 'youtube_tracker', 'migrate'], cwd=tmp_path, env=env, check=True, timeout=60)
+
+    assert 'latest_videos' in inspect(create_engine(f"sqlite:///{database}")).get_table_names()
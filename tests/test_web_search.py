@@ -1,31 +1,31 @@
 import pytest
+import requests
 from unittest.mock import Mock, patch
 from bs4 import BeautifulSoup
-from src.youtube_tracker.web_search import WebSearcher
+from src.youtube_tracker.rate_limit import HostRateLimiter
+from src.youtube_tracker.web_search import SearchHit, WebSearcher, get_search_backend, google_backend
+
+def make_page_response(html, content_type='text/html; charset=utf-8'):
+    """Mock a streamed page response"""
+    response = Mock()
+    response.status_code = 200
+    response.headers = {'Content-Type': content_type}
+    response.text = html
+    response.iter_content.return_value = [html.encode('utf-8')]
+    response.raise_for_status.return_value = None
+    return response
 
 @pytest.fixture
 def web_searcher():
-    return WebSearcher()
+    return WebSearcher(cache=False, page_cache=False, rate_limiter=HostRateLimiter(rate=1000, burst=1000))
 
 @pytest.fixture
 def mock_search_response():
-    """Mock HTML response for DuckDuckGo search"""
-    return """
-    <html>
-        <div class="result">
-            <h2 class="result__title">
-                <a href="https://example.com/1">Test Title 1</a>
-            </h2>
-            <div class="result__snippet">Test Snippet 1</div>
-        </div>
-        <div class="result">
-            <h2 class="result__title">
-                <a href="https://example.com/2">Test Title 2</a>
-            </h2>
-            <div class="result__snippet">Test Snippet 2</div>
-        </div>
-    </html>
-    """
+    """Mock results as returned by googlesearch with advanced=True"""
+    return [
+        Mock(url='https://example.com/1', title='Test Title 1', description='Test Snippet 1'),
+        Mock(url='https://example.com/2', title='Test Title 2', description='Test Snippet 2'),
+    ]
 
 @pytest.fixture
 def mock_page_response():
@@ -44,19 +44,11 @@ def mock_page_response():
 
 def test_search_success(web_searcher, mock_search_response, mock_page_response):
     """Test successful search with mocked responses"""
-    with patch('requests.get') as mock_get:
-        # Mock search response
-        mock_search = Mock()
-        mock_search.text = mock_search_response
-        mock_search.raise_for_status.return_value = None
-        
+    with patch('src.youtube_tracker.web_search.search', return_value=mock_search_response), \
+            patch('requests.Session.get') as mock_get:
         # Mock page response
-        mock_page = Mock()
-        mock_page.text = mock_page_response
-        mock_page.raise_for_status.return_value = None
-        
-        # Configure mock to return different responses
-        mock_get.side_effect = [mock_search] + [mock_page] * 2  # One search + two page fetches
+        mock_page = make_page_response(mock_page_response)
+        mock_get.return_value = mock_page
         
         results = web_searcher.search("test query", num_results=2)
         
@@ -69,29 +61,20 @@ def test_search_success(web_searcher, mock_search_response, mock_page_response):
 
 def test_search_with_empty_response(web_searcher):
     """Test search with empty response"""
-    with patch('requests.get') as mock_get:
-        mock_response = Mock()
-        mock_response.text = "<html></html>"
-        mock_response.raise_for_status.return_value = None
-        mock_get.return_value = mock_response
-        
+    with patch('src.youtube_tracker.web_search.search', return_value=iter([])):
         results = web_searcher.search("test query")
         assert len(results) == 0
 
 def test_search_with_request_error(web_searcher):
     """Test search with request error"""
-    with patch('requests.get') as mock_get:
-        mock_get.side_effect = Exception("Test error")
+    with patch('src.youtube_tracker.web_search.search', side_effect=Exception("Test error")):
         results = web_searcher.search("test query")
         assert len(results) == 0
 
 def test_get_page_context_success(web_searcher, mock_page_response):
     """Test successful page context extraction"""
-    with patch('requests.get') as mock_get:
-        mock_response = Mock()
-        mock_response.text = mock_page_response
-        mock_response.raise_for_status.return_value = None
-        mock_get.return_value = mock_response
+    with patch('requests.Session.get') as mock_get:
+        mock_get.return_value = make_page_response(mock_page_response)
         
         context = web_searcher.get_page_context("https://example.com")
         assert 'Test Content' in context
@@ -101,24 +84,22 @@ def test_get_page_context_success(web_searcher, mock_page_response):
 
 def test_get_page_context_with_error(web_searcher):
     """Test page context extraction with error"""
-    with patch('requests.get') as mock_get:
+    with patch('requests.Session.get') as mock_get:
         mock_get.side_effect = Exception("Test error")
         context = web_searcher.get_page_context("https://example.com")
-        assert context == ""
+        assert context is None
+
+    # A missing page has no context, and fetching it again will not change that
+    with patch('requests.Session.get') as mock_get:
+        mock_get.return_value.raise_for_status.side_effect = requests.HTTPError(response=Mock(status_code=404))
+        assert web_searcher.get_page_context("https://example.com") == ""
 
 def test_search_result_structure(web_searcher, mock_search_response, mock_page_response):
     """Test structure of search results"""
-    with patch('requests.get') as mock_get:
-        # Mock responses
-        mock_search = Mock()
-        mock_search.text = mock_search_response
-        mock_search.raise_for_status.return_value = None
-        
-        mock_page = Mock()
-        mock_page.text = mock_page_response
-        mock_page.raise_for_status.return_value = None
-        
-        mock_get.side_effect = [mock_search] + [mock_page] * 2
+    with patch('src.youtube_tracker.web_search.search', return_value=mock_search_response), \
+            patch('requests.Session.get') as mock_get:
+        mock_page = make_page_response(mock_page_response)
+        mock_get.return_value = mock_page
         
         results = web_searcher.search("test query", num_results=2)
         
@@ -127,3 +108,22 @@ def test_search_result_structure(web_searcher, mock_search_response, mock_page_r
             assert isinstance(result, dict)
             assert all(key in result for key in ['url', 'title', 'snippet', 'context'])
             assert all(isinstance(result[key], str) for key in result)
+
+def test_http_search_backend():
+    """Test the JSON search backend selected by SEARCH_BACKEND_URL"""
+    http_client = Mock()
+    http_client.get.return_value.json.return_value = {
+        'results': [{'url': 'https://example.com/1', 'title': 'Title', 'description': None}]
+    }
+    with patch.dict('os.environ', {'SEARCH_BACKEND_URL': 'http://localhost:8800/'}):
+        backend = get_search_backend(http_client)
+
+    hits = backend('test query', 3)
+
+    http_client.get.assert_called_once_with('http://localhost:8800/search', params={'q': 'test query', 'num': 3})
+    assert hits == [SearchHit('https://example.com/1', 'Title', '')]
+
+def test_default_search_backend(monkeypatch):
+    """Test that Google is used without SEARCH_BACKEND_URL"""
+    monkeypatch.delenv('SEARCH_BACKEND_URL', raising=False)
+    assert get_search_backend() is google_backend